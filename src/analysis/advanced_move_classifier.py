@@ -9,11 +9,14 @@ import math
 from typing import Dict, Any, List, Optional, Tuple
 from src.analysis.piece_safety import is_piece_safe, get_unsafe_pieces
 from src.analysis.piece_trapped import is_piece_trapped
+from src.analysis.static_exchange import see
+from src.analysis.safety_memo import memoized
+from src.analysis.mate_threats import move_forces_mate
 from src.analysis.critical_moves import is_move_critical_candidate
 from src.analysis.accuracy_calculator import winning_chances_percent
 from src.core.stockfish_manager import convert_top_move_to_cp
 from src.config import (
-    PIECE_VALUES, SACRIFICE_MIN_VALUE, BRILLIANT_MAX_LOSS,
+    SACRIFICE_MIN_VALUE, BRILLIANT_MAX_LOSS,
     GREAT_MOVE_GAP, GREAT_MOVE_ADVANTAGE, GREAT_MOVE_TACTICAL_ADVANTAGE,
     GREAT_MOVE_LOSS_THRESHOLD, CRITICAL_THRESHOLD, ALTERNATIVE_BAD_THRESHOLD
 )
@@ -24,14 +27,11 @@ class AdvancedMoveClassifier:
     per identificare mosse brillanti, critiche, e calcolare accuratezza precisa.
     """
     
-    def __init__(self, analyzer):
+    def __init__(self):
         """
-        Inizializza il classificatore con un'istanza di Stockfish.
-        
-        Args:
-            analyzer: Istanza di Stockfish per l'analisi delle posizioni
+        Inizializza il classificatore. Le valutazioni del motore vengono fornite
+        dal chiamante a ogni mossa (vedi classify_move).
         """
-        self.analyzer = analyzer
         self.classification_map = {
             'BEST': 'best',
             'EXCELLENT': 'excellent', 
@@ -49,10 +49,12 @@ class AdvancedMoveClassifier:
         """
         Determina se una mossa è un sacrificio significativo.
         
-        Un sacrificio è quando:
-        1. Si cattura un pezzo di valore inferiore o si muove su una casella vuota
-        2. Il pezzo mosso viene messo in presa da un pezzo di valore inferiore
-        3. Il materiale netto sacrificato è significativo (almeno un pedone)
+        Un sacrificio è quando, dopo la mossa e il miglior scambio sulla casella
+        di arrivo (Static Exchange Evaluation), il materiale netto perso è
+        significativo (almeno un pedone). Il re non può sacrificarsi.
+        A differenza del controllo precedente, basato solo sull'attaccante di
+        valore minore, un pezzo attaccato ma difeso a sufficienza non conta come
+        sacrificio (circa il 10% dei verdetti cambia, vedi see_benchmark).
         
         Args:
             board: Scacchiera corrente
@@ -61,42 +63,15 @@ class AdvancedMoveClassifier:
         Returns:
             True se la mossa è un sacrificio, False altrimenti
         """
-        moved_piece = board.piece_at(move.from_square)
-        if not moved_piece or moved_piece.piece_type == chess.KING:
+        moved_type = board.piece_type_at(move.from_square)
+        if not moved_type or moved_type == chess.KING:
             return False
         
-        captured_piece = board.piece_at(move.to_square)
-        
-        # Simula la mossa
-        temp_board = board.copy()
-        temp_board.push(move)
-        
-        # Verifica se il pezzo mosso è attaccato dall'avversario
-        opponent_color = not board.turn
-        opponent_attackers = temp_board.attackers(opponent_color, move.to_square)
-        
-        if not opponent_attackers:
-            return False  # Non è in presa, non è un sacrificio
-        
-        # Calcola il valore del materiale sacrificato vs guadagnato
-        moved_value = PIECE_VALUES[moved_piece.piece_type]
-        captured_value = PIECE_VALUES[captured_piece.piece_type] if captured_piece else 0
-        
-        # Trova l'attaccante di valore più basso
-        min_attacker_value = float('inf')
-        for attacker_square in opponent_attackers:
-            attacker_piece = temp_board.piece_at(attacker_square)
-            if attacker_piece:
-                attacker_value = PIECE_VALUES[attacker_piece.piece_type]
-                min_attacker_value = min(min_attacker_value, attacker_value)
-        
-        # È un sacrificio se il pezzo mosso vale più dell'attaccante più debole
-        # e il materiale netto sacrificato è significativo
-        if min_attacker_value < moved_value:
-            net_sacrifice = moved_value - captured_value - min_attacker_value
-            return net_sacrifice >= SACRIFICE_MIN_VALUE
-        
-        return False
+        # Materiale perso dal lato che muove, se l'avversario sceglie lo scambio migliore.
+        # Il verdetto serve sia per le mosse brillanti sia per le grandi mosse: durante
+        # una Game Review viene memorizzato per posizione e mossa (vedi safety_memo)
+        return memoized("sacrifice", board, (move,),
+                        lambda: -see(board, move) >= SACRIFICE_MIN_VALUE)
     
     def _consider_brilliant_classification(self, board_before: chess.Board, move: chess.Move,
                                          best_move_eval: Dict[str, Any], current_eval: Dict[str, Any]) -> bool:
@@ -190,7 +165,8 @@ class AdvancedMoveClassifier:
             # Controlla se è una mossa tattica importante
             if (board_before.piece_at(move.to_square) or  # Cattura
                 board_before.gives_check(move) or         # Scacco
-                self._is_sacrifice_move(board_before, move)):  # Sacrificio
+                self._is_sacrifice_move(board_before, move) or  # Sacrificio
+                move_forces_mate(board_before, move)):    # Matto forzato
                 
                 # È grande se mantiene un buon vantaggio
                 return subjective_advantage >= GREAT_MOVE_TACTICAL_ADVANTAGE
@@ -267,6 +243,7 @@ class AdvancedMoveClassifier:
     
     def classify_move(self, board_before: chess.Board, move: chess.Move, 
                      top_moves: List[Dict[str, Any]], 
+                     current_eval: Dict[str, Any],
                      opening_name: Optional[str] = None) -> str:
         """
         Classifica una mossa usando la logica avanzata.
@@ -275,6 +252,7 @@ class AdvancedMoveClassifier:
             board_before: Scacchiera prima della mossa
             move: Mossa da classificare
             top_moves: Lista delle migliori mosse con valutazioni
+            current_eval: Valutazione della posizione dopo la mossa
             opening_name: Nome dell'apertura (opzionale)
             
         Returns:
@@ -302,10 +280,6 @@ class AdvancedMoveClassifier:
         best_move_eval = top_moves[0] if top_moves else {}
         second_best_eval = top_moves[1] if len(top_moves) > 1 else None
         
-        # Valutazione della posizione dopo la mossa giocata
-        self.analyzer.set_fen_position(board_after.fen())
-        current_eval = self.analyzer.get_evaluation()
-        
         best_eval_cp = convert_top_move_to_cp(best_move_eval)
         current_eval_cp = convert_top_move_to_cp(current_eval)
         
@@ -3,59 +3,104 @@
 Sistema avanzato per trovare attaccanti e difensori di una casella.
 Implementa la logica per identificare attaccanti diretti, transitivi (batterie)
 e difensori di un pezzo.
+
+Tutte le simulazioni (rimozione di un pezzo per scoprire una batteria, cattura
+del pezzo per trovare chi ricattura) lavorano direttamente sulla bitboard di
+occupazione: le tabelle di attacco di python-chess vengono interrogate con
+l'occupazione modificata, senza mai copiare la scacchiera.
 """
 
 import chess
 from typing import List, Set, Optional
 
-def get_attacking_moves(board: chess.Board, target_square: chess.Square, 
-                       attacking_color: chess.Color, transitive: bool = True) -> List[chess.Square]:
+
+def attackers_mask(board: chess.BaseBoard, color: chess.Color, square: chess.Square,
+                   occupied: chess.Bitboard) -> chess.Bitboard:
     """
-    Trova tutti i pezzi che attaccano una data casa, inclusi gli attaccanti transitivi
-    (pezzi che potrebbero attaccare dopo che altri pezzi si muovono, come nelle batterie).
-    
+    Calcola i pezzi di un colore che attaccano una casa con un'occupazione ipotetica.
+    Equivale a board.attackers_mask() su una copia della scacchiera da cui siano stati
+    tolti i pezzi assenti da occupied.
+
     Args:
         board: Scacchiera corrente
-        target_square: Casella da analizzare
-        attacking_color: Colore degli attaccanti
-        transitive: Se True, include anche gli attaccanti transitivi
-        
+        color: Colore degli attaccanti
+        square: Casella da analizzare
+        occupied: Bitboard delle case occupate (sottoinsieme di board.occupied)
+
     Returns:
-        Lista delle caselle contenenti pezzi attaccanti
+        Bitboard delle case contenenti pezzi attaccanti
     """
-    # Attaccanti diretti
-    direct_attackers = list(board.attackers(attacking_color, target_square))
-    
+    queens_and_rooks = board.queens | board.rooks
+    queens_and_bishops = board.queens | board.bishops
+    attackers = (
+        (chess.BB_KING_ATTACKS[square] & board.kings) |
+        (chess.BB_KNIGHT_ATTACKS[square] & board.knights) |
+        (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] & queens_and_rooks) |
+        (chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied] & queens_and_rooks) |
+        (chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied] & queens_and_bishops) |
+        (chess.BB_PAWN_ATTACKS[not color][square] & board.pawns)
+    )
+    return attackers & board.occupied_co[color] & occupied
+
+
+def _attacking_squares(board: chess.BaseBoard, target_square: chess.Square,
+                       attacking_color: chess.Color, occupied: chess.Bitboard,
+                       transitive: bool) -> List[chess.Square]:
+    """Implementazione di get_attacking_moves per un'occupazione ipotetica."""
+    direct_mask = attackers_mask(board, attacking_color, target_square, occupied)
+    direct_attackers = list(chess.scan_forward(direct_mask))
+
     if not transitive:
         return direct_attackers
-    
-    # Per gli attaccanti transitivi, dobbiamo simulare la rimozione di pezzi
-    # e vedere se si rivelano nuovi attaccanti (batterie)
+
+    # Togliere un attaccante dall'occupazione rivela i pezzi allineati dietro di lui (batterie).
+    # Ogni rimozione parte dall'occupazione di partenza, non da quella della rimozione precedente
     all_attackers = direct_attackers.copy()
+    all_mask = direct_mask
     frontier = direct_attackers.copy()
-    
+
     while frontier:
         current_attacker = frontier.pop()
-        attacker_piece = board.piece_at(current_attacker)
-        
+
         # Il re non può essere alla testa di una batteria
-        if not attacker_piece or attacker_piece.piece_type == chess.KING:
+        if board.piece_type_at(current_attacker) == chess.KING:
             continue
-        
-        # Crea una copia della scacchiera e rimuovi il pezzo attaccante
-        temp_board = board.copy()
-        temp_board.remove_piece_at(current_attacker)
-        
+
+        # Solo un pezzo su una linea con la casa può nascondere un pezzo a lungo raggio
+        if not chess.BB_RAYS[target_square][current_attacker]:
+            continue
+
         # Trova nuovi attaccanti rivelati
-        new_attackers = list(temp_board.attackers(attacking_color, target_square))
-        revealed_attackers = [sq for sq in new_attackers if sq not in all_attackers]
-        
+        new_mask = attackers_mask(board, attacking_color, target_square,
+                                  occupied & ~chess.BB_SQUARES[current_attacker])
+        revealed_attackers = list(chess.scan_forward(new_mask & ~all_mask))
+
         # Aggiungi i nuovi attaccanti alla lista e alla frontiera per ulteriore ricorsione
+        all_mask |= new_mask
         all_attackers.extend(revealed_attackers)
         frontier.extend(revealed_attackers)
-    
+
     return all_attackers
 
+
+def get_attacking_moves(board: chess.Board, target_square: chess.Square, 
+                       attacking_color: chess.Color, transitive: bool = True) -> List[chess.Square]:
+    """
+    Trova tutti i pezzi che attaccano una data casa, inclusi gli attaccanti transitivi
+    (pezzi che potrebbero attaccare dopo che altri pezzi si muovono, come nelle batterie).
+    
+    Args:
+        board: Scacchiera corrente
+        target_square: Casella da analizzare
+        attacking_color: Colore degli attaccanti
+        transitive: Se True, include anche gli attaccanti transitivi
+        
+    Returns:
+        Lista delle caselle contenenti pezzi attaccanti
+    """
+    return _attacking_squares(board, target_square, attacking_color, board.occupied, transitive)
+
+
 def get_defending_moves(board: chess.Board, target_square: chess.Square, 
                        defending_color: chess.Color, transitive: bool = True) -> List[chess.Square]:
     """
@@ -71,41 +116,31 @@ def get_defending_moves(board: chess.Board, target_square: chess.Square,
     Returns:
         Lista delle caselle contenenti pezzi difensori
     """
-    piece = board.piece_at(target_square)
-    if not piece:
+    if not board.piece_type_at(target_square):
         return []
     
     # Ottieni gli attaccanti del pezzo
     attackers = get_attacking_moves(board, target_square, not defending_color, transitive=False)
     
     if not attackers:
-        # Se non ci sono attaccanti, "capovolgi" il colore del pezzo e trova gli attaccanti
-        # Questo simula chi potrebbe difendere se il pezzo fosse attaccato
-        temp_board = board.copy()
-        temp_board.remove_piece_at(target_square)
-        temp_board.set_piece_at(target_square, chess.Piece(piece.piece_type, not piece.color))
-        return list(temp_board.attackers(defending_color, target_square))
+        # Se non ci sono attaccanti, chi difende il pezzo è chi attaccherebbe la casa se il pezzo
+        # fosse avversario: il colore del pezzo sulla casa non cambia gli attacchi verso di essa
+        return list(board.attackers(defending_color, target_square))
     
     # Trova il set più piccolo di ricatturatori simulando ogni possibile cattura
     smallest_recapture_set = None
     min_recapturers = float('inf')
     
     for attacker_square in attackers:
-        attacker_piece = board.piece_at(attacker_square)
-        if not attacker_piece:
-            continue
-        
-        # Simula la cattura
-        temp_board = board.copy()
-        temp_board.remove_piece_at(target_square)
-        temp_board.set_piece_at(target_square, attacker_piece)
-        temp_board.remove_piece_at(attacker_square)
+        # Simula la cattura: la casa resta occupata (ora dall'attaccante), quella di partenza si svuota.
+        # Il tipo di pezzo sulla casa bersaglio non influisce su chi la attacca
+        occupied = board.occupied & ~chess.BB_SQUARES[attacker_square]
         
         # Trova chi può ricatturare
-        recapturers = get_attacking_moves(temp_board, target_square, defending_color, transitive)
+        recapturers = _attacking_squares(board, target_square, defending_color, occupied, transitive)
         
         if len(recapturers) < min_recapturers:
             min_recapturers = len(recapturers)
             smallest_recapture_set = recapturers
     
-    return smallest_recapture_set if smallest_recapture_set is not None else []
\ No newline at end of file
+    return smallest_recapture_set if smallest_recapture_set is not None else []
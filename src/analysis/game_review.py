@@ -0,0 +1,310 @@
+# game_review.py
+"""
+Pipeline di analisi post-partita (Game Review).
+Esegue una sola ricerca MultiPV per ogni posizione della partita: le migliori
+mosse della posizione N+1 forniscono anche la valutazione "dopo la mossa" del
+ply N, evitando di ricercare due volte la stessa posizione. Essendo le ricerche
+indipendenti, vengono distribuite su più motori in parallelo (tutti pilotati
+dallo stesso event loop asyncio) e poi riassemblate in ordine di ply per la
+classificazione.
+"""
+
+import os
+import asyncio
+import itertools
+import chess
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.analysis.advanced_move_classifier import AdvancedMoveClassifier
+from src.analysis.accuracy_calculator import winning_chances_percent, move_accuracy_percent
+from src.analysis.safety_memo import safety_memo
+from src.core.eval_cache import get_top_moves_cached
+from src.core.stockfish_manager import (
+    StockfishManager, EngineUnavailableError, eval_to_centipawns, top_move_to_evaluation
+)
+from src.utils.utils import calculate_player_accuracy
+from src.config import (
+    EVAL_CLASSIFICATIONS, EVAL_COLORS, WINNING_CHANCES_MATE_THRESHOLD,
+    STOCKFISH_REVIEW_WORKERS, REVIEW_ANALYSIS_DEPTH
+)
+
+REVIEW_TOP_MOVES_COUNT = 3  # Mosse candidate per posizione (servono per brillanti/grandi mosse)
+REVIEW_INITIAL_EVAL_CP = 20  # Valutazione di riferimento della posizione iniziale
+
+
+def build_positions(moves: List[chess.Move], start: Optional[chess.Board] = None) -> List[chess.Board]:
+    """
+    Costruisce la lista delle posizioni della partita.
+
+    Args:
+        moves: Mosse della partita a partire da start
+        start: Posizione di partenza (default: posizione iniziale standard)
+
+    Returns:
+        Lista di len(moves) + 1 scacchiere: l'elemento i è la posizione prima
+        della mossa i, l'ultimo è la posizione finale
+    """
+    board = start.copy(stack=False) if start is not None else chess.Board()
+    positions = [board.copy(stack=False)]
+    for move in moves:
+        board.push(move)
+        positions.append(board.copy(stack=False))
+    return positions
+
+
+async def search_position(analyzer, board: chess.Board, depth: int = REVIEW_ANALYSIS_DEPTH) -> Dict[str, Any]:
+    """
+    Esegue la ricerca MultiPV di una singola posizione.
+
+    Args:
+        analyzer: Motore UCI preso in prestito dal pool
+        board: Posizione da analizzare
+        depth: Profondità di analisi
+
+    Returns:
+        Dizionario con 'top_moves' (lista, vuota a fine partita) ed 'evaluation'
+        (formato di get_evaluation(), None a fine partita)
+    """
+    if board.is_game_over():
+        return {'top_moves': [], 'evaluation': None}
+    # Le posizioni già analizzate (aperture comuni, partite rianalizzate) arrivano dalla cache su disco
+    top_moves = await get_top_moves_cached(analyzer, board.fen(), depth, REVIEW_TOP_MOVES_COUNT)
+    # Le top moves sono già dal punto di vista del Bianco, come get_evaluation()
+    evaluation = top_move_to_evaluation(top_moves[0]) if top_moves else None
+    return {'top_moves': top_moves, 'evaluation': evaluation}
+
+
+def resolve_review_workers(workers: Optional[int] = None) -> int:
+    """
+    Determina il numero di motori da usare per la Game Review.
+
+    Args:
+        workers: Numero richiesto. None o 0 usa STOCKFISH_REVIEW_WORKERS; se anche questo
+            è 0, uno per core (limitato dalla dimensione del pool)
+
+    Returns:
+        Numero di motori, almeno 1. La dimensione massima del pool limita il risultato:
+        i motori oltre quel limite non ottengono un processo dall'acquisizione con
+        timeout=0 e terminano subito (vedi search_positions_async)
+    """
+    workers = workers or STOCKFISH_REVIEW_WORKERS or os.cpu_count() or 1
+    return max(1, workers)
+
+
+async def run_workers(coros: List[Awaitable[Any]]) -> List[Any]:
+    """
+    Esegue più worker come task concorrenti e ne attende i risultati.
+    Se un worker solleva un'eccezione (o l'attesa viene annullata), gli altri vengono
+    annullati e attesi prima di propagarla: nessun worker continua a lavorare, né a
+    tenere un motore del pool, per un chiamante che ha già ricevuto l'errore.
+
+    Args:
+        coros: Coroutine dei worker
+
+    Returns:
+        Lista dei risultati, nello stesso ordine di coros
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # Attende la fine dei worker (e la restituzione dei loro motori) prima di propagare
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def search_positions_async(positions: List[chess.Board], workers: Optional[int] = None,
+                                 depth: int = REVIEW_ANALYSIS_DEPTH,
+                                 progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Ricerca tutte le posizioni distribuendole su più motori Stockfish (Threads=1).
+    Ogni motore viene preso in prestito dal pool e consuma le posizioni da una
+    coda condivisa; i risultati vengono riassemblati in ordine di ply. Va eseguita
+    sul loop dei motori (vedi search_positions per la versione sincrona).
+
+    Args:
+        positions: Posizioni da analizzare (vedi build_positions)
+        workers: Numero di motori paralleli (vedi resolve_review_workers)
+        depth: Profondità di analisi
+        progress_callback: Funzione chiamata con (mosse analizzate, mosse totali),
+            dal thread del loop dei motori
+
+    Returns:
+        Lista parallela a positions con i risultati di search_position
+
+    Raises:
+        EngineUnavailableError: Se non è stato possibile ottenere nessun motore
+    """
+    total_moves = len(positions) - 1
+    searches = [None] * len(positions)
+    next_index = itertools.count()
+    completed = 0
+
+    pool = StockfishManager.get_pool(threads=1)
+
+    async def worker(worker_index):
+        nonlocal completed
+        # Il primo motore si attende sempre; gli altri solo se il pool ne ha uno libero subito
+        try:
+            analyzer = await pool.acquire(timeout=None if worker_index == 0 else 0)
+        except EngineUnavailableError:
+            if worker_index == 0:
+                raise
+            return
+        discard = True
+        try:
+            while True:
+                i = next(next_index)
+                if i >= len(positions):
+                    break
+                searches[i] = await search_position(analyzer, positions[i], depth)
+                completed += 1
+                if progress_callback and total_moves:
+                    progress_callback(min(completed, total_moves), total_moves)
+            discard = False
+        finally:
+            # Dopo un errore il motore potrebbe essere a metà ricerca: non va riutilizzato
+            await pool.release(analyzer, discard=discard)
+
+    workers = min(resolve_review_workers(workers), len(positions))
+    await run_workers([worker(i) for i in range(workers)])
+    return searches
+
+
+def search_positions(positions: List[chess.Board], workers: Optional[int] = None,
+                     depth: int = REVIEW_ANALYSIS_DEPTH,
+                     progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Versione sincrona di search_positions_async: esegue le ricerche sul loop dei
+    motori e ne attende il risultato dal thread chiamante.
+    """
+    return StockfishManager.run(search_positions_async(positions, workers, depth, progress_callback))
+
+
+def evaluation_after_move(board_after: chess.Board, mover: chess.Color,
+                          next_search: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """
+    Ricava la valutazione della posizione dopo una mossa dalla ricerca del ply successivo.
+
+    Args:
+        board_after: Posizione dopo la mossa
+        mover: Colore che ha giocato la mossa
+        next_search: Risultato di search_position per board_after
+
+    Returns:
+        Tupla (valutazione nel formato di get_evaluation(), valutazione in centipawns)
+    """
+    if board_after.is_checkmate():
+        sign = 1 if mover == chess.WHITE else -1
+        return {'type': 'mate', 'value': sign}, sign * WINNING_CHANCES_MATE_THRESHOLD
+    eval_info = next_search['evaluation'] or {'type': 'cp', 'value': 0}
+    return eval_info, eval_to_centipawns(eval_info)
+
+
+def review_game(moves: List[chess.Move], workers: Optional[int] = None,
+                depth: int = REVIEW_ANALYSIS_DEPTH,
+                progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[List[Dict[str, Any]], float, float]:
+    """
+    Analizza e classifica tutte le mosse di una partita.
+
+    Args:
+        moves: Mosse della partita dalla posizione iniziale
+        workers: Numero di motori paralleli (vedi resolve_review_workers)
+        depth: Profondità di analisi
+        progress_callback: Funzione chiamata con (mosse analizzate, mosse totali)
+
+    Returns:
+        Tupla (risultati per mossa, accuratezza del Bianco, accuratezza del Nero)
+
+    Raises:
+        EngineUnavailableError: Se non è stato possibile ottenere nessun motore
+    """
+    positions = build_positions(moves)
+    searches = search_positions(positions, workers, depth, progress_callback)
+    return classify_game(moves, positions, searches)
+
+
+def classify_game(moves: List[chess.Move], positions: List[chess.Board],
+                  searches: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float, float]:
+    """
+    Classifica le mosse a partire dalle ricerche già eseguite su ogni posizione.
+    Non usa il motore: tutte le valutazioni necessarie sono in searches.
+
+    Args:
+        moves: Mosse della partita
+        positions: Posizioni della partita (vedi build_positions)
+        searches: Risultati di search_position per ogni posizione, in ordine di ply
+
+    Returns:
+        Tupla (risultati per mossa, accuratezza del Bianco, accuratezza del Nero).
+        Ogni risultato contiene anche 'fen_before', la FEN della posizione prima della mossa
+    """
+    # I controlli tattici ripetuti sulle stesse posizioni vengono memorizzati solo per questa partita
+    with safety_memo():
+        return _classify_moves(moves, positions, searches)
+
+
+def _classify_moves(moves: List[chess.Move], positions: List[chess.Board],
+                    searches: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float, float]:
+    classifier = AdvancedMoveClassifier()
+    results = []
+    white_accuracies, black_accuracies = [], []
+    prev_eval_cp = REVIEW_INITIAL_EVAL_CP
+    # Probabilità di vittoria di ogni posizione, per l'accuratezza pesata per volatilità
+    win_chances = [winning_chances_percent(prev_eval_cp)]
+
+    for i, move in enumerate(moves):
+        board = positions[i]
+        top_moves = searches[i]['top_moves']
+        if not top_moves:
+            continue
+        turn = board.turn
+        board_after = positions[i + 1]
+
+        current_eval_info, current_eval_cp = evaluation_after_move(board_after, turn, searches[i + 1])
+
+        classification_raw = classifier.classify_move(board, move, top_moves, current_eval_info)
+        classification_key = classifier.classification_map.get(classification_raw, classification_raw.lower())
+
+        win_chance_before_white = winning_chances_percent(prev_eval_cp)
+        win_chance_after_white = winning_chances_percent(current_eval_cp)
+        win_chances.append(win_chance_after_white)
+
+        win_chance_before_player = win_chance_before_white if turn == chess.WHITE else 100 - win_chance_before_white
+        win_chance_after_player = win_chance_after_white if turn == chess.WHITE else 100 - win_chance_after_white
+
+        accuracy = move_accuracy_percent(win_chance_before_player, win_chance_after_player)
+        (white_accuracies if turn == chess.WHITE else black_accuracies).append(accuracy)
+
+        results.append({
+            'ply': i + 1, 'move': move, 'san': board.san(move),
+            # Istantanea della posizione prima della mossa: la UI ricostruisce qualsiasi ply in O(1)
+            'fen_before': board.fen(),
+            'classification': EVAL_CLASSIFICATIONS[classification_key],
+            'classification_key': classification_key,
+            'color': EVAL_COLORS[classification_key],
+            'evaluation': current_eval_info
+        })
+        prev_eval_cp = current_eval_cp
+
+    white_final_accuracy = calculate_player_accuracy(white_accuracies, win_chances, True)
+    black_final_accuracy = calculate_player_accuracy(black_accuracies, win_chances, False)
+    return results, white_final_accuracy, black_final_accuracy
+
+
+def review_board_at(result: Dict[str, Any]) -> chess.Board:
+    """
+    Ricostruisce la posizione dopo una mossa della Game Review dalla sua istantanea.
+    Costo costante, indipendente dalla lunghezza della partita.
+
+    Args:
+        result: Risultato di una mossa (vedi classify_game)
+
+    Returns:
+        Scacchiera dopo la mossa, con la sola mossa stessa nella move_stack
+        (serve per evidenziare l'ultima mossa)
+    """
+    board = chess.Board(result['fen_before'])
+    board.push(result['move'])
+    return board
@@ -0,0 +1,242 @@
+# mate_threats.py
+"""
+Rilevamento rapido dei matti in 1 e in 2.
+
+Serve a riconoscere i sacrifici che forzano il matto senza interrogare il
+motore. Le mosse vengono provate in ordine di forzatura (prima gli scacchi, poi
+le catture) e la ricerca si ferma alla prima mossa che decide. I risultati sono
+ricordati per posizione, perché le stesse posizioni ricorrono tra le mosse
+candidate di una Game Review.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterator, Optional
+import chess
+from src.config import MATE_THREAT_CACHE_SIZE, MATE_THREAT_DEPTH
+from src.utils.utils import board_position_key
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0}
+_MISSING = object()
+
+
+def _cached(kind: str, board: chess.Board, compute: Callable[[], Any]) -> Any:
+    """Restituisce il risultato di una ricerca per la posizione, calcolandolo se non è già noto."""
+    key = (kind, board_position_key(board))
+    with _cache_lock:
+        result = _cache.get(key, _MISSING)
+        if result is not _MISSING:
+            _cache.move_to_end(key)
+            _cache_stats['hits'] += 1
+            return result
+        _cache_stats['misses'] += 1
+    result = compute()
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > MATE_THREAT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def _discovery_squares(board: chess.Board, king: chess.Square) -> chess.Bitboard:
+    """Case dei pezzi del lato al tratto che, spostandosi, scoprono uno scacco al re avversario."""
+    us = board.occupied_co[board.turn]
+    snipers = ((chess.BB_RANK_ATTACKS[king][0] | chess.BB_FILE_ATTACKS[king][0]) & (board.rooks | board.queens) |
+               chess.BB_DIAG_ATTACKS[king][0] & (board.bishops | board.queens)) & us
+    discovery = 0
+    for sniper in chess.scan_forward(snipers):
+        blockers = chess.between(king, sniper) & board.occupied
+        if blockers and not blockers & (blockers - 1) and blockers & us:
+            discovery |= blockers
+    return discovery
+
+
+def _direct_check_squares(board: chess.Board, piece_type: chess.PieceType, king: chess.Square) -> chess.Bitboard:
+    """
+    Case da cui un pezzo del lato al tratto di tipo piece_type darebbe scacco al re avversario.
+    Basta l'occupazione attuale: se la casa di partenza fosse l'unico ostacolo verso il re,
+    il pezzo starebbe già dando scacco.
+    """
+    occupied = board.occupied
+    if piece_type == chess.PAWN:
+        return chess.BB_PAWN_ATTACKS[not board.turn][king]
+    if piece_type == chess.KNIGHT:
+        return chess.BB_KNIGHT_ATTACKS[king]
+    mask = 0
+    if piece_type in (chess.BISHOP, chess.QUEEN):
+        mask |= chess.BB_DIAG_ATTACKS[king][chess.BB_DIAG_MASKS[king] & occupied]
+    if piece_type in (chess.ROOK, chess.QUEEN):
+        mask |= (chess.BB_RANK_ATTACKS[king][chess.BB_RANK_MASKS[king] & occupied] |
+                 chess.BB_FILE_ATTACKS[king][chess.BB_FILE_MASKS[king] & occupied])
+    return mask
+
+
+def _checking_moves(board: chess.Board) -> Iterator[chess.Move]:
+    """
+    Mosse legali che danno scacco. Si generano solo le mosse che arrivano su una casa di
+    scacco diretto o che partono da una casa da cui si può scoprire o dare uno scacco
+    indiretto (pezzi che liberano una linea, re che arrocca, pedoni che promuovono o
+    catturano en passant); ognuna viene poi verificata.
+    """
+    king = board.king(not board.turn)
+    if king is None:
+        return
+    us = board.occupied_co[board.turn]
+    promotion_rank = chess.BB_RANK_7 if board.turn == chess.WHITE else chess.BB_RANK_2
+    special = (_discovery_squares(board, king) | board.kings & us |
+               board.pawns & us & promotion_rank)
+    if board.ep_square is not None:
+        special |= board.pawns & us & chess.BB_PAWN_ATTACKS[not board.turn][board.ep_square]
+
+    for move in board.generate_legal_moves(special):
+        if board.gives_check(move):
+            yield move
+
+    targets = {piece_type: _direct_check_squares(board, piece_type, king)
+               for piece_type in (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)}
+    all_targets = 0
+    for mask in targets.values():
+        all_targets |= mask
+    for move in board.generate_legal_moves(us & ~special, all_targets):
+        if (targets[board.piece_type_at(move.from_square)] & chess.BB_SQUARES[move.to_square] and
+                board.gives_check(move)):
+            yield move
+
+
+def _forcing_order(board: chess.Board) -> Iterator[chess.Move]:
+    """Mosse legali in ordine di forzatura: scacchi, catture, tutte le altre."""
+    checks = list(_checking_moves(board))
+    check_set = set(checks)
+    captures, quiet = [], []
+    for move in board.legal_moves:
+        if move in check_set:
+            continue
+        if board.is_capture(move):
+            captures.append(move)
+        else:
+            quiet.append(move)
+    yield from checks
+    yield from captures
+    yield from quiet
+
+
+def find_mate_in_one(board: chess.Board) -> Optional[chess.Move]:
+    """
+    Cerca una mossa che dia matto subito (solo gli scacchi possono farlo).
+
+    Args:
+        board: Posizione, con il tratto al lato che cerca il matto
+
+    Returns:
+        La mossa di matto, o None se non esiste
+    """
+    return _cached("mate1", board, lambda: _find_mate_in_one(board))
+
+
+def _find_mate_in_one(board: chess.Board) -> Optional[chess.Move]:
+    for move in _checking_moves(board):
+        board.push(move)
+        try:
+            if board.is_checkmate():
+                return move
+        finally:
+            board.pop()
+    return None
+
+
+def find_mate_in_two(board: chess.Board) -> Optional[chess.Move]:
+    """
+    Cerca la prima mossa di un matto forzato in al massimo 2 mosse.
+
+    Args:
+        board: Posizione, con il tratto al lato che cerca il matto
+
+    Returns:
+        La prima mossa del matto (un matto in 1, se esiste), o None se non esiste
+    """
+    return _cached("mate2", board, lambda: _find_mate_in_two(board))
+
+
+def _find_mate_in_two(board: chess.Board) -> Optional[chess.Move]:
+    mate = find_mate_in_one(board)
+    if mate is not None:
+        return mate
+    for move in _forcing_order(board):
+        board.push(move)
+        try:
+            if _all_replies_mated(board, find_mate_in_one):
+                return move
+        finally:
+            board.pop()
+    return None
+
+
+def _all_replies_mated(board: chess.Board, find_mate: Callable[[chess.Board], Optional[chess.Move]]) -> bool:
+    """
+    True se ogni risposta del lato al tratto lascia all'avversario un matto (stallo escluso).
+    Si ferma alla prima risposta che si salva.
+    """
+    replied = False
+    for reply in board.legal_moves:
+        replied = True
+        board.push(reply)
+        try:
+            if find_mate(board) is None:
+                return False
+        finally:
+            board.pop()
+    return replied
+
+
+def forces_mate(board: chess.Board, max_moves: int = MATE_THREAT_DEPTH) -> bool:
+    """
+    Determina se il lato che ha appena mosso forza il matto entro max_moves mosse,
+    qualunque cosa risponda l'avversario (la posizione può anche essere già matto).
+
+    Args:
+        board: Posizione dopo la mossa da valutare (viene modificata durante la ricerca
+            e poi ripristinata)
+        max_moves: Mosse del lato che ha mosso entro cui deve arrivare il matto (1 o 2)
+
+    Returns:
+        True se il matto è forzato
+    """
+    if max_moves not in (1, 2):
+        raise ValueError(f"Profondità di matto non supportata: {max_moves}")
+    if board.is_checkmate():
+        return True
+    find_mate = find_mate_in_one if max_moves == 1 else find_mate_in_two
+    return _cached(f"forced{max_moves}", board, lambda: _all_replies_mated(board, find_mate))
+
+
+def move_forces_mate(board: chess.Board, move: chess.Move, max_moves: int = MATE_THREAT_DEPTH + 1) -> bool:
+    """
+    Determina se una mossa forza il matto entro max_moves mosse (vedi forces_mate).
+
+    Args:
+        board: Posizione prima della mossa (non viene modificata)
+        move: Mossa da valutare
+        max_moves: Mosse entro cui deve arrivare il matto, compresa la mossa stessa
+
+    Returns:
+        True se dopo la mossa il matto è forzato
+    """
+    board = board.copy(stack=False)
+    board.push(move)
+    return board.is_checkmate() or (max_moves > 1 and forces_mate(board, max_moves - 1))
+
+
+def mate_cache_stats() -> dict:
+    """
+    Restituisce i contatori della cache delle ricerche di matto.
+
+    Returns:
+        Dizionario con hits, misses, entries e hit_rate
+    """
+    with _cache_lock:
+        stats = dict(_cache_stats, entries=len(_cache))
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
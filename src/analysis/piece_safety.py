@@ -1,20 +1,53 @@
 # piece_safety.py
 """
 Sistema avanzato per valutare la sicurezza dei pezzi.
-Determina se un pezzo è sicuro nella sua posizione considerando
-attaccanti, difensori e valori relativi dei pezzi.
+Determina se un pezzo è sicuro nella sua posizione risolvendo lo scambio
+sulla sua casa con la Static Exchange Evaluation (vedi static_exchange).
 """
 
 import chess
 from typing import List, Optional, Set
 from src.analysis.attackers_defenders import get_attacking_moves, get_defending_moves
+from src.analysis.static_exchange import see_square
+from src.analysis.safety_memo import memo_active
 from src.config import PIECE_VALUES
 
+def is_favourable_sacrifice(board: chess.Board, square: chess.Square, played_move: Optional[chess.Move]) -> bool:
+    """
+    Riconosce i sacrifici favorevoli (torre per 2 pezzi minori), considerati sicuri
+    anche se lo scambio sulla casa è in perdita.
+    
+    Args:
+        board: Scacchiera corrente
+        square: Casella del pezzo da analizzare
+        played_move: Mossa giocata (None se non nota)
+        
+    Returns:
+        True se il pezzo è una torre che ha appena catturato un pezzo minore
+        e può essere ripresa solo da un pezzo minore, con almeno un difensore
+    """
+    if not played_move:
+        return False
+    piece = board.piece_at(square)
+    captured_piece = board.piece_at(played_move.to_square)
+    if not (piece and captured_piece and
+            piece.piece_type == chess.ROOK and
+            PIECE_VALUES.get(captured_piece.piece_type, 0) == PIECE_VALUES[chess.KNIGHT]):
+        return False
+    
+    all_attackers = get_attacking_moves(board, square, not piece.color, transitive=True)
+    if len(all_attackers) != 1:
+        return False
+    attacker_type = board.piece_type_at(all_attackers[0])
+    return (attacker_type is not None and
+            PIECE_VALUES[attacker_type] == PIECE_VALUES[chess.KNIGHT] and
+            len(get_defending_moves(board, square, piece.color)) > 0)
+
 def is_piece_safe(board: chess.Board, square: chess.Square, played_move: Optional[chess.Move] = None) -> bool:
     """
     Determina se un pezzo in una data casa è sicuro.
-    Implementa la logica avanzata considerando attaccanti diretti e transitivi,
-    difensori e valori relativi dei pezzi.
+    Un pezzo è sicuro se l'avversario non guadagna materiale catturandolo, tenendo
+    conto di tutta la sequenza di catture e ricatture (attaccanti in batteria inclusi).
     
     Args:
         board: Scacchiera corrente
@@ -24,61 +57,26 @@ def is_piece_safe(board: chess.Board, square: chess.Square, played_move: Optiona
     Returns:
         True se il pezzo è sicuro, False altrimenti
     """
-    piece = board.piece_at(square)
-    if not piece:
+    piece_type = board.piece_type_at(square)
+    if not piece_type:
         return True
     
-    # Ottieni attaccanti diretti e transitivi
-    direct_attackers = get_attacking_moves(board, square, not piece.color, transitive=False)
-    all_attackers = get_attacking_moves(board, square, not piece.color, transitive=True)
-    defenders = get_defending_moves(board, square, piece.color)
-    
     # Sacrifici favorevoli (torre per 2 pezzi minori) sono considerati sicuri
-    if played_move:
-        captured_piece = board.piece_at(played_move.to_square)
-        if (captured_piece and 
-            piece.piece_type == chess.ROOK and
-            PIECE_VALUES.get(captured_piece.piece_type, 0) == PIECE_VALUES[chess.KNIGHT] and
-            len(all_attackers) == 1 and len(defenders) > 0 and
-            len([a for a in all_attackers if board.piece_at(a) and 
-                 PIECE_VALUES[board.piece_at(a).piece_type] == PIECE_VALUES[chess.KNIGHT]]) > 0):
-            return True
-    
-    # Un pezzo con un attaccante diretto di valore inferiore non è sicuro
-    for attacker_square in direct_attackers:
-        attacker_piece = board.piece_at(attacker_square)
-        if attacker_piece and PIECE_VALUES[attacker_piece.piece_type] < PIECE_VALUES[piece.piece_type]:
-            return False
-    
-    # Un pezzo che non ha più attaccanti che difensori è sicuro
-    if len(all_attackers) <= len(defenders):
-        return True
-    
-    # Un pezzo di valore inferiore a qualsiasi attaccante diretto,
-    # e con qualsiasi difensore di valore inferiore a tutti gli attaccanti diretti, è sicuro
-    if direct_attackers:
-        lowest_attacker_value = min(
-            PIECE_VALUES[board.piece_at(sq).piece_type] 
-            for sq in direct_attackers 
-            if board.piece_at(sq)
-        )
-        
-        if (PIECE_VALUES[piece.piece_type] < lowest_attacker_value and
-            any(board.piece_at(def_sq) and 
-                PIECE_VALUES[board.piece_at(def_sq).piece_type] < lowest_attacker_value
-                for def_sq in defenders)):
-            return True
-    
-    # Un pezzo difeso da un pedone è generalmente sicuro
-    if any(board.piece_at(def_sq) and board.piece_at(def_sq).piece_type == chess.PAWN 
-           for def_sq in defenders):
+    if is_favourable_sacrifice(board, square, played_move):
         return True
     
-    return False
+    # Dentro una safety_memo lo scambio viene letto dalla scansione condivisa della posizione
+    # (che esclude i re); altrimenti basta risolvere quello della casa
+    if piece_type != chess.KING and memo_active():
+        from src.analysis.threats import threat_scan
+        return threat_scan(board).exchanges_of(board.color_at(square))[square] <= 0
+    return see_square(board, square) <= 0
 
 def get_unsafe_pieces(board: chess.Board, color: chess.Color, played_move: Optional[chess.Move] = None) -> List[chess.Square]:
     """
     Restituisce una lista di case contenenti pezzi non sicuri del colore specificato.
+    Gli scambi vengono letti dalla scansione della posizione (vedi threats.threat_scan),
+    condivisa con is_piece_safe, is_piece_trapped e i livelli di pericolo.
     
     Args:
         board: Scacchiera corrente
@@ -88,6 +86,11 @@ def get_unsafe_pieces(board: chess.Board, color: chess.Color, played_move: Optio
     Returns:
         Lista delle caselle contenenti pezzi non sicuri
     """
+    # Import locale: threats dipende da questo modulo
+    from src.analysis.threats import threat_scan
+    scan = threat_scan(board)
+    if played_move is None:
+        return scan.unsafe_pieces(color)
     captured_piece_value = 0
     if played_move:
         # Determina se la mossa è una cattura controllando la casella di destinazione
@@ -95,14 +98,15 @@ def get_unsafe_pieces(board: chess.Board, color: chess.Color, played_move: Optio
         if captured_piece:
             captured_piece_value = PIECE_VALUES.get(captured_piece.piece_type, 0)
     
+    exchanges = scan.exchanges_of(color)
     unsafe_pieces = []
     
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if (piece and piece.color == color and 
-            piece.piece_type not in [chess.PAWN, chess.KING] and
-            PIECE_VALUES[piece.piece_type] > captured_piece_value and
-            not is_piece_safe(board, square, played_move)):
+    for square in sorted(exchanges):
+        piece_type = board.piece_type_at(square)
+        if (piece_type != chess.PAWN and
+            PIECE_VALUES[piece_type] > captured_piece_value and
+            exchanges[square] > 0 and
+            not is_favourable_sacrifice(board, square, played_move)):
             unsafe_pieces.append(square)
     
-    return unsafe_pieces
\ No newline at end of file
+    return unsafe_pieces
@@ -7,7 +7,7 @@ Un pezzo è intrappolato se non è sicuro e non ha mosse sicure disponibili.
 import chess
 from typing import Optional
 from src.analysis.piece_safety import is_piece_safe
-from src.analysis.danger_levels import move_creates_greater_threat
+from src.analysis.threats import analyze_threats, threat_scan
 
 def is_piece_trapped(board: chess.Board, square: chess.Square, 
                     danger_levels: bool = True) -> bool:
@@ -31,32 +31,14 @@ def is_piece_trapped(board: chess.Board, square: chess.Square,
     if not piece:
         return False
     
+    # Pezzi non sicuri e intrappolati vengono calcolati una volta per posizione per tutta
+    # la scacchiera (vedi threats), che esclude pedoni e re
+    if danger_levels and piece.piece_type not in (chess.PAWN, chess.KING):
+        return square in analyze_threats(board)['trapped']
+    
     # Se il pezzo è sicuro dove si trova, non è intrappolato
     if is_piece_safe(board, square):
         return False
     
-    # Crea una copia della scacchiera con il turno corretto
-    temp_board = board.copy()
-    temp_board.turn = piece.color
-    
-    # Controlla tutte le mosse legali per quel pezzo
-    piece_moves = [move for move in temp_board.legal_moves if move.from_square == square]
-    
-    for move in piece_moves:
-        # Non considerare le catture del re (illegali)
-        if temp_board.piece_at(move.to_square) and temp_board.piece_at(move.to_square).piece_type == chess.KING:
-            continue
-        
-        # Se i danger levels sono abilitati, controlla se la mossa crea una minaccia maggiore
-        if danger_levels and move_creates_greater_threat(board, square, move):
-            continue
-        
-        # Simula la mossa e controlla se il pezzo è sicuro nella nuova posizione
-        temp_board.push(move)
-        is_safe_after_move = is_piece_safe(temp_board, move.to_square, move)
-        temp_board.pop()
-        
-        if is_safe_after_move:
-            return False  # Ha trovato una mossa sicura, non è intrappolato
-    
-    return True  # Nessuna mossa sicura trovata, il pezzo è intrappolato
\ No newline at end of file
+    # Le mosse del pezzo vengono provate sulla scansione condivisa della posizione
+    return threat_scan(board).is_trapped(square, danger_levels)
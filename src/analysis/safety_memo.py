@@ -0,0 +1,158 @@
+# safety_memo.py
+"""
+Memoizzazione dei controlli tattici per posizione.
+
+Le stesse posizioni vengono analizzate molte volte, quindi i controlli passano
+da qui con una chiave fatta di posizione e argomenti (casa, mossa giocata):
+- la scansione delle minacce di ogni posizione (vedi threats.threat_scan) è
+  condivisa da is_piece_safe, get_unsafe_pieces (anche con la mossa giocata),
+  is_piece_trapped e dai livelli di pericolo di danger_levels;
+- analyze_threats conserva l'analisi completa della posizione;
+- il classificatore conserva il verdetto di sacrificio di ogni mossa giocata,
+  che serve sia per le mosse brillanti sia per le grandi mosse.
+
+La memoria esiste solo dentro un blocco `with safety_memo():` (uno per Game
+Review, vedi game_review.classify_game) e viene scartata alla sua uscita; fuori
+da un blocco i controlli vengono semplicemente ricalcolati.
+"""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Tuple
+import chess
+from src.config import SAFETY_MEMO_MAX_ENTRIES
+from src.utils.utils import board_position_key
+
+
+class SafetyMemo:
+    """
+    Risultati dei controlli tattici (LRU), con i contatori di hit e miss per tipo di controllo.
+    Appartiene a un solo thread: non serve un lock.
+    """
+
+    def __init__(self, max_entries: int = SAFETY_MEMO_MAX_ENTRIES):
+        """
+        Inizializza la memoria vuota.
+
+        Args:
+            max_entries: Numero massimo di risultati conservati
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def get_or_compute(self, kind: str, board: chess.Board, args: Tuple[Hashable, ...],
+                       compute: Callable[[], Any]) -> Any:
+        """
+        Restituisce il risultato memorizzato di un controllo, calcolandolo se assente.
+
+        Args:
+            kind: Tipo di controllo (es. "scan", "threats")
+            board: Posizione analizzata
+            args: Argomenti del controllo oltre alla posizione (casa, mossa giocata, ...)
+            compute: Funzione che calcola il risultato
+
+        Returns:
+            Il risultato del controllo
+        """
+        key = (kind, board_position_key(board), args)
+        counters = self._counters.setdefault(kind, {'hits': 0, 'misses': 0})
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            counters['hits'] += 1
+            return self._entries[key]
+        counters['misses'] += 1
+        result = compute()
+        self._entries[key] = result
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Restituisce i contatori per tipo di controllo.
+
+        Returns:
+            Dizionario tipo -> {'hits', 'misses', 'hit_rate'}
+        """
+        return {kind: _with_hit_rate(counters) for kind, counters in self._counters.items()}
+
+
+def _with_hit_rate(counters: Dict[str, int]) -> Dict[str, Any]:
+    lookups = counters['hits'] + counters['misses']
+    return dict(counters, hit_rate=counters['hits'] / lookups if lookups else 0.0)
+
+
+_local = threading.local()
+_totals: Dict[str, Dict[str, int]] = {}
+_totals_lock = threading.Lock()
+
+
+@contextmanager
+def safety_memo(max_entries: int = SAFETY_MEMO_MAX_ENTRIES) -> Iterator[SafetyMemo]:
+    """
+    Attiva la memoria dei controlli tattici per il thread corrente, fino all'uscita dal blocco.
+    I blocchi annidati riusano la memoria di quello esterno. All'uscita i contatori
+    vengono sommati ai totali del processo (vedi safety_memo_totals).
+
+    Args:
+        max_entries: Numero massimo di risultati conservati
+
+    Yields:
+        La memoria attiva
+    """
+    outer = getattr(_local, 'memo', None)
+    if outer is not None:
+        yield outer
+        return
+    memo = _local.memo = SafetyMemo(max_entries)
+    try:
+        yield memo
+    finally:
+        _local.memo = None
+        with _totals_lock:
+            for kind, counters in memo._counters.items():
+                total = _totals.setdefault(kind, {'hits': 0, 'misses': 0})
+                total['hits'] += counters['hits']
+                total['misses'] += counters['misses']
+
+
+def memoized(kind: str, board: chess.Board, args: Tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+    """
+    Esegue un controllo passando dalla memoria attiva, se c'è.
+
+    Args:
+        kind: Tipo di controllo
+        board: Posizione analizzata
+        args: Argomenti del controllo oltre alla posizione
+        compute: Funzione che calcola il risultato
+
+    Returns:
+        Il risultato del controllo
+    """
+    memo = getattr(_local, 'memo', None)
+    if memo is None:
+        return compute()
+    return memo.get_or_compute(kind, board, args, compute)
+
+
+def memo_active() -> bool:
+    """Indica se il thread corrente è dentro un blocco `with safety_memo():`."""
+    return getattr(_local, 'memo', None) is not None
+
+
+def safety_memo_totals() -> Dict[str, Any]:
+    """
+    Restituisce i contatori accumulati da tutte le memorie già chiuse.
+
+    Returns:
+        Dizionario con 'hits', 'misses' e 'hit_rate' complessivi e 'by_kind' per tipo di controllo
+    """
+    with _totals_lock:
+        by_kind = {kind: _with_hit_rate(counters) for kind, counters in _totals.items()}
+    overall = {
+        'hits': sum(c['hits'] for c in by_kind.values()),
+        'misses': sum(c['misses'] for c in by_kind.values()),
+    }
+    return dict(_with_hit_rate(overall), by_kind=by_kind)
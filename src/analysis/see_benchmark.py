@@ -0,0 +1,247 @@
+# see_benchmark.py
+"""
+Benchmark della Static Exchange Evaluation contro i controlli precedenti.
+
+Confronta, su un corpus fisso di posizioni, la sicurezza dei pezzi e il
+riconoscimento dei sacrifici basati sulla SEE con le versioni precedenti
+(conteggio di attaccanti e difensori con casi speciali, cattura simulata su
+una copia della scacchiera), riportate qui come riferimento. Oltre ai tempi
+stampa la percentuale di verdetti concordanti.
+
+Prima del confronto verifica i verdetti di sacrificio attesi su alcune posizioni
+note (KNOWN_SACRIFICES): il riconoscimento basato sulla SEE cambia di proposito
+circa il 10% dei verdetti e queste posizioni ne fissano il comportamento.
+
+Uso:
+    python -m src.analysis.see_benchmark
+    python -m src.analysis.see_benchmark --games 50 --repeat 5
+    python -m src.analysis.see_benchmark --check
+"""
+
+import sys
+import time
+import random
+import argparse
+import chess
+from typing import Callable, List, Optional, Tuple
+from src.analysis.attackers_defenders import get_attacking_moves, get_defending_moves
+from src.analysis.piece_safety import is_piece_safe, get_unsafe_pieces
+from src.analysis.advanced_move_classifier import AdvancedMoveClassifier
+from src.config import PIECE_VALUES, SACRIFICE_MIN_VALUE
+
+# Posizioni tattiche con scambi, batterie e pezzi in presa, aggiunte alle partite generate
+CORPUS_FENS = [
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5",
+    "1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1",
+    "1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1",
+    "r2q1rk1/pp2bppp/2n1bn2/3p4/3P4/2NBBN2/PP3PPP/R2Q1RK1 w - - 6 11",
+    "2rr2k1/pp3ppp/2n1bn2/q3p3/4P3/P1N1BN1P/1PQ2PP1/3RR1K1 b - - 2 19",
+    "r4rk1/1b2qppp/p1n1pn2/1pb5/4P3/P1N1BN2/1PQ1BPPP/R4RK1 w - - 0 14",
+    "3r2k1/5ppp/8/3q4/3R4/3Q4/5PPP/6K1 w - - 0 1",
+]
+CORPUS_SEED = 20240601  # Seme fisso: il corpus è identico a ogni esecuzione
+
+# Verdetti di sacrificio attesi: (descrizione, FEN, mossa, sacrificio)
+KNOWN_SACRIFICES = [
+    ("torre difesa in presa alla donna", "4k3/8/8/4q3/8/R7/3P4/6K1 w - - 0 1", "a3c3", False),
+    ("torre indifesa in presa alla donna", "4k3/8/8/4q3/8/R7/8/6K1 w - - 0 1", "a3c3", True),
+    ("cattura con torri in batteria", "3r2k1/8/8/3p4/8/8/3R4/3R2K1 w - - 0 1", "d2d5", False),
+    ("cattura con torre senza batteria", "3r2k1/8/8/3p4/8/8/3R4/6K1 w - - 0 1", "d2d5", True),
+    ("presa en passant ripresa", "4k3/2p5/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", False),
+    ("promozione in presa", "r5k1/4P3/8/8/8/8/8/6K1 w - - 0 1", "e7e8q", True),
+    ("promozione difesa", "r5k1/4P3/8/8/8/8/8/4R1K1 w - - 0 1", "e7e8q", False),
+]
+
+
+def build_corpus(games: int = 30, max_plies: int = 80, seed: int = CORPUS_SEED) -> List[chess.Board]:
+    """
+    Costruisce il corpus di posizioni: le FEN di riferimento più le posizioni di
+    partite casuali generate con un seme fisso (preferendo le catture, per avere scambi).
+
+    Args:
+        games: Numero di partite generate
+        max_plies: Lunghezza massima di ogni partita
+        seed: Seme del generatore casuale
+
+    Returns:
+        Lista di scacchiere
+    """
+    rng = random.Random(seed)
+    corpus = [chess.Board(fen) for fen in CORPUS_FENS]
+    for _ in range(games):
+        board = chess.Board()
+        for _ in range(max_plies):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            captures = [m for m in moves if board.is_capture(m)]
+            board.push(rng.choice(captures if captures and rng.random() < 0.5 else moves))
+            corpus.append(board.copy(stack=False))
+    return corpus
+
+
+def legacy_is_piece_safe(board: chess.Board, square: chess.Square, played_move: Optional[chess.Move] = None) -> bool:
+    """Sicurezza di un pezzo come calcolata prima della SEE (conteggi e casi speciali)."""
+    piece = board.piece_at(square)
+    if not piece:
+        return True
+
+    direct_attackers = get_attacking_moves(board, square, not piece.color, transitive=False)
+    all_attackers = get_attacking_moves(board, square, not piece.color, transitive=True)
+    defenders = get_defending_moves(board, square, piece.color)
+
+    if played_move:
+        captured_piece = board.piece_at(played_move.to_square)
+        if (captured_piece and
+            piece.piece_type == chess.ROOK and
+            PIECE_VALUES.get(captured_piece.piece_type, 0) == PIECE_VALUES[chess.KNIGHT] and
+            len(all_attackers) == 1 and len(defenders) > 0 and
+            len([a for a in all_attackers if board.piece_at(a) and
+                 PIECE_VALUES[board.piece_at(a).piece_type] == PIECE_VALUES[chess.KNIGHT]]) > 0):
+            return True
+
+    for attacker_square in direct_attackers:
+        attacker_piece = board.piece_at(attacker_square)
+        if attacker_piece and PIECE_VALUES[attacker_piece.piece_type] < PIECE_VALUES[piece.piece_type]:
+            return False
+
+    if len(all_attackers) <= len(defenders):
+        return True
+
+    if direct_attackers:
+        lowest_attacker_value = min(
+            PIECE_VALUES[board.piece_at(sq).piece_type]
+            for sq in direct_attackers
+            if board.piece_at(sq)
+        )
+        if (PIECE_VALUES[piece.piece_type] < lowest_attacker_value and
+            any(board.piece_at(def_sq) and
+                PIECE_VALUES[board.piece_at(def_sq).piece_type] < lowest_attacker_value
+                for def_sq in defenders)):
+            return True
+
+    if any(board.piece_at(def_sq) and board.piece_at(def_sq).piece_type == chess.PAWN
+           for def_sq in defenders):
+        return True
+
+    return False
+
+
+def legacy_get_unsafe_pieces(board: chess.Board, color: chess.Color) -> List[chess.Square]:
+    """get_unsafe_pieces come calcolata prima della SEE (un controllo per pezzo)."""
+    return [
+        square for square in chess.SQUARES
+        if board.piece_at(square) and board.piece_at(square).color == color and
+        board.piece_at(square).piece_type not in [chess.PAWN, chess.KING] and
+        not legacy_is_piece_safe(board, square)
+    ]
+
+
+def legacy_is_sacrifice_move(board: chess.Board, move: chess.Move) -> bool:
+    """Riconoscimento dei sacrifici come calcolato prima della SEE (cattura simulata su una copia)."""
+    moved_piece = board.piece_at(move.from_square)
+    if not moved_piece or moved_piece.piece_type == chess.KING:
+        return False
+
+    captured_piece = board.piece_at(move.to_square)
+    temp_board = board.copy()
+    temp_board.push(move)
+    opponent_attackers = temp_board.attackers(not board.turn, move.to_square)
+    if not opponent_attackers:
+        return False
+
+    moved_value = PIECE_VALUES[moved_piece.piece_type]
+    captured_value = PIECE_VALUES[captured_piece.piece_type] if captured_piece else 0
+    min_attacker_value = min(PIECE_VALUES[temp_board.piece_type_at(sq)] for sq in opponent_attackers)
+    if min_attacker_value < moved_value:
+        return moved_value - captured_value - min_attacker_value >= SACRIFICE_MIN_VALUE
+    return False
+
+
+def time_calls(func: Callable, cases: List[Tuple], repeat: int) -> Tuple[float, list]:
+    """
+    Esegue func su tutti i casi repeat volte.
+
+    Returns:
+        Tupla (miglior tempo in secondi di un passaggio completo, risultati dell'ultimo passaggio)
+    """
+    best = float('inf')
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(*case) for case in cases]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def check_known_sacrifices(classifier: AdvancedMoveClassifier) -> List[str]:
+    """
+    Verifica il riconoscimento dei sacrifici sulle posizioni di KNOWN_SACRIFICES.
+
+    Args:
+        classifier: Classificatore da verificare
+
+    Returns:
+        Descrizioni dei casi con verdetto diverso da quello atteso (vuota se tutti concordano)
+    """
+    failures = []
+    for description, fen, uci, expected in KNOWN_SACRIFICES:
+        if classifier._is_sacrifice_move(chess.Board(fen), chess.Move.from_uci(uci)) != expected:
+            failures.append(f"{description} ({uci}): atteso {'sacrificio' if expected else 'nessun sacrificio'}")
+    return failures
+
+
+def run(games: int, repeat: int) -> None:
+    corpus = build_corpus(games)
+    classifier = AdvancedMoveClassifier()
+
+    square_cases = [(board, square) for board in corpus
+                    for square in chess.SQUARES if board.piece_type_at(square)]
+    color_cases = [(board, color) for board in corpus for color in chess.COLORS]
+    move_cases = [(board, move) for board in corpus for move in board.legal_moves]
+
+    benchmarks = [
+        ("is_piece_safe", square_cases, legacy_is_piece_safe, is_piece_safe),
+        ("get_unsafe_pieces", color_cases, legacy_get_unsafe_pieces, get_unsafe_pieces),
+        ("sacrificio", move_cases, legacy_is_sacrifice_move, classifier._is_sacrifice_move),
+    ]
+
+    print(f"Corpus: {len(corpus)} posizioni, {len(square_cases)} pezzi, {len(move_cases)} mosse "
+          f"(miglior tempo su {repeat} ripetizioni)")
+    print(f"{'controllo':<20}{'casi':>8}{'prima (ms)':>13}{'SEE (ms)':>11}{'rapporto':>10}{'concordanza':>13}")
+    for name, cases, legacy, current in benchmarks:
+        legacy_time, legacy_results = time_calls(legacy, cases, repeat)
+        current_time, current_results = time_calls(current, cases, repeat)
+        agreement = sum(a == b for a, b in zip(legacy_results, current_results)) / len(cases) if cases else 1.0
+        ratio = legacy_time / current_time if current_time else float('inf')
+        print(f"{name:<20}{len(cases):>8}{legacy_time * 1000:>13.1f}{current_time * 1000:>11.1f}"
+              f"{ratio:>9.1f}x{agreement:>12.1%}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.analysis.see_benchmark",
+        description="Confronta i controlli di sicurezza e sacrificio basati sulla SEE con quelli precedenti."
+    )
+    parser.add_argument("--games", type=int, default=30,
+                        help="Partite casuali (a seme fisso) aggiunte al corpus (default: 30)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Ripetizioni di ogni misura, si tiene la migliore (default: 3)")
+    parser.add_argument("--check", action="store_true",
+                        help="Verifica solo i verdetti attesi sulle posizioni note, senza benchmark")
+    args = parser.parse_args(argv)
+
+    failures = check_known_sacrifices(AdvancedMoveClassifier())
+    for failure in failures:
+        print(f"ERRORE: {failure}", file=sys.stderr)
+    print(f"Posizioni note: {len(KNOWN_SACRIFICES) - len(failures)}/{len(KNOWN_SACRIFICES)} verdetti attesi")
+    if failures:
+        return 1
+    if not args.check:
+        run(args.games, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# static_exchange.py
+"""
+Static Exchange Evaluation (SEE).
+Calcola il bilancio materiale di una sequenza di catture su una casa, in cui
+ogni lato cattura sempre con il pezzo di valore minore e può fermarsi quando
+continuare non gli conviene (algoritmo della swap list).
+
+Le catture vengono simulate togliendo i pezzi dalla bitboard di occupazione:
+gli attaccanti nascosti dietro un pezzo appena mosso (x-ray, batterie) entrano
+nello scambio automaticamente, senza copiare la scacchiera. Le inchiodature non
+vengono considerate, come nella SEE classica.
+"""
+
+import chess
+from typing import Dict, List, Optional, Tuple
+from src.analysis.attackers_defenders import attackers_mask
+from src.config import PIECE_VALUES
+
+def _piece_bitboards(board: chess.BaseBoard) -> List[Tuple[chess.PieceType, chess.Bitboard]]:
+    """Bitboard di ogni tipo di pezzo, in ordine di valore crescente: il primo presente tra gli attaccanti cattura."""
+    return [(chess.PAWN, board.pawns), (chess.KNIGHT, board.knights), (chess.BISHOP, board.bishops),
+            (chess.ROOK, board.rooks), (chess.QUEEN, board.queens), (chess.KING, board.kings)]
+
+
+def _exchange(board: chess.BaseBoard, square: chess.Square, side: chess.Color,
+              occupied: chess.Bitboard, target_value: int,
+              piece_bitboards: Optional[List[Tuple[chess.PieceType, chess.Bitboard]]] = None) -> int:
+    """
+    Risolve lo scambio su una casa, a partire dal lato che può catturare per primo.
+
+    Args:
+        board: Scacchiera corrente (fornisce i tipi e i colori dei pezzi)
+        square: Casa su cui avvengono le catture
+        side: Lato che cattura per primo
+        occupied: Occupazione al momento della prima cattura
+        target_value: Valore del pezzo che si trova sulla casa
+        piece_bitboards: Bitboard per tipo di pezzo (vedi _piece_bitboards), calcolate
+            se omesse e la casa è attaccata
+
+    Returns:
+        Guadagno di side (mai negativo: può sempre rinunciare a catturare)
+    """
+    gains = []
+    on_square = target_value
+    attackers = attackers_mask(board, side, square, occupied)
+    if attackers and piece_bitboards is None:
+        piece_bitboards = _piece_bitboards(board)
+    while attackers:
+        for piece_type, pieces in piece_bitboards:
+            least_valuable = attackers & pieces
+            if least_valuable:
+                break
+        from_bb = least_valuable & -least_valuable
+        occupied &= ~from_bb
+        defenders = attackers_mask(board, not side, square, occupied)
+        # Il re cattura solo se la casa non è più difesa
+        if piece_type == chess.KING and defenders:
+            break
+        gains.append(on_square)
+        on_square = PIECE_VALUES[piece_type]
+        side = not side
+        attackers = defenders
+
+    # Ogni lato, a ritroso, sceglie tra catturare e fermarsi
+    score = 0
+    for gain in reversed(gains):
+        score = max(0, gain - score)
+    return score
+
+
+def see_square(board: chess.Board, square: chess.Square, attacking_color: Optional[chess.Color] = None) -> int:
+    """
+    Valuta quanto materiale guadagna l'avversario catturando il pezzo su una casa.
+
+    Args:
+        board: Scacchiera corrente
+        square: Casa del pezzo da valutare
+        attacking_color: Lato che cattura (default: l'avversario del pezzo)
+
+    Returns:
+        Guadagno in centipawns del lato che cattura, 0 se la casa è vuota o se
+        catturare non conviene
+    """
+    piece_type = board.piece_type_at(square)
+    if not piece_type:
+        return 0
+    if attacking_color is None:
+        attacking_color = not board.color_at(square)
+    return _exchange(board, square, attacking_color, board.occupied, PIECE_VALUES[piece_type])
+
+
+def see(board: chess.Board, move: chess.Move) -> int:
+    """
+    Valuta il bilancio materiale di una mossa seguita dal miglior scambio sulla casa di arrivo.
+    La mossa è obbligata, le catture successive no.
+
+    Args:
+        board: Scacchiera prima della mossa
+        move: Mossa da valutare (una cattura o un semplice spostamento)
+
+    Returns:
+        Materiale guadagnato (positivo) o perso (negativo) in centipawns dal lato che muove
+    """
+    moving_type = board.piece_type_at(move.from_square)
+    if not moving_type:
+        return 0
+    mover = board.color_at(move.from_square)
+    occupied = board.occupied & ~chess.BB_SQUARES[move.from_square]
+
+    if board.is_en_passant(move):
+        captured_value = PIECE_VALUES[chess.PAWN]
+        occupied &= ~chess.BB_SQUARES[move.to_square ^ 8]  # Pedone catturato en passant
+    else:
+        captured_type = board.piece_type_at(move.to_square)
+        captured_value = PIECE_VALUES[captured_type] if captured_type else 0
+
+    if move.promotion:
+        # Il pedone diventa un altro pezzo: la promozione vale come materiale guadagnato
+        captured_value += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+        moving_type = move.promotion
+
+    occupied |= chess.BB_SQUARES[move.to_square]
+    return captured_value - _exchange(board, move.to_square, not mover, occupied, PIECE_VALUES[moving_type])
+
+
+def exchange_map(board: chess.Board, color: Optional[chess.Color] = None) -> Dict[chess.Square, int]:
+    """
+    Valuta in un solo passaggio tutti i pezzi della scacchiera (re esclusi), condividendo
+    tra le case le bitboard dei pezzi.
+
+    Args:
+        board: Scacchiera corrente
+        color: Se indicato, valuta solo i pezzi di questo colore
+
+    Returns:
+        Dizionario casa -> guadagno dell'avversario catturando il pezzo su quella casa
+        (vedi see_square)
+    """
+    piece_bitboards = _piece_bitboards(board)
+    occupied = board.occupied
+    result = {}
+    for piece_type, pieces in piece_bitboards[:-1]:
+        value = PIECE_VALUES[piece_type]
+        for piece_color in (chess.COLORS if color is None else (color,)):
+            for square in chess.scan_forward(pieces & board.occupied_co[piece_color]):
+                result[square] = _exchange(board, square, not piece_color, occupied, value, piece_bitboards)
+    return result
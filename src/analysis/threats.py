@@ -0,0 +1,303 @@
+# threats.py
+"""
+Analisi delle minacce su tutta la scacchiera in un solo passaggio.
+
+Gli scambi su tutti i pezzi vengono risolti una volta sola (vedi
+static_exchange.exchange_map). Per ogni mossa di fuga di un pezzo non sicuro si
+ricalcolano solo le case su cui la mossa può cambiare lo scambio, cioè quelle
+sulle linee e sui salti di cavallo delle case di partenza e di arrivo. Tutte le
+mosse vengono provate con push/pop sulla stessa copia della scacchiera.
+
+La scansione di una posizione è condivisa tramite safety_memo (vedi threat_scan):
+get_unsafe_pieces, is_piece_trapped e i livelli di pericolo (danger_levels) passano da qui.
+"""
+
+import chess
+from typing import Any, Dict, List, Tuple
+from src.analysis.static_exchange import exchange_map, see_square
+from src.analysis.piece_safety import is_favourable_sacrifice
+from src.analysis.safety_memo import memoized
+from src.analysis.mate_threats import forces_mate
+from src.config import PIECE_VALUES
+
+# Case da cui un pezzo può attaccare (o vedere attraverso) una casa: linee e salti di cavallo
+_REACH = [
+    chess.BB_RANK_ATTACKS[sq][0] | chess.BB_FILE_ATTACKS[sq][0] | chess.BB_DIAG_ATTACKS[sq][0] |
+    chess.BB_KNIGHT_ATTACKS[sq] | chess.BB_SQUARES[sq]
+    for sq in chess.SQUARES
+]
+
+
+class ThreatScan:
+    """
+    Stato condiviso dall'analisi delle minacce di una posizione: scambi già risolti,
+    pezzi non sicuri e scacchiere di lavoro su cui provare le mosse.
+    """
+
+    def __init__(self, board: chess.Board):
+        """
+        Args:
+            board: Posizione da analizzare (non viene modificata)
+        """
+        # Copia: la scansione può essere condivisa tramite safety_memo anche dopo che il
+        # chiamante ha modificato la propria scacchiera
+        self.board = board.copy(stack=False)
+        self._exchanges = {}  # Colore -> scambi sui suoi pezzi, risolti al primo uso
+        # Le mosse di fuga e quelle dei livelli di pericolo vengono giocate sulla scacchiera
+        # con il turno originale: il colore che agisce è quello al tratto
+        self.acting_color = board.turn
+        self._work = None
+        self._movers = {}
+
+    def exchanges_of(self, color: chess.Color) -> Dict[chess.Square, int]:
+        """
+        Scambi sui pezzi di un colore, come exchange_map(board, color), risolti una volta sola.
+
+        Args:
+            color: Colore dei pezzi
+
+        Returns:
+            Dizionario casa -> guadagno dell'avversario catturando il pezzo
+        """
+        if color not in self._exchanges:
+            self._exchanges[color] = exchange_map(self.board, color)
+        return self._exchanges[color]
+
+    @property
+    def exchanges(self) -> Dict[chess.Square, int]:
+        """Scambi sui pezzi di entrambi i colori (vedi exchange_map)."""
+        return {**self.exchanges_of(chess.WHITE), **self.exchanges_of(chess.BLACK)}
+
+    def unsafe_pieces(self, color: chess.Color) -> List[chess.Square]:
+        """
+        Pezzi non sicuri di un colore, come get_unsafe_pieces(board, color).
+
+        Args:
+            color: Colore dei pezzi
+
+        Returns:
+            Case dei pezzi non sicuri (pedoni e re esclusi), in ordine crescente
+        """
+        pawns = self.board.pawns
+        return sorted(
+            square for square, gain in self.exchanges_of(color).items()
+            if gain > 0 and not pawns & chess.BB_SQUARES[square]
+        )
+
+    def _mover_board(self, color: chess.Color) -> chess.Board:
+        """Scacchiera di lavoro con il tratto a color, per generare e provare le mosse dei suoi pezzi."""
+        if color == self.board.turn:
+            return self._work_board()
+        if color not in self._movers:
+            mover = self.board.copy(stack=False)
+            mover.turn = color
+            self._movers[color] = mover
+        return self._movers[color]
+
+    def _work_board(self) -> chess.Board:
+        """Scacchiera di lavoro con il turno originale, creata al primo uso."""
+        if self._work is None:
+            self._work = self.board.copy(stack=False)
+        return self._work
+
+    def escapes(self, square: chess.Square, danger_levels: bool = True,
+                stop_at_rescue: bool = False) -> Tuple[List[chess.Move], List[chess.Move]]:
+        """
+        Classifica le mosse del pezzo su una casa.
+
+        Args:
+            square: Casa del pezzo
+            danger_levels: Se True, individua anche le fughe che creano una minaccia maggiore
+            stop_at_rescue: Se True, si ferma alla prima fuga che salva il pezzo
+
+        Returns:
+            Tupla (fughe su case sicure, di queste quelle che creano una minaccia maggiore
+            e che quindi non salvano il pezzo)
+        """
+        piece = self.board.piece_at(square)
+        if not piece:
+            return [], []
+        mover = self._mover_board(piece.color)
+        safe_moves, counter_threats = [], []
+
+        for move in list(mover.generate_legal_moves(chess.BB_SQUARES[square])):
+            # Non considerare le catture del re (illegali)
+            if mover.piece_type_at(move.to_square) == chess.KING:
+                continue
+
+            mover.push(move)
+            try:
+                # In questa posizione la mossa non può essere un sacrificio favorevole:
+                # basta lo scambio sulla casa di arrivo
+                safe = see_square(mover, move.to_square) <= 0
+            finally:
+                mover.pop()
+            if not safe:
+                continue
+
+            safe_moves.append(move)
+            if danger_levels and self.creates_greater_threat(square, move):
+                counter_threats.append(move)
+            elif stop_at_rescue:
+                break
+
+        return safe_moves, counter_threats
+
+    def _affected(self, work: chess.Board, move: chess.Move, wide: bool) -> chess.Bitboard:
+        """
+        Pezzi del colore che agisce (pedoni e re esclusi) il cui scambio può essere cambiato
+        dalla mossa, già giocata su work.
+
+        Args:
+            work: Scacchiera di lavoro dopo la mossa
+            move: Mossa giocata
+            wide: Se True (arrocco, presa en passant) considera tutti i pezzi, perché la mossa
+                libera anche case diverse da quelle di partenza e di arrivo
+        """
+        affected = work.occupied_co[self.acting_color]
+        if not wide:
+            # Solo le case raggiungibili dalle case di partenza o di arrivo possono cambiare scambio:
+            # altrove un pezzo non sicuro dopo la mossa lo era già prima
+            affected &= _REACH[move.from_square] | _REACH[move.to_square]
+        return affected & ~(work.pawns | work.kings)
+
+    def _was_unsafe(self, square: chess.Square, value: int) -> bool:
+        """Il pezzo del colore che agisce su square era già non sicuro prima della mossa e valeva almeno value."""
+        board = self.board
+        return (self.exchanges_of(self.acting_color).get(square, 0) > 0 and
+                board.color_at(square) == self.acting_color and
+                board.piece_type_at(square) != chess.PAWN and
+                PIECE_VALUES[board.piece_type_at(square)] >= value)
+
+    def creates_greater_threat(self, square: chess.Square, move: chess.Move) -> bool:
+        """
+        Equivale a move_creates_greater_threat(board, square, move), riusando gli scambi già
+        risolti: vengono ricalcolati solo quelli che la mossa può cambiare.
+
+        Args:
+            square: Casa del pezzo minacciato
+            move: Mossa del colore al tratto da valutare
+
+        Returns:
+            True se la mossa crea una minaccia maggiore, False altrimenti
+        """
+        piece = self.board.piece_at(square)
+        if not piece:
+            return False
+        value = PIECE_VALUES[piece.piece_type]
+        work = self._work_board()
+        wide = work.is_castling(move) or work.is_en_passant(move)
+
+        work.push(move)
+        try:
+            # Come in get_unsafe_pieces con la mossa giocata, contano solo i pezzi che valgono
+            # più di quello arrivato sulla casa di destinazione (il pezzo promosso, se c'è)
+            arrived_value = PIECE_VALUES[work.piece_type_at(move.to_square)]
+            for other in chess.scan_forward(self._affected(work, move, wide)):
+                other_value = PIECE_VALUES[work.piece_type_at(other)]
+                if other_value <= arrived_value or other_value < value or other == square:
+                    continue
+                if see_square(work, other) <= 0 or is_favourable_sacrifice(work, other, move):
+                    continue
+                # Minaccia nuova se prima della mossa il pezzo non era già non sicuro
+                if not self._was_unsafe(other, value):
+                    return True
+
+            # Sacrificio di pezzo di valore inferiore che porta a matto
+            return value < PIECE_VALUES[chess.QUEEN] and forces_mate(work)
+        finally:
+            work.pop()
+
+    def leaves_greater_threat(self, square: chess.Square, move: chess.Move) -> bool:
+        """
+        Equivale a move_leaves_greater_threat(board, square, move): i pezzi che la mossa
+        non può toccare conservano lo scambio già risolto.
+
+        Args:
+            square: Casa del pezzo minacciato
+            move: Mossa del colore al tratto da valutare
+
+        Returns:
+            True se dopo la mossa rimangono minacce maggiori, False altrimenti
+        """
+        piece = self.board.piece_at(square)
+        if not piece:
+            return False
+        value = PIECE_VALUES[piece.piece_type]
+        work = self._work_board()
+        wide = work.is_castling(move) or work.is_en_passant(move)
+
+        work.push(move)
+        try:
+            affected = self._affected(work, move, wide)
+            pieces = work.occupied_co[self.acting_color] & ~(work.pawns | work.kings)
+            for other in chess.scan_forward(pieces & ~chess.BB_SQUARES[square]):
+                if PIECE_VALUES[work.piece_type_at(other)] < value:
+                    continue
+                if affected & chess.BB_SQUARES[other]:
+                    if see_square(work, other) > 0:
+                        return True
+                elif self._was_unsafe(other, value):
+                    return True
+
+            # Sacrificio che porta a matto
+            return value < PIECE_VALUES[chess.QUEEN] and forces_mate(work)
+        finally:
+            work.pop()
+
+    def is_trapped(self, square: chess.Square, danger_levels: bool = True) -> bool:
+        """
+        Pezzo non sicuro senza fughe utili, come is_piece_trapped(board, square, danger_levels).
+        """
+        safe_moves, counter_threats = self.escapes(square, danger_levels, stop_at_rescue=True)
+        return len(safe_moves) == len(counter_threats)
+
+
+def threat_scan(board: chess.Board) -> ThreatScan:
+    """
+    Restituisce la scansione delle minacce di una posizione, condivisa tramite safety_memo
+    da get_unsafe_pieces, is_piece_trapped e analyze_threats.
+
+    Args:
+        board: Scacchiera corrente
+
+    Returns:
+        La scansione della posizione
+    """
+    return memoized("scan", board, (), lambda: ThreatScan(board))
+
+
+def analyze_threats(board: chess.Board) -> Dict[str, Any]:
+    """
+    Analizza in un solo passaggio pezzi non sicuri, intrappolati e livelli di pericolo
+    di entrambi i colori. Pedoni e re non vengono analizzati.
+
+    Args:
+        board: Scacchiera corrente
+
+    Returns:
+        Dizionario (da non modificare: può essere condiviso tramite safety_memo) con:
+        'exchanges': casa -> guadagno dell'avversario catturando il pezzo (vedi exchange_map);
+        'unsafe': colore -> case dei pezzi non sicuri;
+        'escapes': casa di un pezzo non sicuro -> mosse verso case sicure;
+        'danger': casa di un pezzo non sicuro -> fughe che creano una minaccia maggiore;
+        'trapped': case dei pezzi intrappolati, in ordine crescente
+    """
+    return memoized("threats", board, (), lambda: _analyze_threats(board))
+
+
+def _analyze_threats(board: chess.Board) -> Dict[str, Any]:
+    scan = threat_scan(board)
+    unsafe = {color: scan.unsafe_pieces(color) for color in chess.COLORS}
+    escapes, danger, trapped = {}, {}, []
+    for square in sorted(unsafe[chess.WHITE] + unsafe[chess.BLACK]):
+        escapes[square], danger[square] = scan.escapes(square)
+        if len(escapes[square]) == len(danger[square]):
+            trapped.append(square)
+    return {
+        'exchanges': scan.exchanges,
+        'unsafe': unsafe,
+        'escapes': escapes,
+        'danger': danger,
+        'trapped': trapped,
+    }
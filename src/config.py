@@ -6,7 +6,10 @@ Contiene tutte le costanti, i percorsi, i colori e le impostazioni dell'AI.
 
 # --- COSTANTI DI CONFIGURAZIONE INTERFACCIA ---
 BOARD_SIZE = 720  # Dimensione della scacchiera in pixel
-SQUARE_SIZE = BOARD_SIZE // 8  # Dimensione di ogni casella
+SQUARE_SIZE = BOARD_SIZE // 8  # Dimensione iniziale di ogni casella
+BOARD_MIN_SIZE = 320  # Dimensione minima della scacchiera ridimensionabile
+BOARD_SIZE_STEP = 12  # Passo di ridimensionamento delle caselle a partire da SQUARE_SIZE (pochi formati in cache)
+BOARD_RESIZE_DEBOUNCE_MS = 120  # Attesa dopo l'ultimo evento di ridimensionamento prima di ridisegnare
 ASSET_PATH = "assets"  # Percorso base per le risorse
 PIECES_PATH = "assets/pieces"  # Percorso per le immagini dei pezzi
 CLASSIFICATIONS_PATH = "assets/classifications"  # Percorso per le immagini di classificazione
@@ -35,18 +38,48 @@ GAME_WINDOW_GEOMETRY = "1150x800"
 EVAL_QUEUE_PROCESS_DELAY = 100
 AI_MOVE_DELAY_CVC = 1000
 AI_MOVE_DELAY_NORMAL = 1000  # 1 secondo totale per esperienza più naturale
+AI_MOVE_POLL_INTERVAL = 15  # Controllo del completamento della ricerca dell'AI oltre il ritardo minimo
 REVIEW_QUEUE_PROCESS_DELAY = 100
 ANIMATION_DURATION_MS = 300
 ANIMATION_DELAY_MS = 10
+ANIMATION_FRAME_MS = 16  # ~60 FPS per l'animazione delle mosse
 
 # Valori di default
 DEFAULT_AI_LEVEL = 5
 DEFAULT_PLAYER_COLOR = "white"
 STOCKFISH_ANALYZER_THREADS = 1
+STOCKFISH_REVIEW_WORKERS = 0  # Motori paralleli (Threads=1) per la Game Review, 0 = uno per core
+REVIEW_ANALYSIS_DEPTH = 14  # Profondità di analisi della Game Review
 MAIN_CONTAINER_PADDING = 10
 TOP_MOVES_COUNT = 3
 ANALYSIS_DEPTH = 15
 
+# --- COSTANTI PER IL POOL DI PROCESSI STOCKFISH ---
+STOCKFISH_POOL_MAX_SIZE = 8  # Numero massimo di processi per pool (limitato anche dai core disponibili)
+STOCKFISH_POOL_MIN_IDLE = 1  # Processi da mantenere caldi anche quando inattivi
+STOCKFISH_POOL_IDLE_TIMEOUT = 60  # Secondi di inattività prima di chiudere un processo
+UCI_COMMAND_TIMEOUT = 10  # Secondi massimi di attesa per handshake e "isready" del motore
+STOCKFISH_POOL_DEFAULT_PARAMS = {  # Opzioni ripristinate alla restituzione di ogni processo
+    "Skill Level": 20,
+    "UCI_LimitStrength": "false",
+    "MultiPV": 1,
+}
+
+# --- COSTANTI PER LA CACHE PERSISTENTE DELLE VALUTAZIONI ---
+EVAL_CACHE_ENABLED = True  # Salva su disco le analisi per non ripeterle
+EVAL_CACHE_PATH = "cache/evaluations.sqlite3"  # Percorso del database SQLite
+EVAL_CACHE_MAX_ENTRIES = 500000  # Numero massimo di posizioni conservate
+EVAL_CACHE_EVICTION_RATIO = 0.9  # Frazione del limite a cui si scende quando si eliminano voci
+EVAL_CACHE_FLUSH_BATCH = 256  # Modifiche tenute in memoria prima di scriverle sul database
+EVAL_CACHE_FLUSH_INTERVAL = 5.0  # Secondi massimi tra due scritture delle modifiche in memoria
+LIVE_ANALYSIS_CACHE_SIZE = 4096  # Posizioni tenute in memoria per l'analisi live (LRU)
+LIVE_ANALYSIS_MAX_DEPTH = 30  # Profondità a cui si ferma l'analisi live in streaming (None = infinita)
+
+# --- COSTANTI PER LA CACHE DELLE IMMAGINI ---
+SPRITE_ATLAS_ENABLED = True  # Salva su disco le immagini già ridimensionate (un atlante per dimensione)
+SPRITE_ATLAS_DIR = "cache/sprites"  # Cartella degli atlanti
+SPRITE_CACHE_MAX_SIZES = 6  # Dimensioni diverse tenute in memoria (e atlanti su disco) per gruppo di immagini
+
 # --- COSTANTI PER LA BARRA DI VALUTAZIONE ---
 EVAL_BAR_WIDTH = 40
 EVAL_BAR_ANIMATION_SPEED = 0.1
@@ -177,6 +210,11 @@ PIECE_VALUES = {
     chess.KING: 20000
 }
 
+# --- COSTANTI PER LA MEMOIZZAZIONE DELLE ANALISI TATTICHE ---
+SAFETY_MEMO_MAX_ENTRIES = 50000  # Risultati (sicurezza, pezzi intrappolati, minacce) conservati per Game Review
+MATE_THREAT_CACHE_SIZE = 20000  # Posizioni di cui si ricorda la ricerca di matto in 1/2
+MATE_THREAT_DEPTH = 1  # Mosse entro cui un sacrificio deve forzare il matto per contare come minaccia
+
 # --- COSTANTI PER L'ANALISI DELLE MOSSE CRITICHE ---
 CRITICAL_EVAL_THRESHOLD = 700  # Soglia per posizioni completamente vincenti (centipawns)
 
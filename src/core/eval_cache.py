@@ -0,0 +1,392 @@
+# eval_cache.py
+"""
+Cache persistente su disco delle analisi di Stockfish.
+Le migliori mosse di ogni posizione vengono salvate in un database SQLite,
+indicizzate per posizione normalizzata, profondità, numero di linee (MultiPV)
+e identità del motore, così che le posizioni già analizzate (ad esempio le
+aperture comuni a molte partite) non vengano ricercate di nuovo.
+"""
+
+import os
+import json
+import atexit
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from src.config import (
+    STOCKFISH_PATH, EVAL_CACHE_ENABLED, EVAL_CACHE_PATH, EVAL_CACHE_MAX_ENTRIES,
+    EVAL_CACHE_EVICTION_RATIO, EVAL_CACHE_FLUSH_BATCH, EVAL_CACHE_FLUSH_INTERVAL,
+    LIVE_ANALYSIS_CACHE_SIZE
+)
+from src.core.stockfish_manager import top_move_to_evaluation
+
+
+def position_key(fen: str) -> str:
+    """
+    Normalizza una FEN eliminando i contatori delle mosse.
+    Due posizioni identiche raggiunte con ordini di mosse diversi hanno la stessa chiave.
+
+    Args:
+        fen: FEN completa della posizione
+
+    Returns:
+        I primi quattro campi della FEN (pezzi, turno, arrocchi, en passant)
+    """
+    return " ".join(fen.split()[:4])
+
+
+def engine_identity(engine) -> str:
+    """
+    Restituisce un identificativo del motore, per non mescolare analisi di versioni diverse.
+
+    Args:
+        engine: Motore UCI (vedi UCIEngine)
+
+    Returns:
+        Stringa del tipo "stockfish.exe-16"
+    """
+    return f"{os.path.basename(STOCKFISH_PATH)}-{engine.version}"
+
+
+class EvaluationCache:
+    """
+    Archivio persistente delle migliori mosse per posizione.
+
+    Le voci meno usate di recente vengono eliminate quando il numero di righe
+    supera il limite configurato. È sicuro da usare da più thread.
+
+    get e put vengono chiamati anche dal ciclo asyncio che pilota i motori: per non
+    bloccarlo con un commit a ogni accesso, le nuove voci e gli aggiornamenti di
+    last_used restano in memoria e vengono scritti insieme, in un'unica transazione,
+    ogni EVAL_CACHE_FLUSH_BATCH modifiche o EVAL_CACHE_FLUSH_INTERVAL secondi.
+    """
+
+    def __init__(self, path: str = EVAL_CACHE_PATH, max_entries: int = EVAL_CACHE_MAX_ENTRIES):
+        """
+        Apre (o crea) il database della cache.
+
+        Args:
+            path: Percorso del file SQLite
+            max_entries: Numero massimo di posizioni conservate
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        # Modifiche non ancora scritte: chiave -> (top_moves in JSON, last_used) e chiave -> last_used
+        self._pending_rows = {}
+        self._pending_touches = {}
+        self._last_flush = time.monotonic()
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS evaluations ("
+            " key TEXT PRIMARY KEY,"
+            " top_moves TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON evaluations(last_used)")
+        self._connection.commit()
+        self._entries = self._connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+    @staticmethod
+    def _make_key(fen: str, depth: int, multipv: int, engine_id: str) -> str:
+        return f"{engine_id}|{depth}|{multipv}|{position_key(fen)}"
+
+    def get(self, fen: str, depth: int, multipv: int, engine_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Cerca le migliori mosse già calcolate per una posizione.
+
+        Args:
+            fen: FEN della posizione
+            depth: Profondità della ricerca
+            multipv: Numero di linee richieste
+            engine_id: Identità del motore (vedi engine_identity)
+
+        Returns:
+            Lista nel formato di get_top_moves(), o None se assente
+        """
+        key = self._make_key(fen, depth, multipv, engine_id)
+        now = time.time()
+        with self._lock:
+            pending = self._pending_rows.get(key)
+            if pending is not None:
+                data = pending[0]
+                self._pending_rows[key] = (data, now)
+            else:
+                row = self._connection.execute("SELECT top_moves FROM evaluations WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._stats['misses'] += 1
+                    return None
+                data = row[0]
+                self._pending_touches[key] = now
+            self._stats['hits'] += 1
+            self._maybe_flush_locked()
+        return json.loads(data)
+
+    def put(self, fen: str, depth: int, multipv: int, engine_id: str, top_moves: List[Dict[str, Any]]):
+        """
+        Salva le migliori mosse di una posizione, eliminando le voci più vecchie se necessario.
+
+        Args:
+            fen: FEN della posizione
+            depth: Profondità della ricerca
+            multipv: Numero di linee richieste
+            engine_id: Identità del motore (vedi engine_identity)
+            top_moves: Lista nel formato di get_top_moves()
+        """
+        key = self._make_key(fen, depth, multipv, engine_id)
+        data = json.dumps(top_moves)
+        with self._lock:
+            self._pending_rows[key] = (data, time.time())
+            self._pending_touches.pop(key, None)
+            self._stats['stores'] += 1
+            self._maybe_flush_locked()
+
+    def flush(self):
+        """Scrive sul database le voci e gli aggiornamenti di last_used ancora in memoria."""
+        with self._lock:
+            self._flush_locked()
+
+    def _maybe_flush_locked(self):
+        """Scrive le modifiche in sospeso se sono abbastanza o se è passato abbastanza tempo."""
+        if (len(self._pending_rows) + len(self._pending_touches) >= EVAL_CACHE_FLUSH_BATCH or
+                time.monotonic() - self._last_flush >= EVAL_CACHE_FLUSH_INTERVAL):
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Scrive le modifiche in sospeso in un'unica transazione ed elimina le voci in eccesso."""
+        self._last_flush = time.monotonic()
+        if not self._pending_rows and not self._pending_touches:
+            return
+        rows = [(key, data, last_used) for key, (data, last_used) in self._pending_rows.items()]
+        touches = [(last_used, key) for key, last_used in self._pending_touches.items()]
+        self._pending_rows.clear()
+        self._pending_touches.clear()
+        if rows:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO evaluations (key, top_moves, last_used) VALUES (?, ?, ?)", rows
+            )
+            # Conteggio approssimato per eccesso (le sostituzioni contano come inserimenti):
+            # il valore esatto viene ricalcolato prima di ogni eliminazione
+            self._entries += len(rows)
+        if touches:
+            self._connection.executemany("UPDATE evaluations SET last_used = ? WHERE key = ?", touches)
+        if self._entries > self.max_entries:
+            self._evict_locked()
+        self._connection.commit()
+
+    def _evict_locked(self):
+        """Elimina le voci usate meno di recente fino a scendere sotto il limite."""
+        self._entries = self._connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+        target = int(self.max_entries * EVAL_CACHE_EVICTION_RATIO)
+        excess = self._entries - target
+        if excess <= 0:
+            return
+        self._connection.execute(
+            "DELETE FROM evaluations WHERE key IN "
+            "(SELECT key FROM evaluations ORDER BY last_used LIMIT ?)", (excess,)
+        )
+        self._entries -= excess
+        self._stats['evictions'] += excess
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Restituisce i contatori della cache.
+
+        Returns:
+            Dizionario con hits, misses, stores, evictions, entries e hit_rate
+        """
+        with self._lock:
+            self._flush_locked()
+            entries = self._connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+            stats = dict(self._stats, entries=entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Elimina tutte le voci della cache."""
+        with self._lock:
+            self._pending_rows.clear()
+            self._pending_touches.clear()
+            self._connection.execute("DELETE FROM evaluations")
+            self._connection.commit()
+            self._entries = 0
+
+    def close(self):
+        """Scrive le modifiche in sospeso e chiude la connessione al database."""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._connection.close()
+            self._closed = True
+
+
+class AnalysisLRUCache:
+    """
+    Cache in memoria (LRU) delle analisi live, indicizzata per posizione.
+
+    Serve a ridisegnare immediatamente barra di valutazione e freccia della mossa
+    migliore quando si torna su una posizione già vista navigando nella cronologia.
+    Un risultato più profondo sostituisce sempre uno meno profondo, mai il contrario.
+    """
+
+    def __init__(self, max_size: int = LIVE_ANALYSIS_CACHE_SIZE):
+        """
+        Inizializza la cache vuota.
+
+        Args:
+            max_size: Numero massimo di posizioni conservate
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, fen: str) -> Optional[Dict[str, Any]]:
+        """
+        Cerca l'analisi di una posizione.
+
+        Args:
+            fen: FEN della posizione
+
+        Returns:
+            Dizionario con 'top_moves', 'depth' ed 'evaluation', o None se assente
+        """
+        key = position_key(fen)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def store(self, fen: str, top_moves: List[Dict[str, Any]], depth: int) -> bool:
+        """
+        Salva l'analisi di una posizione se è almeno profonda quanto quella presente.
+
+        Args:
+            fen: FEN della posizione
+            top_moves: Lista nel formato di get_top_moves()
+            depth: Profondità raggiunta dalla ricerca
+
+        Returns:
+            True se l'analisi è stata salvata, False se ne esisteva già una più profonda
+        """
+        if not top_moves:
+            return False
+        key = position_key(fen)
+        evaluation = top_move_to_evaluation(top_moves[0])
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and existing['depth'] > depth:
+                self._entries.move_to_end(key)
+                return False
+            self._entries[key] = {'top_moves': top_moves, 'depth': depth, 'evaluation': evaluation}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return True
+
+    def clear(self):
+        """Svuota la cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_evaluation_cache() -> Optional[EvaluationCache]:
+    """
+    Restituisce la cache condivisa dall'applicazione, aprendola alla prima richiesta.
+
+    Returns:
+        L'istanza condivisa, o None se la cache è disabilitata o non apribile
+    """
+    global _shared_cache
+    if not EVAL_CACHE_ENABLED:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            try:
+                _shared_cache = EvaluationCache()
+                # Le modifiche ancora in memoria vengono scritte all'uscita del programma
+                atexit.register(_shared_cache.close)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Avviso: impossibile aprire la cache delle valutazioni: {e}")
+                return None
+        return _shared_cache
+
+
+async def get_top_moves_cached(engine, fen: str, depth: int, num_top_moves: int) -> List[Dict[str, Any]]:
+    """
+    Ottiene le migliori mosse di una posizione passando prima dalla cache persistente.
+    In caso di miss esegue la ricerca con il motore e ne salva il risultato.
+
+    Args:
+        engine: Motore UCI preso in prestito dal pool
+        fen: FEN della posizione
+        depth: Profondità della ricerca
+        num_top_moves: Numero di linee richieste (MultiPV)
+
+    Returns:
+        Lista nel formato di get_top_moves()
+    """
+    top_moves = lookup_top_moves(engine, fen, depth, num_top_moves)
+    if top_moves is not None:
+        return top_moves
+
+    top_moves = await engine.analyse(fen, depth=depth, multipv=num_top_moves)
+    store_top_moves(engine, fen, depth, num_top_moves, top_moves)
+    return top_moves
+
+
+def lookup_top_moves(engine, fen: str, depth: int, num_top_moves: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Cerca nella cache persistente le migliori mosse di una posizione, senza usare il motore.
+
+    Args:
+        engine: Motore UCI (serve solo a identificarne la versione)
+        fen: FEN della posizione
+        depth: Profondità della ricerca
+        num_top_moves: Numero di linee richieste (MultiPV)
+
+    Returns:
+        Lista nel formato di get_top_moves(), o None se assente o se la cache è disabilitata
+    """
+    cache = get_evaluation_cache()
+    if cache is None:
+        return None
+    return cache.get(fen, depth, num_top_moves, engine_identity(engine))
+
+
+def store_top_moves(engine, fen: str, depth: int, num_top_moves: int, top_moves: List[Dict[str, Any]]):
+    """
+    Salva nella cache persistente il risultato di una ricerca.
+
+    Args:
+        engine: Motore UCI (serve solo a identificarne la versione)
+        fen: FEN della posizione
+        depth: Profondità raggiunta
+        num_top_moves: Numero di linee richieste (MultiPV)
+        top_moves: Lista nel formato di get_top_moves()
+    """
+    cache = get_evaluation_cache()
+    # Una ricerca vuota su una posizione non finale indica una profondità non raggiunta: non va salvata
+    if cache is not None and top_moves:
+        cache.put(fen, depth, num_top_moves, engine_identity(engine), top_moves)
@@ -5,8 +5,12 @@ Gestisce la scacchiera, le mosse, l'AI e lo stato della partita.
 """
 
 import chess
+from collections import Counter
 from src.config import AI_LEVELS, ANALYSIS_DEPTH
-from src.core.stockfish_manager import StockfishManager
+from src.core.stockfish_manager import StockfishManager, EngineUnavailableError
+from src.core.uci_client import UCIError
+from src.utils.utils import board_position_key
+from typing import Optional
 
 class GameLogic:
     """
@@ -18,16 +22,26 @@ class GameLogic:
         """Inizializza la logica di gioco con una nuova scacchiera."""
         self.board = chess.Board()
         self.undone_moves = []
+        # Notazione SAN delle mosse giocate, allineata a board.move_stack, e per ogni
+        # lettore la prima mossa modificata da undo/reset dopo la sua ultima lettura
+        # (vedi take_history_changes)
+        self.san_moves = []
+        self.history_changed_from = {}
+        # Conteggio incrementale delle posizioni per le ripetizioni e stato memorizzato
+        # della posizione corrente (ricalcolato solo quando la posizione cambia)
+        self.position_keys = []
+        self.position_counts = Counter()
+        self._status = None
+        self._game_over = None
+        # Mosse legali della posizione corrente, indicizzate alla prima richiesta
+        self._legal_index = None
+        self._reset_position_tracking()
         self.analysis_depth = ANALYSIS_DEPTH
         
-        # Usa StockfishManager per ottenere un'istanza cached
-        self.stockfish_player = StockfishManager.get_instance(
-            depth=self.analysis_depth,
-            threads=1,
-            key="game_player"
-        )
+        # Verifica la disponibilità di Stockfish lasciando un processo caldo nel pool
+        self.engine_available = StockfishManager.is_available()
         
-        if not self.stockfish_player:
+        if not self.engine_available:
             print("AVVISO: Stockfish non trovato per il gioco.")
             
     def get_piece_at(self, square):
@@ -42,6 +56,23 @@ class GameLogic:
         """
         return self.board.piece_at(square)
     
+    def _legal_moves_index(self):
+        """
+        Restituisce le mosse legali della posizione corrente, generate una sola volta
+        per posizione e indicizzate per casella di partenza e per coppia (partenza, arrivo).
+        
+        Returns:
+            Tupla (mosse per casella di partenza, mosse per (partenza, arrivo));
+            le promozioni hanno una mossa per ogni pezzo
+        """
+        if self._legal_index is None:
+            by_from, by_squares = {}, {}
+            for move in self.board.generate_legal_moves():
+                by_from.setdefault(move.from_square, []).append(move)
+                by_squares.setdefault((move.from_square, move.to_square), []).append(move)
+            self._legal_index = (by_from, by_squares)
+        return self._legal_index
+
     def get_legal_moves(self, square):
         """
         Restituisce tutte le mosse legali da una casella.
@@ -52,7 +83,32 @@ class GameLogic:
         Returns:
             Lista di mosse legali
         """
-        return [m for m in self.board.legal_moves if m.from_square == square]
+        return list(self._legal_moves_index()[0].get(square, ()))
+
+    def get_legal_moves_between(self, from_square, to_square):
+        """
+        Restituisce le mosse legali tra due caselle (più di una solo per le promozioni).
+        
+        Args:
+            from_square: Casella di partenza
+            to_square: Casella di arrivo
+            
+        Returns:
+            Lista di mosse legali, vuota se non ce ne sono
+        """
+        return list(self._legal_moves_index()[1].get((from_square, to_square), ()))
+
+    def is_legal(self, move):
+        """
+        Verifica se una mossa è legale nella posizione corrente.
+        
+        Args:
+            move: Mossa da verificare
+            
+        Returns:
+            True se la mossa è legale
+        """
+        return move in self._legal_moves_index()[1].get((move.from_square, move.to_square), ())
 
     def make_move(self, move):
         """
@@ -65,23 +121,86 @@ class GameLogic:
             True se la mossa è stata eseguita, False altrimenti
         """
         try:
-            self.board.push(move)
+            self._push(move)
             self.undone_moves.clear()
             return True
         except (ValueError, AssertionError):
             return False
 
-    def get_ai_move(self, level: int):
+    def _push(self, move):
+        """Esegue la mossa registrandone la notazione SAN (calcolata prima di giocarla)."""
+        san = self.board.san(move)
+        self.board.push(move)
+        self.san_moves.append(san)
+        key = board_position_key(self.board)
+        self.position_keys.append(key)
+        self.position_counts[key] += 1
+        self._status = self._game_over = self._legal_index = None
+
+    def _pop(self):
+        """Annulla l'ultima mossa aggiornando cronologia e conteggio delle posizioni."""
+        move = self.board.pop()
+        self.san_moves.pop()
+        for reader, changed_from in self.history_changed_from.items():
+            self.history_changed_from[reader] = min(changed_from, len(self.san_moves))
+        key = self.position_keys.pop()
+        self.position_counts[key] -= 1
+        if not self.position_counts[key]:
+            del self.position_counts[key]
+        self._status = self._game_over = self._legal_index = None
+        return move
+
+    def _reset_position_tracking(self):
+        """Riparte dalla posizione corrente come unica posizione vista."""
+        # Stessi criteri usati da python-chess per le ripetizioni (la posizione senza contatori,
+        # con l'en passant solo se davvero giocabile)
+        key = board_position_key(self.board)
+        self.position_keys = [key]
+        self.position_counts = Counter({key: 1})
+        self._status = self._game_over = self._legal_index = None
+
+    def take_history_changes(self, reader="history"):
+        """
+        Indica quante mosse iniziali della cronologia sono rimaste invariate dall'ultima chiamata
+        dello stesso lettore. Le mosse successive a quel numero sono state annullate o sostituite.
+        
+        Args:
+            reader: Nome di chi segue la cronologia (ognuno ha il proprio punto di lettura)
+        
+        Returns:
+            Numero di mosse di san_moves già valide all'ultima lettura (0 alla prima)
+        """
+        unchanged = self.history_changed_from.get(reader, 0)
+        self.history_changed_from[reader] = len(self.san_moves)
+        return unchanged
+
+    def get_ai_move(self, level: int, fen: Optional[str] = None):
+        """
+        Calcola la mossa migliore per l'AI attendendo il risultato (versione sincrona).
+        
+        Args:
+            level: Livello di difficoltà (1-8)
+            fen: Posizione da analizzare (default: posizione corrente)
+            
+        Returns:
+            Mossa calcolata dall'AI o None se non disponibile
+        """
+        return StockfishManager.run(self.get_ai_move_async(level, fen or self.board.fen()))
+
+    async def get_ai_move_async(self, level: int, fen: str):
         """
         Calcola la mossa migliore per l'AI in base a un livello di difficoltà predefinito.
+        Va eseguita sul loop dei motori; riceve la FEN della posizione per non leggere
+        la scacchiera mentre il thread principale la modifica.
         
         Args:
             level: Livello di difficoltà (1-8)
+            fen: Posizione da analizzare
             
         Returns:
             Mossa calcolata dall'AI o None se non disponibile
         """
-        if not self.stockfish_player:
+        if not self.engine_available:
             return None
 
         # 1. Ottieni i parametri per il livello selezionato
@@ -89,18 +208,19 @@ class GameLogic:
         if not params:
             print(f"AVVISO: Livello AI {level} non trovato. Uso i default.")
             # Imposta dei valori di default sicuri in caso di errore
-            self.stockfish_player.set_skill_level(20)
-            self.stockfish_player.set_depth(15)
-            movetime = 1000
+            skill, depth, movetime = 20, 15, 1000
         else:
-            # 2. Imposta i parametri in Stockfish
-            self.stockfish_player.set_skill_level(params["skill"])
-            self.stockfish_player.set_depth(params["depth"])
-            movetime = params["movetime"]
+            skill, depth, movetime = params["skill"], params["depth"], params["movetime"]
 
-        # 3. Imposta la posizione e calcola la mossa entro il tempo limite
-        self.stockfish_player.set_fen_position(self.board.fen())
-        best_move_uci = self.stockfish_player.get_best_move_time(movetime)
+        # 2. Prende in prestito un motore dal pool: le opzioni del livello valgono solo
+        #    per questo prestito e vengono ripristinate alla restituzione
+        try:
+            async with StockfishManager.lease(threads=1, **{"Skill Level": skill}) as engine:
+                # 3. Calcola la mossa entro la profondità e il tempo limite del livello
+                best_move_uci = await engine.best_move(fen, movetime=movetime, depth=depth)
+        except (EngineUnavailableError, UCIError) as e:
+            print(f"AVVISO: {e}")
+            return None
         
         if best_move_uci:
             return chess.Move.from_uci(best_move_uci)
@@ -114,7 +234,7 @@ class GameLogic:
             True se la mossa è stata annullata, False altrimenti
         """
         if self.board.move_stack:
-            self.undone_moves.append(self.board.pop())
+            self.undone_moves.append(self._pop())
             return True
         return False
 
@@ -126,7 +246,7 @@ class GameLogic:
             True se la mossa è stata ripristinata, False altrimenti
         """
         if self.undone_moves:
-            self.board.push(self.undone_moves.pop())
+            self._push(self.undone_moves.pop())
             return True
         return False
 
@@ -147,13 +267,68 @@ class GameLogic:
         return (piece.color == chess.WHITE and to_rank == 7) or \
                (piece.color == chess.BLACK and to_rank == 0)
 
+    def is_game_over(self):
+        """
+        Equivalente di board.is_game_over(), ma con la quintuplice ripetizione letta dal
+        conteggio incrementale e il risultato memorizzato finché la posizione non cambia.
+        
+        Returns:
+            True se la partita è terminata (senza considerare le patte da reclamare)
+        """
+        if self._game_over is None:
+            board = self.board
+            self._game_over = (
+                board.is_checkmate()
+                or board.is_insufficient_material()
+                or not self._legal_moves_index()[0]
+                or (board.halfmove_clock >= 150)
+                or self.position_counts[self.position_keys[-1]] >= 5
+            )
+        return self._game_over
+
+    def can_claim_draw(self):
+        """
+        Equivalente di board.can_claim_draw() senza ripercorrere la cronologia delle mosse:
+        le ripetizioni vengono lette dal conteggio incrementale delle posizioni.
+        
+        Returns:
+            True se si può reclamare la patta (50 mosse o triplice ripetizione)
+        """
+        board = self.board
+        
+        # Regola delle 50 mosse, anche raggiungibile con la prossima mossa
+        if board.halfmove_clock >= 100 and any(board.generate_legal_moves()):
+            return True
+        if board.halfmove_clock >= 99:
+            for move in board.generate_legal_moves():
+                if not board.is_zeroing(move):
+                    return True
+        
+        # Triplice ripetizione, già avvenuta o raggiungibile con la prossima mossa
+        if self.position_counts[self.position_keys[-1]] >= 3:
+            return True
+        for move in board.generate_legal_moves():
+            board.push(move)
+            try:
+                if self.position_counts[board_position_key(board)] >= 2:
+                    return True
+            finally:
+                board.pop()
+        return False
+
     def get_game_status(self):
         """
         Restituisce lo stato corrente della partita.
+        Il risultato viene memorizzato finché la posizione non cambia.
         
         Returns:
             Stringa descrittiva dello stato della partita
         """
+        if self._status is None:
+            self._status = self._compute_game_status()
+        return self._status
+
+    def _compute_game_status(self):
         from src.utils.utils import get_turn_color_name
         
         if self.board.is_checkmate():
@@ -163,7 +338,7 @@ class GameLogic:
             return "Partita Patta per Stallo."
         if self.board.is_insufficient_material():
             return "Partita Patta per Materiale Insufficiente."
-        if self.board.can_claim_draw():
+        if self.can_claim_draw():
             return "Partita Patta per Regole Speciali."
         if self.board.is_check():
             turn_color = get_turn_color_name(self.board.turn)
@@ -174,4 +349,77 @@ class GameLogic:
     def reset(self):
         """Resetta la scacchiera allo stato iniziale."""
         self.board.reset()
-        self.undone_moves.clear()
\ No newline at end of file
+        self.undone_moves.clear()
+        self.san_moves.clear()
+        self.history_changed_from = dict.fromkeys(self.history_changed_from, 0)
+        self._reset_position_tracking()
+
+
+class HistoryCursor:
+    """
+    Posizione visualizzata durante la navigazione nella cronologia di una partita.
+    
+    Usa una propria scacchiera che segue le mosse della partita principale con push/pop:
+    spostarsi di n mosse costa O(n) e non viene mai copiata l'intera scacchiera.
+    """
+    
+    def __init__(self, logic):
+        """
+        Args:
+            logic: GameLogic della partita da seguire
+        """
+        self.logic = logic
+        self.board = chess.Board()
+    
+    @property
+    def ply(self):
+        """Numero di semimosse della posizione visualizzata."""
+        return len(self.board.move_stack)
+    
+    @property
+    def at_end(self):
+        """True se la posizione visualizzata è quella corrente della partita."""
+        return self.ply == len(self.logic.board.move_stack)
+    
+    def _sync(self):
+        """Annulla le mosse visualizzate che la partita principale ha annullato o sostituito."""
+        valid = self.logic.take_history_changes("cursor")
+        if valid == 0 and self.board.move_stack:
+            self.board.reset()
+        while self.ply > valid:
+            self.board.pop()
+    
+    def go_to(self, ply):
+        """
+        Sposta la posizione visualizzata alla semimossa indicata (limitata alla partita).
+        
+        Args:
+            ply: Numero di semimosse dall'inizio
+        
+        Returns:
+            True se la posizione visualizzata è cambiata
+        """
+        self._sync()
+        moves = self.logic.board.move_stack
+        target = max(0, min(ply, len(moves)))
+        if target == self.ply:
+            return False
+        if target == 0:
+            self.board.reset()
+        while self.ply > target:
+            self.board.pop()
+        while self.ply < target:
+            self.board.push(moves[self.ply])
+        return True
+    
+    def to_start(self):
+        return self.go_to(0)
+    
+    def back(self):
+        return self.go_to(self.ply - 1) if self.ply else False
+    
+    def forward(self):
+        return self.go_to(self.ply + 1)
+    
+    def to_end(self):
+        return self.go_to(len(self.logic.board.move_stack))
@@ -1,94 +1,434 @@
 # stockfish_manager.py
 """
 Modulo per la gestione centralizzata delle istanze di Stockfish.
-Questo modulo implementa un pattern singleton per evitare la creazione
-di multiple istanze di Stockfish e ottimizzare l'uso delle risorse.
+Questo modulo implementa un pool limitato di processi Stockfish già avviati,
+da cui i vari componenti (analisi live, game review, AI) prendono in prestito
+un motore per la durata di un'operazione e lo restituiscono al termine.
+I motori sono pilotati tramite il client UCI asincrono (vedi uci_client.py).
 """
 
-from stockfish import Stockfish
-from src.config import STOCKFISH_PATH, MATE_VALUE_BASE, MATE_VALUE_DECREMENT
-from typing import Optional, Dict, Any
+import os
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from src.config import (
+    STOCKFISH_PATH, MATE_VALUE_BASE, MATE_VALUE_DECREMENT,
+    STOCKFISH_POOL_MAX_SIZE, STOCKFISH_POOL_MIN_IDLE, STOCKFISH_POOL_IDLE_TIMEOUT,
+    STOCKFISH_POOL_DEFAULT_PARAMS
+)
+from src.core.uci_client import UCIEngine, UCIError, EngineLoop
+from typing import Optional, Dict, Any, List
+
+
+class EngineUnavailableError(RuntimeError):
+    """Sollevata quando non è possibile ottenere un processo Stockfish dal pool."""
+
+
+class EnginePool:
+    """
+    Pool limitato di processi Stockfish già avviati.
+    
+    Vive sull'event loop dei motori: i motori vengono presi in prestito con
+    `lease()` (context manager asincrono) e restituiti automaticamente al termine;
+    alla restituzione le opzioni modificate durante il prestito vengono riportate
+    ai valori di default. I processi inattivi da troppo tempo vengono chiusi,
+    mantenendone sempre almeno `min_idle` pronti all'uso.
+    """
+    
+    def __init__(self, max_size: int, threads: int = 1,
+                 min_idle: int = STOCKFISH_POOL_MIN_IDLE,
+                 idle_timeout: float = STOCKFISH_POOL_IDLE_TIMEOUT):
+        """
+        Inizializza il pool senza avviare alcun processo.
+        
+        Args:
+            max_size: Numero massimo di processi vivi contemporaneamente
+            threads: Valore dell'opzione Threads di ogni processo
+            min_idle: Processi inattivi da non chiudere mai
+            idle_timeout: Secondi di inattività dopo i quali un processo viene chiuso
+        """
+        self.max_size = max(1, max_size)
+        self.threads = threads
+        self.min_idle = min_idle
+        self.idle_timeout = idle_timeout
+        self.default_parameters = dict(STOCKFISH_POOL_DEFAULT_PARAMS, Threads=threads)
+        
+        self._condition = None  # Creata sul loop dei motori al primo utilizzo
+        self._idle = []  # Lista di (motore, istante di restituzione), il più recente in fondo
+        self._lease_started = {}  # id(motore) -> istante di inizio del prestito
+        self._size = 0  # Processi vivi (inattivi + in prestito + in avvio)
+        self._closed = False
+        self._reaper_task = None
+        
+        self._created_at = time.monotonic()
+        self._stats = {
+            'leases': 0,
+            'waits': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0,
+            'busy_time': 0.0,
+            'spawned': 0,
+            'reaped': 0,
+            'discarded': 0,
+            'spawn_failures': 0,
+        }
+    
+    @property
+    def _cond(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+    
+    async def _spawn(self) -> Optional[UCIEngine]:
+        """Avvia un nuovo processo Stockfish con i parametri del pool."""
+        try:
+            return await UCIEngine.start(STOCKFISH_PATH, self.default_parameters)
+        except UCIError as e:
+            print(f"Errore nell'inizializzazione di Stockfish: {e}")
+            return None
+    
+    def _reap_idle_locked(self) -> List[UCIEngine]:
+        """
+        Estrae i processi inattivi da troppo tempo. Va chiamata con il lock acquisito.
+        
+        Returns:
+            Lista dei motori da chiudere (fuori dal lock)
+        """
+        now = time.monotonic()
+        expired = []
+        # I motori più vecchi sono in testa alla lista
+        while len(self._idle) > self.min_idle and now - self._idle[0][1] > self.idle_timeout:
+            engine, _ = self._idle.pop(0)
+            expired.append(engine)
+        self._size -= len(expired)
+        self._stats['reaped'] += len(expired)
+        return expired
+    
+    def _ensure_reaper(self):
+        """Avvia il task di pulizia dei processi inattivi, se non già attivo."""
+        if self._reaper_task is None and self.idle_timeout > 0:
+            self._reaper_task = asyncio.get_running_loop().create_task(self._reaper_loop())
+    
+    async def _reaper_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.idle_timeout / 2)
+            await self.reap_idle()
+    
+    async def reap_idle(self) -> int:
+        """
+        Chiude i processi inattivi oltre il timeout.
+        
+        Returns:
+            Numero di processi chiusi
+        """
+        async with self._cond:
+            expired = self._reap_idle_locked()
+        for engine in expired:
+            await engine.quit()
+        return len(expired)
+    
+    async def prewarm(self, count: int = 1) -> bool:
+        """
+        Avvia in anticipo alcuni processi in modo che il primo prestito sia immediato.
+        
+        Args:
+            count: Numero di processi inattivi desiderati
+            
+        Returns:
+            True se almeno un processo è disponibile, False se Stockfish non si avvia
+        """
+        count = min(count, self.max_size)
+        while True:
+            async with self._cond:
+                if self._closed:
+                    return False
+                if len(self._idle) >= count or self._size >= self.max_size:
+                    return self._size > 0
+                self._size += 1
+            engine = await self._spawn()
+            async with self._cond:
+                if engine is None:
+                    self._size -= 1
+                    self._stats['spawn_failures'] += 1
+                    self._cond.notify()
+                    return self._size > 0
+                self._stats['spawned'] += 1
+                self._idle.append((engine, time.monotonic()))
+                self._cond.notify()
+            self._ensure_reaper()
+    
+    async def acquire(self, timeout: Optional[float] = None) -> UCIEngine:
+        """
+        Prende in prestito un motore, attendendo se il pool è al completo.
+        
+        Args:
+            timeout: Secondi massimi di attesa (None = attesa indefinita)
+            
+        Returns:
+            Motore riservato al chiamante
+            
+        Raises:
+            EngineUnavailableError: Se il pool è chiuso, Stockfish non si avvia
+                o il timeout scade
+        """
+        requested_at = time.monotonic()
+        deadline = None if timeout is None else requested_at + timeout
+        engine = None
+        must_spawn = False
+        
+        async with self._cond:
+            expired = self._reap_idle_locked()
+            while True:
+                if self._closed:
+                    raise EngineUnavailableError("Il pool di Stockfish è stato chiuso")
+                if self._idle:
+                    engine, _ = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    must_spawn = True
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise EngineUnavailableError("Timeout in attesa di un processo Stockfish libero")
+                try:
+                    await asyncio.wait_for(self._cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        
+        for old_engine in expired:
+            await old_engine.quit()
+        
+        if must_spawn:
+            engine = await self._spawn()
+            async with self._cond:
+                if engine is None:
+                    self._size -= 1
+                    self._stats['spawn_failures'] += 1
+                    self._cond.notify()
+                    raise EngineUnavailableError("Impossibile avviare Stockfish")
+                self._stats['spawned'] += 1
+            self._ensure_reaper()
+        
+        now = time.monotonic()
+        waited = now - requested_at
+        self._lease_started[id(engine)] = now
+        self._stats['leases'] += 1
+        if waited > 0.001:
+            self._stats['waits'] += 1
+        self._stats['total_wait'] += waited
+        self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+        return engine
+    
+    async def release(self, engine: UCIEngine, discard: bool = False):
+        """
+        Restituisce un motore al pool ripristinandone le opzioni.
+        
+        Args:
+            engine: Motore ottenuto con acquire()
+            discard: Se True il processo viene chiuso invece di essere riutilizzato
+                (ad esempio dopo un errore che lo ha lasciato in uno stato incerto)
+        """
+        if not discard:
+            try:
+                await engine.configure(self.default_parameters)
+            except (UCIError, OSError) as e:
+                print(f"Errore nel ripristino delle opzioni di Stockfish: {e}")
+                discard = True
+        
+        async with self._cond:
+            started = self._lease_started.pop(id(engine), None)
+            if started is not None:
+                self._stats['busy_time'] += time.monotonic() - started
+            if discard or self._closed:
+                self._size -= 1
+                self._stats['discarded'] += 1
+            else:
+                self._idle.append((engine, time.monotonic()))
+            self._cond.notify()
+        
+        if discard or self._closed:
+            await engine.quit()
+    
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None, **parameters):
+        """
+        Context manager asincrono che presta un motore configurato per la durata del blocco.
+        
+        Args:
+            timeout: Secondi massimi di attesa per un motore libero
+            **parameters: Opzioni UCI aggiuntive da impostare (es. {"Skill Level": 5})
+            
+        Yields:
+            Motore riservato
+        """
+        engine = await self.acquire(timeout)
+        try:
+            if parameters:
+                await engine.configure(parameters)
+        except BaseException:
+            await self.release(engine, discard=True)
+            raise
+        
+        try:
+            yield engine
+        except BaseException:
+            # Una ricerca annullata viene fermata e consumata da go(); negli altri casi
+            # il motore potrebbe essere in uno stato incerto e non va riutilizzato
+            await self.release(engine, discard=engine.searching)
+            raise
+        else:
+            await self.release(engine)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Restituisce le statistiche di utilizzo del pool.
+        
+        Returns:
+            Dizionario con dimensione, prestiti, tempi di attesa e utilizzo
+            (frazione del tempo-processo disponibile effettivamente occupata)
+        """
+        now = time.monotonic()
+        stats = dict(self._stats)
+        busy_time = stats['busy_time'] + sum(now - t for t in list(self._lease_started.values()))
+        uptime = now - self._created_at
+        stats.update({
+            'size': self._size,
+            'idle': len(self._idle),
+            'leased': len(self._lease_started),
+            'max_size': self.max_size,
+            'threads': self.threads,
+            'busy_time': busy_time,
+            'avg_wait': stats['total_wait'] / stats['leases'] if stats['leases'] else 0.0,
+            'utilization': busy_time / (uptime * self.max_size) if uptime > 0 else 0.0,
+        })
+        return stats
+    
+    async def close(self):
+        """Chiude tutti i processi inattivi; quelli in prestito verranno chiusi alla restituzione."""
+        async with self._cond:
+            self._closed = True
+            idle = [engine for engine, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        if self._reaper_task:
+            self._reaper_task.cancel()
+        for engine in idle:
+            await engine.quit()
 
 
 class StockfishManager:
     """
-    Gestisce le istanze di Stockfish in modo centralizzato.
-    Implementa un pattern singleton per riutilizzare le istanze quando possibile.
+    Gestisce i processi di Stockfish in modo centralizzato.
+    Tutti i motori sono pilotati da un unico event loop asyncio su un thread
+    dedicato; per ogni valore dell'opzione Threads esiste un pool condiviso,
+    dimensionato sui core disponibili per non sovraccaricare la macchina.
+    Il codice sincrono usa run() e submit() per eseguire coroutine sul loop.
     """
     
-    _instances = {}
+    _pools = {}
+    _pools_lock = threading.Lock()
+    _engine_loop = EngineLoop()
+    
+    @classmethod
+    def loop(cls) -> EngineLoop:
+        """Restituisce l'event loop condiviso dai motori (avviato alla prima richiesta)."""
+        return cls._engine_loop
     
     @classmethod
-    def get_instance(cls, depth: int = 15, threads: int = 1, key: str = "default") -> Optional[Stockfish]:
+    def run(cls, coro, timeout: Optional[float] = None):
+        """Esegue una coroutine sul loop dei motori attendendone il risultato (da codice sincrono)."""
+        return cls._engine_loop.run(coro, timeout)
+    
+    @classmethod
+    def submit(cls, coro):
+        """Pianifica una coroutine sul loop dei motori e ne restituisce il Future, senza attendere."""
+        return cls._engine_loop.submit(coro)
+    
+    @classmethod
+    def get_pool(cls, threads: int = 1) -> EnginePool:
         """
-        Ottiene un'istanza di Stockfish con i parametri specificati.
+        Ottiene il pool condiviso per motori con il numero di thread indicato.
         
         Args:
-            depth: Profondità di analisi
-            threads: Numero di thread da utilizzare
-            key: Chiave identificativa per l'istanza (default, analyzer, player, etc.)
+            threads: Numero di thread di ogni processo
             
         Returns:
-            Un'istanza di Stockfish configurata, o None se non disponibile
+            Il pool condiviso (creato alla prima richiesta, senza avviare processi)
+        """
+        with cls._pools_lock:
+            pool = cls._pools.get(threads)
+            if pool is None:
+                max_size = min(STOCKFISH_POOL_MAX_SIZE, max(1, (os.cpu_count() or 1) // threads))
+                pool = EnginePool(max_size, threads=threads)
+                cls._pools[threads] = pool
+            return pool
+    
+    @classmethod
+    def lease(cls, threads: int = 1, timeout: Optional[float] = None, **parameters):
         """
-        instance_key = f"{key}_{depth}_{threads}"
+        Presta un motore dal pool condiviso (scorciatoia per get_pool(threads).lease()).
+        Va usato con "async with" da una coroutine in esecuzione sul loop dei motori.
         
-        if instance_key not in cls._instances:
-            try:
-                instance = Stockfish(
-                    path=STOCKFISH_PATH,
-                    parameters={"Threads": threads}
-                )
-                instance.set_depth(depth)
-                cls._instances[instance_key] = instance
-            except (FileNotFoundError, PermissionError) as e:
-                print(f"Errore nell'inizializzazione di Stockfish: {e}")
-                return None
-        
-        return cls._instances[instance_key]
+        Args:
+            threads: Numero di thread del motore
+            timeout: Secondi massimi di attesa per un motore libero
+            **parameters: Opzioni UCI aggiuntive per la durata del prestito
+            
+        Returns:
+            Context manager asincrono che restituisce un motore
+        """
+        return cls.get_pool(threads).lease(timeout=timeout, **parameters)
     
     @classmethod
-    def create_new_instance(cls, depth: int = 15, threads: int = 1) -> Optional[Stockfish]:
+    def create_new_instance(cls, threads: int = 1) -> Optional[UCIEngine]:
         """
-        Crea una nuova istanza di Stockfish senza cache.
+        Crea una nuova istanza di Stockfish fuori dal pool, sul loop dei motori.
         Utile per operazioni che richiedono un'istanza dedicata.
         
         Args:
-            depth: Profondità di analisi
             threads: Numero di thread da utilizzare
             
         Returns:
-            Una nuova istanza di Stockfish, o None se non disponibile
+            Un nuovo motore, o None se non disponibile
         """
         try:
-            instance = Stockfish(
-                path=STOCKFISH_PATH,
-                parameters={"Threads": threads}
-            )
-            instance.set_depth(depth)
-            return instance
-        except (FileNotFoundError, PermissionError) as e:
+            return cls.run(UCIEngine.start(STOCKFISH_PATH, {"Threads": threads}))
+        except UCIError as e:
             print(f"Errore nella creazione di una nuova istanza Stockfish: {e}")
             return None
     
+    @classmethod
+    def get_stats(cls) -> Dict[int, Dict[str, Any]]:
+        """Restituisce le statistiche di tutti i pool, indicizzate per numero di thread."""
+        with cls._pools_lock:
+            pools = dict(cls._pools)
+        return {threads: pool.stats() for threads, pool in pools.items()}
+    
     @classmethod
     def clear_cache(cls):
-        """Pulisce la cache delle istanze di Stockfish."""
-        cls._instances.clear()
+        """Chiude tutti i pool e i relativi processi di Stockfish."""
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            try:
+                cls.run(pool.close(), timeout=5)
+            except Exception as e:
+                print(f"Errore nella chiusura dei processi di Stockfish: {e}")
     
     @classmethod
     def is_available(cls) -> bool:
         """
         Verifica se Stockfish è disponibile sul sistema.
+        Il processo avviato per la verifica resta caldo nel pool di default.
         
         Returns:
             True se Stockfish è disponibile, False altrimenti
         """
-        try:
-            test_instance = Stockfish(path=STOCKFISH_PATH)
-            return True
-        except (FileNotFoundError, PermissionError):
-            return False
+        return cls.run(cls.get_pool().prewarm())
 
 
 def eval_to_centipawns(evaluation: Dict[str, Any]) -> int:
@@ -144,4 +484,23 @@ def convert_top_move_to_cp(eval_info: Dict[str, Any]) -> int:
         return (MATE_VALUE_BASE - abs(mate_val) * MATE_VALUE_DECREMENT) * (1 if mate_val > 0 else -1)
     
     # Fallback: prova il formato standard
-    return eval_to_centipawns(eval_info)
\ No newline at end of file
+    return eval_to_centipawns(eval_info)
+
+def top_move_to_evaluation(top_move: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converte una voce di get_top_moves() nel formato di get_evaluation().
+    Entrambi i formati esprimono il punteggio dal punto di vista del Bianco
+    (positivo = vantaggio bianco), quindi il segno non va invertito anche se
+    la mossa migliore appartiene al Nero.
+    
+    Args:
+        top_move: Dizionario con 'Move', 'Centipawn' e 'Mate'
+        
+    Returns:
+        Dizionario con 'type' ('cp' o 'mate') e 'value'
+    """
+    if top_move.get('Centipawn') is not None:
+        return {'type': 'cp', 'value': top_move['Centipawn']}
+    if top_move.get('Mate') is not None:
+        return {'type': 'mate', 'value': top_move['Mate']}
+    return {'type': 'cp', 'value': 0}
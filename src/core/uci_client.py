@@ -0,0 +1,358 @@
+# uci_client.py
+"""
+Client UCI asincrono per Stockfish.
+Comunica con il processo del motore tramite asyncio, così che un solo event
+loop possa pilotare molti motori contemporaneamente. Le righe "info" vengono
+interpretate man mano che arrivano e ogni profondità completata può essere
+inoltrata a una callback; una ricerca in corso si interrompe con stop().
+
+L'event loop condiviso gira su un thread dedicato (EngineLoop): il codice
+sincrono (interfaccia Tk, thread di lavoro) vi sottomette le coroutine e ne
+attende o ne controlla il risultato.
+"""
+
+import asyncio
+import threading
+import chess
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+from src.config import STOCKFISH_PATH, UCI_COMMAND_TIMEOUT
+
+
+class UCIError(RuntimeError):
+    """Sollevata quando il motore non risponde o termina inaspettatamente."""
+
+
+def parse_info_line(parts: List[str], multiplier: int) -> Optional[Dict[str, Any]]:
+    """
+    Interpreta una riga "info" di una ricerca MultiPV.
+
+    Args:
+        parts: Riga del motore già divisa in token
+        multiplier: 1 se muove il Bianco, -1 se muove il Nero (i punteggi UCI sono
+            dal punto di vista di chi muove, quelli restituiti dal punto di vista del Bianco)
+
+    Returns:
+        Dizionario con 'depth', 'multipv' e 'line' (con 'Move', 'Centipawn', 'Mate'
+        e 'PV'), o None se la riga non contiene una linea completa
+    """
+    if parts[0] != "info" or "pv" not in parts or "score" not in parts or "depth" not in parts:
+        return None
+    # I punteggi parziali (fail-high/fail-low) vengono seguiti da quello esatto
+    if "lowerbound" in parts or "upperbound" in parts:
+        return None
+    score_index = parts.index("score")
+    score_type, score_value = parts[score_index + 1], int(parts[score_index + 2])
+    pv = parts[parts.index("pv") + 1:]
+    return {
+        'depth': int(parts[parts.index("depth") + 1]),
+        'multipv': int(parts[parts.index("multipv") + 1]) if "multipv" in parts else 1,
+        'line': {
+            'Move': pv[0],
+            'Centipawn': score_value * multiplier if score_type == "cp" else None,
+            'Mate': score_value * multiplier if score_type == "mate" else None,
+            'PV': pv,
+        },
+    }
+
+
+def _format_option_value(value: Any) -> str:
+    """Converte un valore Python nel formato atteso da "setoption"."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class UCIEngine:
+    """
+    Processo UCI pilotato in modo asincrono.
+
+    Tutti i metodi vanno chiamati dall'event loop che ha avviato il motore, e
+    da una sola coroutine alla volta; fa eccezione stop(), che può essere
+    chiamato (sempre dallo stesso loop) mentre un'altra coroutine attende go().
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process, path: str):
+        self._process = process
+        self.path = path
+        self.name = ""
+        self.options = set()  # Nomi delle opzioni dichiarate dal motore
+        self.parameters: Dict[str, str] = {}  # Valori impostati con setoption
+        self.searching = False
+        self._board = chess.Board()
+
+    @classmethod
+    async def start(cls, path: str = STOCKFISH_PATH, options: Optional[Dict[str, Any]] = None) -> "UCIEngine":
+        """
+        Avvia il processo e completa l'handshake UCI.
+
+        Args:
+            path: Percorso dell'eseguibile
+            options: Opzioni UCI da impostare subito (es. {"Threads": 1})
+
+        Returns:
+            Il motore pronto a ricevere posizioni
+
+        Raises:
+            UCIError: Se l'eseguibile non si avvia o non risponde in tempo
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                path, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except OSError as e:
+            raise UCIError(f"Impossibile avviare {path}: {e}") from e
+
+        engine = cls(process, path)
+        try:
+            engine._send("uci")
+            while True:
+                parts = (await engine._read_line(UCI_COMMAND_TIMEOUT)).split()
+                if not parts:
+                    continue
+                if parts[0] == "uciok":
+                    break
+                if parts[:2] == ["id", "name"]:
+                    engine.name = " ".join(parts[2:])
+                elif parts[:2] == ["option", "name"] and "type" in parts:
+                    engine.options.add(" ".join(parts[2:parts.index("type")]))
+            await engine.configure(options or {})
+        except BaseException:
+            await engine.quit()
+            raise
+        return engine
+
+    @property
+    def version(self) -> str:
+        """
+        Versione principale del motore, ricavata dal nome (es. "16" per "Stockfish 16.1").
+        Serve a non mescolare nella cache analisi di versioni diverse.
+        """
+        words = self.name.split()
+        return words[1].split(".")[0] if len(words) > 1 else self.name
+
+    def _send(self, command: str):
+        if self._process.returncode is not None:
+            raise UCIError("Il processo del motore è terminato")
+        self._process.stdin.write((command + "\n").encode())
+
+    async def _read_line(self, timeout: Optional[float] = None) -> str:
+        try:
+            line = await asyncio.wait_for(self._process.stdout.readline(), timeout)
+        except asyncio.TimeoutError as e:
+            raise UCIError("Il motore non ha risposto in tempo") from e
+        if not line:
+            raise UCIError("Il processo del motore è terminato")
+        return line.decode(errors="replace").strip()
+
+    async def is_ready(self):
+        """Attende che il motore abbia elaborato tutti i comandi inviati."""
+        self._send("isready")
+        while await self._read_line(UCI_COMMAND_TIMEOUT) != "readyok":
+            pass
+
+    def set_option(self, name: str, value: Any):
+        """
+        Accoda un'opzione UCI, senza attendere il motore (vedi configure()).
+        Le opzioni che hanno già il valore richiesto non vengono reinviate.
+
+        Raises:
+            UCIError: Se il motore non dichiara l'opzione
+        """
+        if name not in self.options:
+            raise UCIError(f"Opzione UCI sconosciuta: {name}")
+        value = _format_option_value(value)
+        if self.parameters.get(name) != value:
+            self._send(f"setoption name {name} value {value}")
+            self.parameters[name] = value
+
+    async def configure(self, options: Dict[str, Any]):
+        """
+        Imposta più opzioni UCI in un colpo solo e attende che siano applicate.
+
+        Args:
+            options: Dizionario nome -> valore
+        """
+        for name, value in options.items():
+            self.set_option(name, value)
+        await self.is_ready()
+
+    def new_game(self):
+        """Segnala una nuova partita (svuota la tabella delle trasposizioni)."""
+        self._send("ucinewgame")
+
+    def set_position(self, fen: Optional[str] = None, moves: Optional[List[str]] = None):
+        """
+        Imposta la posizione da analizzare.
+
+        Args:
+            fen: FEN di partenza (None = posizione iniziale)
+            moves: Mosse in formato UCI da giocare a partire dalla FEN
+        """
+        board = chess.Board(fen) if fen else chess.Board()
+        command = f"position fen {fen}" if fen else "position startpos"
+        if moves:
+            for move in moves:
+                board.push_uci(move)
+            command += " moves " + " ".join(moves)
+        self._board = board
+        self._send(command)
+
+    def stop(self):
+        """Interrompe la ricerca in corso; go() restituirà l'ultimo risultato completo."""
+        if self.searching:
+            self._send("stop")
+
+    async def go(self, depth: Optional[int] = None, movetime: Optional[int] = None,
+                 multipv: int = 1,
+                 on_depth: Optional[Callable[[List[Dict[str, Any]], int], None]] = None) -> Dict[str, Any]:
+        """
+        Avvia una ricerca sulla posizione corrente e ne attende la fine.
+        Senza depth né movetime la ricerca è infinita e termina solo con stop().
+
+        Args:
+            depth: Profondità massima
+            movetime: Tempo massimo in millisecondi
+            multipv: Numero di linee richieste
+            on_depth: Funzione chiamata con (linee, profondità) a ogni profondità completata
+
+        Returns:
+            Dizionario con 'bestmove' (UCI, None a fine partita), 'top_moves' (linee
+            dell'ultima profondità completata, formato di get_top_moves()) e 'depth'
+        """
+        board = self._board
+        expected_lines = min(multipv, board.legal_moves.count())
+        if expected_lines == 0:
+            return {'bestmove': None, 'top_moves': [], 'depth': 0}
+        multiplier = 1 if board.turn == chess.WHITE else -1
+
+        self.set_option("MultiPV", multipv)
+        limits = []
+        if depth:
+            limits.append(f"depth {depth}")
+        if movetime:
+            limits.append(f"movetime {movetime}")
+        self._send("go " + (" ".join(limits) or "infinite"))
+        self.searching = True
+
+        result = {'bestmove': None, 'top_moves': [], 'depth': 0}
+        lines: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+        try:
+            while True:
+                parts = (await self._read_line()).split()
+                if not parts:
+                    continue
+                if parts[0] == "bestmove":
+                    result['bestmove'] = parts[1] if len(parts) > 1 and parts[1] != "(none)" else None
+                    break
+                info = parse_info_line(parts, multiplier)
+                if info is None:
+                    continue
+                lines[info['multipv']] = (info['depth'], info['line'])
+                # Il motore emette le linee 1..N in ordine: l'ultima chiude la profondità.
+                # Dopo uno stop le linee non ancora ricercate riportano la profondità precedente
+                if info['multipv'] == expected_lines and len(lines) >= expected_lines:
+                    top_moves = [lines[i][1] for i in range(1, expected_lines + 1)]
+                    result['top_moves'] = top_moves
+                    result['depth'] = min(lines[i][0] for i in range(1, expected_lines + 1))
+                    lines = {}
+                    if on_depth:
+                        on_depth(top_moves, result['depth'])
+        except asyncio.CancelledError:
+            # Chi attendeva non vuole più il risultato: si ferma il motore e si consuma
+            # la risposta, così che il processo torni riutilizzabile
+            await self._abort_search()
+            raise
+        finally:
+            self.searching = False
+        return result
+
+    async def _abort_search(self):
+        self._send("stop")
+        while not (await self._read_line(UCI_COMMAND_TIMEOUT)).startswith("bestmove"):
+            pass
+
+    async def analyse(self, fen: str, depth: Optional[int] = None, multipv: int = 1,
+                      on_depth: Optional[Callable[[List[Dict[str, Any]], int], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Analizza una posizione e ne restituisce le migliori linee.
+
+        Args:
+            fen: FEN della posizione
+            depth: Profondità massima (None = fino a stop())
+            multipv: Numero di linee richieste
+            on_depth: Funzione chiamata a ogni profondità completata
+
+        Returns:
+            Lista nel formato di get_top_moves(), vuota a fine partita
+        """
+        self.set_position(fen)
+        return (await self.go(depth=depth, multipv=multipv, on_depth=on_depth))['top_moves']
+
+    async def best_move(self, fen: str, movetime: Optional[int] = None,
+                        depth: Optional[int] = None) -> Optional[str]:
+        """
+        Calcola la mossa migliore di una posizione.
+
+        Args:
+            fen: FEN della posizione
+            movetime: Tempo massimo in millisecondi
+            depth: Profondità massima
+
+        Returns:
+            Mossa in formato UCI, o None a fine partita
+        """
+        self.set_position(fen)
+        return (await self.go(depth=depth, movetime=movetime))['bestmove']
+
+    async def quit(self, timeout: float = 1.0):
+        """Chiude il processo, forzandone la terminazione se non risponde."""
+        if self._process.returncode is None:
+            try:
+                self._send("quit")
+                await asyncio.wait_for(self._process.wait(), timeout)
+            except (UCIError, OSError, asyncio.TimeoutError):
+                try:
+                    self._process.kill()
+                    await self._process.wait()
+                except ProcessLookupError:
+                    pass
+
+
+class EngineLoop:
+    """
+    Event loop asyncio su un thread dedicato, condiviso da tutti i motori.
+    Viene avviato alla prima richiesta.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="engine-loop", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Pianifica una coroutine sul loop dei motori.
+
+        Returns:
+            Future (concurrent.futures) del risultato, annullabile da qualsiasi thread
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Esegue una coroutine sul loop dei motori e ne attende il risultato dal thread chiamante."""
+        return self.submit(coro).result(timeout)
+
+    def call_soon(self, callback: Callable, *args):
+        """Esegue una funzione sul thread del loop dei motori, senza attenderla."""
+        self.loop.call_soon_threadsafe(callback, *args)
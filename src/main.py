@@ -17,23 +17,20 @@ import pyperclip
 import threading
 import queue
 import time
+import asyncio
 
 from src.config import *
-from src.core.game_logic import GameLogic
+from src.core.game_logic import GameLogic, HistoryCursor
 from src.ui.ui_components import ChessBoard, EvalBar, ModernButton
-from src.analysis.advanced_move_classifier import AdvancedMoveClassifier
-from src.core.stockfish_manager import StockfishManager, eval_to_centipawns
-from src.analysis.accuracy_calculator import (
-    move_accuracy_percent, 
-    calculate_final_accuracy
-)
+from src.ui.update_scheduler import UpdateScheduler
+from src.analysis.game_review import review_game, review_board_at
+from src.core.stockfish_manager import StockfishManager, EngineUnavailableError
+from src.core.eval_cache import AnalysisLRUCache, lookup_top_moves, store_top_moves
 from src.utils.utils import (
     is_ai_turn, 
     safe_widget_exists,
     get_ai_level_for_turn,
-    create_pgn_headers,
-    build_board_from_moves,
-    calculate_player_accuracy
+    create_pgn_headers
 )
 
 class ChessApp:
@@ -57,16 +54,22 @@ class ChessApp:
         self.eval_bar_var = tk.BooleanVar(value=False)
         self.show_best_move_var = tk.BooleanVar(value=False)
                 
-        self.eval_thread = None
-        self.eval_thread_running = False
+        # L'analisi live è una coroutine sul loop dei motori; la generazione invalida quelle fermate
+        self.eval_task = None
+        self.eval_generation = 0
         self.eval_queue = queue.Queue()
-        self.new_eval_request = threading.Event()
+        self.new_eval_request = None  # asyncio.Event, creato dalla coroutine di analisi
         self.force_reanalyze = False
+        # Analisi live già calcolate: permettono di aggiornare subito la UI navigando nella cronologia
+        self.live_analysis_cache = AnalysisLRUCache()
+        self.live_engine = None
+        self.live_fen = None  # Posizione richiesta, letta dalla coroutine di analisi
+        self.live_search_fen = None  # Posizione in corso di ricerca
         self.review_queue = queue.Queue()
         self.review_data = []
         
         # Caricamento lazy di Stockfish - non caricato all'avvio del menu
-        self.stockfish_analyzer = None
+        self.analysis_pool = None
         self.stockfish_loading_thread = None
         self.stockfish_loaded = threading.Event()
         self.is_loading_stockfish = False
@@ -76,16 +79,34 @@ class ChessApp:
         self.pvc_ai_level = DEFAULT_AI_LEVEL
         self.ai_white_level = DEFAULT_AI_LEVEL
         self.ai_black_level = DEFAULT_AI_LEVEL
-        self.display_board = chess.Board()
+        # Posizione mostrata navigando nella cronologia (vedi display_board)
+        self.history_cursor = HistoryCursor(self.logic)
         self.viewing_history = False
         self.game_over_state = False
         self.premove = None
 
         self.ai_move_job_id = None
+        # Le ricerche dell'AI girano sul loop dei motori; la generazione invalida quelle annullate
+        self.ai_future = None
+        self.ai_generation = 0
+        
+        # Gli aggiornamenti della UI vengono raccolti e disegnati in un unico flush
+        self.ui_updates = UpdateScheduler(master)
+        self.ui_updates.register("eval_bar", self._render_eval_bar)
+        self.ui_updates.register("board", self._render_board)
+        self.ui_updates.register("status", self._render_status)
+        self.ui_updates.register("buttons", self.update_button_states)
+        self.ui_updates.register("history", self.update_move_history)
+        self.pending_analysis = None  # (top_moves, depth) da mostrare al prossimo flush
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         self.create_main_menu()
 
+    @property
+    def display_board(self):
+        """Scacchiera della posizione visualizzata nella cronologia (da non modificare)."""
+        return self.history_cursor.board
+
     def _setup_modern_styles(self):
         """Configura gli stili moderni per il tema scuro."""
         style = ttk.Style()
@@ -148,14 +169,15 @@ class ChessApp:
         pass
 
     def on_closing(self):
-        if self.ai_move_job_id:
-            self.master.after_cancel(self.ai_move_job_id)
-            self.ai_move_job_id = None
-        self._stop_eval_thread()
+        self.ui_updates.cancel()
+        self._cancel_ai_move()
+        self._stop_eval_task()
+        StockfishManager.clear_cache()
         self.master.destroy()
 
     def create_main_menu(self):
-        self._stop_eval_thread()
+        self._stop_eval_task()
+        self.ui_updates.cancel()
         for widget in self.main_container.winfo_children():
             widget.destroy()
         self.master.geometry(MENU_WINDOW_GEOMETRY)
@@ -180,7 +202,7 @@ class ChessApp:
         pvp_frame.pack(fill=X, pady=5)
         ttk.Button(pvp_frame, text="Avvia Partita", style="success.TButton", command=lambda: self.start_game('pvp')).pack(fill=X, ipady=8)
 
-        ai_state = tk.NORMAL if self.logic.stockfish_player else tk.DISABLED
+        ai_state = tk.NORMAL if self.logic.engine_available else tk.DISABLED
 
         pvc_frame = ttk.Labelframe(menu_frame, text="Giocatore vs Computer", padding=15)
         pvc_frame.pack(fill=X, pady=5)
@@ -221,27 +243,24 @@ class ChessApp:
         self.cvc_black_difficulty_selector.pack(side=LEFT, expand=True, fill=X)
         ttk.Button(cvc_frame, text="Avvia Simulazione", style="warning.TButton", command=lambda: self.start_game('cvc'), state=ai_state).pack(fill=X, ipady=8)
 
-        if not self.logic.stockfish_player:
+        if not self.logic.engine_available:
             ttk.Label(menu_frame, text="Stockfish non trovato.\nFunzionalità AI disabilitate.", bootstyle="danger", justify=CENTER).pack(pady=20)
 
     def _load_stockfish_background(self):
         """Carica Stockfish in background"""
         try:
-            self.stockfish_analyzer = StockfishManager.get_instance(
-                depth=self.logic.analysis_depth,
-                threads=STOCKFISH_ANALYZER_THREADS,
-                key="analyzer"
-            )
+            pool = StockfishManager.get_pool(threads=STOCKFISH_ANALYZER_THREADS)
+            self.analysis_pool = pool if StockfishManager.run(pool.prewarm()) else None
         except Exception as e:
             print(f"Errore nel caricamento di Stockfish: {e}")
-            self.stockfish_analyzer = None
+            self.analysis_pool = None
         finally:
             self.stockfish_loaded.set()
     
     def _wait_for_stockfish_loaded(self):
         """Attende il caricamento di Stockfish e poi avvia il thread di valutazione"""
         if self.stockfish_loaded.wait(timeout=30):  # Attende max 30 secondi
-            if self.stockfish_analyzer:
+            if self.analysis_pool:
                 # Stockfish caricato, usa after() per aggiornare GUI nel thread principale
                 def enable_stockfish_ui():
                     if safe_widget_exists(self, 'eval_bar_checkbutton'):
@@ -249,9 +268,9 @@ class ChessApp:
                     if safe_widget_exists(self, 'best_move_checkbutton'):
                         self.best_move_checkbutton.config(state=tk.NORMAL)
                     
-                    self._start_eval_thread()
+                    self._start_eval_task()
                     self._process_eval_queue()
-                    self.new_eval_request.set()
+                    self._request_analysis()
                     self.is_loading_stockfish = False
                     self.update_display()
                 
@@ -291,7 +310,7 @@ class ChessApp:
         self._fade_out(callback=self._transition_to_game)
         
         # Carica Stockfish in background se non già in corso
-        if not self.is_loading_stockfish and self.stockfish_analyzer is None:
+        if not self.is_loading_stockfish and self.analysis_pool is None:
             self.is_loading_stockfish = True
             self.stockfish_loaded.clear()
             self.stockfish_loading_thread = threading.Thread(
@@ -306,11 +325,11 @@ class ChessApp:
                 daemon=True
             )
             stockfish_waiter_thread.start()
-        elif self.stockfish_analyzer:
-            # Stockfish già caricato, avvia subito il thread di valutazione
-            self._start_eval_thread()
+        elif self.analysis_pool:
+            # Stockfish già caricato, avvia subito l'analisi live
+            self._start_eval_task()
             self._process_eval_queue()
-            self.new_eval_request.set()
+            self._request_analysis()
             
         if self.game_mode == 'cvc' or (self.game_mode == 'pvc' and self.player_color == chess.BLACK):
             self.trigger_ai_move()
@@ -329,6 +348,7 @@ class ChessApp:
         
         board_container.columnconfigure(0, weight=0)  # Scacchiera
         board_container.columnconfigure(1, weight=0)  # Eval Bar (fixed width)
+        board_container.rowconfigure(0, weight=1)  # La scacchiera segue l'altezza della finestra
         
         # Scacchiera
         self.board_widget = ChessBoard(board_container, self)
@@ -375,6 +395,7 @@ class ChessApp:
         self.history_text.grid(row=0, column=0, sticky="nsew")
         self.history_text.config(state=tk.DISABLED)
         h_scroll.config(command=self.history_text.yview)
+        self.history_rendered = 0  # Mosse già scritte nel widget, ognuna preceduta da un mark
 
         nav_frame = ttk.Frame(side_panel)
         nav_frame.grid(row=5, column=0, sticky="ew", pady=(0, 5))
@@ -394,7 +415,7 @@ class ChessApp:
         
         self.options_frame = ttk.Frame(side_panel)
         self.options_frame.grid(row=6, column=0, sticky="ew", pady=5)
-        eval_bar_state = tk.NORMAL if self.stockfish_analyzer else tk.DISABLED
+        eval_bar_state = tk.NORMAL if self.analysis_pool else tk.DISABLED
         self.eval_bar_checkbutton = ttk.Checkbutton(self.options_frame, text="Mostra Eval Bar", variable=self.eval_bar_var, command=self._toggle_eval_bar, state=eval_bar_state)
         self.eval_bar_checkbutton.pack(anchor='w')
         self.best_move_checkbutton = ttk.Checkbutton(self.options_frame, text="Mostra Mossa Migliore", variable=self.show_best_move_var, command=self._on_toggle_best_move, state=eval_bar_state)
@@ -430,9 +451,9 @@ class ChessApp:
         if self.show_best_move_var.get():
             self.engine_info_label.grid(row=1, column=0, sticky="ew", pady=(0, 10))
             self.analysis_frame.grid(row=2, column=0, sticky="nsew", pady=5)
-            if self.stockfish_analyzer:
+            if self.analysis_pool:
                 self.force_reanalyze = True
-                self.new_eval_request.set()
+                self._request_analysis()
         else:
             self.engine_info_label.grid_remove()
             self.analysis_frame.grid_remove()
@@ -444,37 +465,37 @@ class ChessApp:
         if hasattr(self, 'board_widget') and self.board_widget:
             self.board_widget.cancel_animation()
         
-        self.display_board.reset()
+        self.history_cursor.to_start()
         self.viewing_history = True
-        if self.stockfish_analyzer and self.eval_bar_var.get():
-            self.new_eval_request.set()
+        if self.analysis_pool:
+            self._show_cached_analysis()
+            self._request_analysis()
         self.update_display()
 
     def nav_prev_move(self):
         """Naviga alla mossa precedente senza animazione"""
-        if self.display_board.move_stack:
+        if self.history_cursor.ply:
             if hasattr(self, 'board_widget') and self.board_widget:
                 self.board_widget.cancel_animation()
             
-            self.display_board.pop()
+            self.history_cursor.back()
             self.viewing_history = True
-            if self.stockfish_analyzer and self.eval_bar_var.get():
-                self.new_eval_request.set()
+            if self.analysis_pool:
+                self._show_cached_analysis()
+                self._request_analysis()
             self.update_display()
 
     def nav_next_move(self):
         """Naviga alla mossa successiva senza animazione"""
-        full_move_list = list(self.logic.board.move_stack)
-        current_view_len = len(self.display_board.move_stack)
-        if current_view_len < len(full_move_list):
+        if not self.history_cursor.at_end:
             if hasattr(self, 'board_widget') and self.board_widget:
                 self.board_widget.cancel_animation()
             
-            next_move = full_move_list[current_view_len]
-            self.display_board.push(next_move)
-            self.viewing_history = (len(self.display_board.move_stack) < len(full_move_list))
-            if self.stockfish_analyzer and self.eval_bar_var.get():
-                self.new_eval_request.set()
+            self.history_cursor.forward()
+            self.viewing_history = not self.history_cursor.at_end
+            if self.analysis_pool:
+                self._show_cached_analysis()
+                self._request_analysis()
             self.update_display()
 
     def nav_to_end(self):
@@ -482,16 +503,17 @@ class ChessApp:
         if hasattr(self, 'board_widget') and self.board_widget:
             self.board_widget.cancel_animation()
         
-        self.display_board = self.logic.board.copy()
+        self.history_cursor.to_end()
         self.viewing_history = False
-        if self.stockfish_analyzer and self.eval_bar_var.get():
-            self.new_eval_request.set()
+        if self.analysis_pool:
+            self._show_cached_analysis()
+            self._request_analysis()
         self.update_display()
 
     def toggle_pause(self):
         self.is_paused = not self.is_paused
         self.pause_button.config(text="Riprendi" if self.is_paused else "Pausa")
-        if not self.is_paused and not self.logic.board.is_game_over():
+        if not self.is_paused and not self.logic.is_game_over():
             self.trigger_ai_move()
 
     def update_analysis_box(self, top_moves):
@@ -504,7 +526,7 @@ class ChessApp:
         if safe_widget_exists(self, 'analysis_text'):
             self.analysis_text.config(state=tk.NORMAL)
             self.analysis_text.delete('1.0', tk.END)
-            temp_board = self.logic.board.copy()
+            temp_board = self._analysis_board()
             for move_info in top_moves:
                 eval_str = ""
                 if move_info['Centipawn'] is not None:
@@ -519,63 +541,164 @@ class ChessApp:
                     self.analysis_text.insert(tk.END, f"({eval_str}) {move_info['Move']}\n")
             self.analysis_text.config(state=tk.DISABLED)
 
-    def _eval_loop(self):
-        last_analyzed_fen = None
-        while self.eval_thread_running:
-            # Aspetta il segnale con timeout per controllare periodicamente cambiamenti di posizione
-            self.new_eval_request.wait(timeout=0.5)
-            if not self.eval_thread_running:
-                break
-            
-            # Se viene richiesta una re-analisi forzata, resetta last_analyzed_fen
-            if self.force_reanalyze:
+    def _request_analysis(self):
+        """Chiede una nuova analisi live, interrompendo subito quella di una posizione non più visualizzata."""
+        if self.eval_task:
+            StockfishManager.loop().call_soon(self._on_analysis_request, self._analysis_board().fen())
+
+    def _on_analysis_request(self, fen):
+        """Riceve una richiesta di analisi sul thread del loop dei motori."""
+        self.live_fen = fen
+        if self.live_engine and self.live_search_fen not in (None, fen):
+            self.live_engine.stop()
+        if self.new_eval_request:
+            self.new_eval_request.set()
+
+    def _wake_eval_loop(self):
+        """Sveglia la coroutine di analisi (sul thread del loop dei motori) per farla terminare."""
+        if self.live_engine:
+            self.live_engine.stop()
+        if self.new_eval_request:
+            self.new_eval_request.set()
+
+    async def _eval_loop(self, generation, fen):
+        self.live_fen = fen
+        wakeup = self.new_eval_request = asyncio.Event()
+        wakeup.set()
+        engine = None
+        try:
+            # L'analisi live tiene in prestito un motore per tutta la sua durata
+            async with self.analysis_pool.lease() as engine:
+                self.live_engine = engine
                 last_analyzed_fen = None
-                self.force_reanalyze = False
-            
-            try:
-                # Usa display_board se stiamo visualizzando la cronologia, altrimenti usa logic.board
-                board_to_analyze = self.display_board if self.viewing_history else self.logic.board
-                fen = board_to_analyze.fen()
-                
-                # Analizza solo se la posizione è cambiata o se è stata esplicitamente richiesta
-                if fen != last_analyzed_fen:
-                    self.stockfish_analyzer.set_fen_position(fen)
-                    top_moves = self.stockfish_analyzer.get_top_moves(TOP_MOVES_COUNT)
-                    self.eval_queue.put((top_moves, self.logic.analysis_depth))
-                    last_analyzed_fen = fen
-            except Exception as e:
-                if self.eval_thread_running:
-                    print(f"Errore nel thread di valutazione: {e}")
-                break
+                while generation == self.eval_generation:
+                    await wakeup.wait()
+                    wakeup.clear()
+                    if generation != self.eval_generation:
+                        break
+
+                    # Se viene richiesta una re-analisi forzata, resetta last_analyzed_fen
+                    if self.force_reanalyze:
+                        last_analyzed_fen = None
+                        self.force_reanalyze = False
+
+                    # Analizza solo se la posizione è cambiata o se è stata esplicitamente richiesta
+                    fen = self.live_fen
+                    if fen != last_analyzed_fen and await self._stream_analysis(engine, fen):
+                        last_analyzed_fen = fen
+        except Exception as e:
+            if generation == self.eval_generation:
+                print(f"Errore nell'analisi live: {e}")
+        finally:
+            if self.live_engine is engine:
+                self.live_engine = None
+
+    async def _stream_analysis(self, engine, fen):
+        """
+        Analizza una posizione in streaming, accodando il risultato di ogni profondità completata.
+        Mostra subito quanto già noto dalle cache e salta la ricerca se è già abbastanza profondo.
+
+        Args:
+            engine: Motore UCI in prestito all'analisi live
+            fen: FEN della posizione da analizzare
+
+        Returns:
+            False se la ricerca è stata interrotta perché la posizione richiesta è cambiata
+        """
+        cache_depth = self.logic.analysis_depth
+        cached = self.live_analysis_cache.lookup(fen)
+        if not cached or cached['depth'] < cache_depth:
+            # Le posizioni analizzate in sessioni precedenti arrivano dalla cache su disco
+            seeded = lookup_top_moves(engine, fen, cache_depth, TOP_MOVES_COUNT)
+            if seeded and self.live_analysis_cache.store(fen, seeded, cache_depth):
+                cached = self.live_analysis_cache.lookup(fen)
+        if cached:
+            self.eval_queue.put((fen, cached['top_moves'], cached['depth']))
+            if LIVE_ANALYSIS_MAX_DEPTH and cached['depth'] >= LIVE_ANALYSIS_MAX_DEPTH:
+                return True
+
+        def on_depth(top_moves, depth):
+            # Le profondità già coperte dalla cache non sovrascrivono il risultato mostrato
+            if self.live_analysis_cache.store(fen, top_moves, depth):
+                self.eval_queue.put((fen, top_moves, depth))
+            if depth == cache_depth:
+                store_top_moves(engine, fen, depth, TOP_MOVES_COUNT, top_moves)
+
+        self.live_search_fen = fen
+        try:
+            top_moves = await engine.analyse(fen, LIVE_ANALYSIS_MAX_DEPTH, TOP_MOVES_COUNT, on_depth)
+        finally:
+            self.live_search_fen = None
+        if not top_moves:
+            # Posizione finale: nessuna mossa da mostrare
+            self.eval_queue.put((fen, [], 0))
+        return self.live_fen == fen
+
+    def _analysis_board(self):
+        """Restituisce la posizione da analizzare: quella visualizzata se si naviga nella cronologia."""
+        return self.display_board if self.viewing_history else self.logic.board
+
+    def _apply_analysis(self, top_moves, depth):
+        """
+        Mostra un risultato del motore: barra di valutazione, freccia e casella di analisi
+        vengono aggiornate al prossimo flush, insieme alla scacchiera.
+        Più risultati arrivati prima del flush ne producono un solo ridisegno.
+        
+        Args:
+            top_moves: Lista di dizionari con le mosse e le loro valutazioni
+            depth: Profondità a cui è stata ottenuta l'analisi
+        """
+        self.pending_analysis = (top_moves, depth)
+        self.ui_updates.invalidate("eval_bar", "board")
+
+    def _render_eval_bar(self):
+        """Disegna l'ultimo risultato del motore in attesa (vedi _apply_analysis)."""
+        if self.pending_analysis is None or not safe_widget_exists(self, 'board_widget'):
+            return
+        top_moves, depth = self.pending_analysis
+        self.pending_analysis = None
+        best_move_info = top_moves[0]
+        eval_dict = {
+            'type': 'cp' if best_move_info['Centipawn'] is not None else 'mate',
+            'value': best_move_info['Centipawn'] if best_move_info['Centipawn'] is not None else best_move_info['Mate']
+        }
+        
+        if safe_widget_exists(self, 'eval_bar'):
+            self.eval_bar.update_eval(eval_dict)
             
-            self.new_eval_request.clear()
+        if self.show_best_move_var.get():
+            if safe_widget_exists(self, 'engine_info_label'):
+                self.engine_info_label.config(text=f"Profondità Motore: {depth}")
+            self.board_widget.best_move_arrow = chess.Move.from_uci(best_move_info['Move'])
+            self.update_analysis_box(top_moves)
+        else:
+            self.board_widget.best_move_arrow = None
+
+    def _show_cached_analysis(self):
+        """Mostra subito l'analisi della posizione visualizzata, se è già in cache."""
+        if not safe_widget_exists(self, 'board_widget'):
+            return
+        cached = self.live_analysis_cache.lookup(self._analysis_board().fen())
+        if cached:
+            self._apply_analysis(cached['top_moves'], cached['depth'])
+        else:
+            # La freccia si riferisce alla posizione precedente: la si toglie fino al nuovo risultato
+            self.pending_analysis = None
+            self.board_widget.best_move_arrow = None
 
     def _process_eval_queue(self):
         try:
             while not self.eval_queue.empty():
-                top_moves, depth = self.eval_queue.get_nowait()
+                fen, top_moves, depth = self.eval_queue.get_nowait()
+                # Scarta i risultati di posizioni da cui l'utente si è già spostato
+                if fen != self._analysis_board().fen():
+                    continue
                 if safe_widget_exists(self, 'board_widget') and top_moves:
-                    best_move_info = top_moves[0]
-                    eval_dict = {
-                        'type': 'cp' if best_move_info['Centipawn'] is not None else 'mate',
-                        'value': best_move_info['Centipawn'] if best_move_info['Centipawn'] is not None else best_move_info['Mate']
-                    }
-                    
-                    if safe_widget_exists(self, 'eval_bar'):
-                        self.eval_bar.update_eval(eval_dict)
-                        
-                    if self.show_best_move_var.get():
-                        if safe_widget_exists(self, 'engine_info_label'):
-                            self.engine_info_label.config(text=f"Profondità Motore: {depth}")
-                        self.board_widget.best_move_arrow = chess.Move.from_uci(best_move_info['Move'])
-                        self.update_analysis_box(top_moves)
-                    else:
-                        self.board_widget.best_move_arrow = None
-                    self.update_display()
+                    self._apply_analysis(top_moves, depth)
         except queue.Empty:
             pass
         finally:
-            if self.eval_thread_running:
+            if self.eval_task:
                 self.master.after(EVAL_QUEUE_PROCESS_DELAY, self._process_eval_queue)
 
     def finalize_move(self, move, skip_animation=False):
@@ -588,15 +711,15 @@ class ChessApp:
                 self.nav_to_end()
                 self.update_board_orientation()
                 
-                if self.logic.board.is_game_over():
+                if self.logic.is_game_over():
                     self.game_over_state = True
                     self.board_widget.is_enabled = True
                 else:
-                    if self.stockfish_analyzer:
-                        self.new_eval_request.set()
+                    if self.analysis_pool:
+                        self._request_analysis()
                     
                     # Gestisce premove e turno AI
-                    if self.premove and self.premove in self.logic.board.legal_moves:
+                    if self.premove and self.logic.is_legal(self.premove):
                         self.execute_move(self.premove)
                         self.premove = None
                     elif is_ai_turn(self.game_mode, self.logic.board.turn, self.player_color):
@@ -613,13 +736,34 @@ class ChessApp:
             self.board_widget.animate_move(move, after_animation)
 
     def update_move_history(self):
-        if safe_widget_exists(self, 'history_text'):
-            self.history_text.config(state=tk.NORMAL)
-            self.history_text.delete('1.0', tk.END)
-            game = chess.pgn.Game.from_board(self.logic.board)
-            self.history_text.insert('1.0', str(game.mainline_moves()))
-            self.history_text.see(tk.END)
-            self.history_text.config(state=tk.DISABLED)
+        """
+        Aggiorna la cronologia in notazione PGN modificando solo la coda cambiata del widget:
+        le mosse annullate vengono cancellate a partire dal loro mark, quelle nuove aggiunte in fondo.
+        """
+        if not safe_widget_exists(self, 'history_text'):
+            return
+        san_moves = self.logic.san_moves
+        keep = min(self.history_rendered, self.logic.take_history_changes())
+        if keep == self.history_rendered == len(san_moves):
+            return
+        
+        self.history_text.config(state=tk.NORMAL)
+        if keep < self.history_rendered:
+            self.history_text.delete(f"ply{keep}", "end-1c")
+            for ply in range(keep, self.history_rendered):
+                self.history_text.mark_unset(f"ply{ply}")
+        for ply in range(keep, len(san_moves)):
+            mark = f"ply{ply}"
+            self.history_text.mark_set(mark, "end-1c")
+            self.history_text.mark_gravity(mark, tk.LEFT)
+            separator = " " if ply else ""
+            if ply % 2 == 0:
+                self.history_text.insert("end-1c", f"{separator}{ply // 2 + 1}. {san_moves[ply]}")
+            else:
+                self.history_text.insert("end-1c", f"{separator}{san_moves[ply]}")
+        self.history_rendered = len(san_moves)
+        self.history_text.see(tk.END)
+        self.history_text.config(state=tk.DISABLED)
     
     def update_button_states(self):
         is_game_running = not self.game_over_state
@@ -644,10 +788,10 @@ class ChessApp:
 
         # Gestione pulsanti di navigazione
         if safe_widget_exists(self, 'nav_start_btn'):
-            can_go_back = len(self.display_board.move_stack) > 0
+            can_go_back = self.history_cursor.ply > 0
             self.nav_start_btn.config(state=tk.NORMAL if can_go_back else tk.DISABLED)
             self.nav_prev_btn.config(state=tk.NORMAL if can_go_back else tk.DISABLED)
-            can_go_forward = len(self.display_board.move_stack) < len(self.logic.board.move_stack)
+            can_go_forward = not self.history_cursor.at_end
             self.nav_next_btn.config(state=tk.NORMAL if can_go_forward else tk.DISABLED)
             self.nav_end_btn.config(state=tk.NORMAL if can_go_forward else tk.DISABLED)
             
@@ -657,9 +801,7 @@ class ChessApp:
             self.toggle_pause()
             
         if messagebox.askyesno("Conferma", "Tornare al menu principale? La partita corrente sarà persa."):
-            if self.ai_move_job_id:
-                self.master.after_cancel(self.ai_move_job_id)
-                self.ai_move_job_id = None
+            self._cancel_ai_move()
             self.logic.reset()
             self.selected_square = None
             self.premove = None
@@ -678,23 +820,22 @@ class ChessApp:
     def _toggle_eval_bar(self):
         if self.eval_bar_var.get():
             self.eval_bar_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
-            self.new_eval_request.set()
+            self._request_analysis()
         else:
             self.eval_bar_frame.grid_remove()
             
-    def _start_eval_thread(self):
-        if not (self.eval_thread and self.eval_thread.is_alive()):
-            self.eval_thread_running = True
-            self.eval_thread = threading.Thread(target=self._eval_loop, daemon=True)
-            self.eval_thread.start()
-            
-    def _stop_eval_thread(self):
-        self.eval_thread_running = False
-        if self.eval_thread:
-            self.new_eval_request.set()
-            self.eval_thread.join(timeout=0.2)
-        self.eval_thread = None
-        
+    def _start_eval_task(self):
+        if not (self.eval_task and not self.eval_task.done()):
+            self.eval_generation += 1
+            self.eval_task = StockfishManager.submit(self._eval_loop(self.eval_generation, self._analysis_board().fen()))
+
+    def _stop_eval_task(self):
+        if self.eval_task:
+            # La coroutine termina da sola appena sveglia, interrompendo la ricerca in corso
+            self.eval_generation += 1
+            StockfishManager.loop().call_soon(self._wake_eval_loop)
+        self.eval_task = None
+
     def setup_shortcuts(self):
         is_normal = lambda btn: btn.winfo_exists() and btn.cget('state') == 'normal'
         self.master.bind("<Control-z>", lambda e: is_normal(self.undo_button) and self.undo_last_move())
@@ -724,9 +865,10 @@ class ChessApp:
         if not self.logic.board.move_stack:
             return
         
-        # Cancella eventuali animazioni in corso
+        # Cancella eventuali animazioni e ricerche dell'AI in corso
         if hasattr(self, 'board_widget') and self.board_widget:
             self.board_widget.cancel_animation()
+        self._cancel_ai_move()
         
         # Annulla le mosse
         for _ in range(moves_to_undo): 
@@ -734,7 +876,8 @@ class ChessApp:
         
         self.nav_to_end()
         self.update_board_orientation()
-        self.new_eval_request.set()
+        self._request_analysis()
+        self._resume_after_history_change()
         
     def redo_last_move(self):
         """Ripristina l'ultima mossa annullata senza animazione"""
@@ -743,9 +886,10 @@ class ChessApp:
         if not self.logic.undone_moves:
             return
         
-        # Cancella eventuali animazioni in corso
+        # Cancella eventuali animazioni e ricerche dell'AI in corso
         if hasattr(self, 'board_widget') and self.board_widget:
             self.board_widget.cancel_animation()
+        self._cancel_ai_move()
         
         # Ripristina le mosse
         for _ in range(moves_to_redo): 
@@ -753,8 +897,18 @@ class ChessApp:
         
         self.nav_to_end()
         self.update_board_orientation()
-        self.new_eval_request.set()
+        self._request_analysis()
+        self._resume_after_history_change()
         
+    def _resume_after_history_change(self):
+        """Dopo undo/redo riavvia l'AI se tocca a lei, altrimenti restituisce la scacchiera al giocatore."""
+        if self.logic.is_game_over():
+            self.board_widget.is_enabled = True
+        elif is_ai_turn(self.game_mode, self.logic.board.turn, self.player_color):
+            self.trigger_ai_move()
+        else:
+            self.board_widget.is_enabled = True
+
     def copy_pgn(self):
         game = chess.pgn.Game.from_board(self.logic.board)
         
@@ -824,12 +978,9 @@ class ChessApp:
             self.deselect_and_update()
 
     def find_move(self, from_sq, to_sq):
-        move = chess.Move(from_sq, to_sq)
-        if self.logic.needs_promotion(move):
-            if chess.Move(from_sq, to_sq, promotion=chess.QUEEN) in self.logic.board.legal_moves:
-                return move
-        elif move in self.logic.board.legal_moves:
-            return move
+        # Una promozione legale restituisce la mossa senza pezzo: verrà scelto dall'utente
+        if self.logic.get_legal_moves_between(from_sq, to_sq):
+            return chess.Move(from_sq, to_sq)
         return None
 
     def execute_move(self, move, skip_animation=False):
@@ -841,14 +992,8 @@ class ChessApp:
     def trigger_ai_move(self):
         if self.game_mode == 'cvc' and self.is_paused:
             return
+        self._cancel_ai_move()
         self.board_widget.is_enabled = False
-        delay = AI_MOVE_DELAY_CVC if self.game_mode == 'cvc' else AI_MOVE_DELAY_NORMAL
-        self.ai_move_job_id = self.master.after(delay, self.make_ai_move)
-
-    def make_ai_move(self):
-        self.ai_move_job_id = None
-        if not self.master.winfo_exists():
-            return
         
         # Determina quale livello usare in base alla modalità di gioco e al turno
         level_to_use = get_ai_level_for_turn(
@@ -859,8 +1004,38 @@ class ChessApp:
             self.ai_black_level
         )
         
-        # Passa il livello direttamente alla funzione che calcola la mossa
-        ai_move = self.logic.get_ai_move(level_to_use)
+        # La ricerca parte subito sul loop dei motori: il ritardo artificiale si sovrappone
+        # ad essa, quindi la mossa arriva dopo max(ritardo, ricerca) e la UI resta reattiva
+        self.ai_future = StockfishManager.submit(self.logic.get_ai_move_async(level_to_use, self.logic.board.fen()))
+        delay = AI_MOVE_DELAY_CVC if self.game_mode == 'cvc' else AI_MOVE_DELAY_NORMAL
+        self.ai_move_job_id = self.master.after(delay, self.make_ai_move, self.ai_generation)
+
+    def _cancel_ai_move(self):
+        """Annulla la mossa dell'AI in attesa, interrompendo la ricerca se è già avviata."""
+        self.ai_generation += 1
+        if self.ai_move_job_id:
+            self.master.after_cancel(self.ai_move_job_id)
+            self.ai_move_job_id = None
+        if self.ai_future:
+            self.ai_future.cancel()
+            self.ai_future = None
+
+    def make_ai_move(self, generation):
+        self.ai_move_job_id = None
+        if generation != self.ai_generation or not self.master.winfo_exists():
+            return
+        
+        # Ritardo minimo trascorso ma ricerca ancora in corso: ricontrolla a breve
+        if not self.ai_future.done():
+            self.ai_move_job_id = self.master.after(AI_MOVE_POLL_INTERVAL, self.make_ai_move, generation)
+            return
+        
+        try:
+            ai_move = self.ai_future.result()
+        except Exception as e:
+            print(f"Errore nel calcolo della mossa dell'AI: {e}")
+            ai_move = None
+        self.ai_future = None
         
         if ai_move:
             self.execute_move(ai_move)
@@ -874,14 +1049,22 @@ class ChessApp:
         self.board_widget.hide_promotion_choices()
         self.finalize_move(move)
     
-    def update_display(self):
-        board_to_show = self.display_board if self.viewing_history else self.logic.board
+    def update_display(self, *regions):
+        """
+        Segna da ridisegnare le regioni della UI; il disegno avviene in un unico flush
+        con after_idle, quindi più chiamate ravvicinate costano un solo aggiornamento.
         
-        # Aggiorna la scacchiera
+        Args:
+            regions: Regioni da aggiornare (default: scacchiera, stato, pulsanti e cronologia)
+        """
+        self.ui_updates.invalidate(*(regions or ("board", "status", "buttons", "history")))
+
+    def _render_board(self):
         if safe_widget_exists(self, 'board_widget'):
+            board_to_show = self.display_board if self.viewing_history else self.logic.board
             self.board_widget.draw(board_to_show)
-        
-        # Aggiorna lo status label
+
+    def _render_status(self):
         if safe_widget_exists(self, 'status_label'):
             # Mostra indicatore di caricamento di Stockfish se in corso
             if self.is_loading_stockfish and not self.stockfish_loaded.is_set():
@@ -890,9 +1073,6 @@ class ChessApp:
                 # Mostra solo lo stato del gioco, senza messaggi dinamici
                 status_text = self.logic.get_game_status()
             self.status_label.config(text=status_text)
-        
-        self.update_button_states()
-        self.update_move_history()
     
     def start_game_review(self):
         review_window = Toplevel(self.master)
@@ -916,103 +1096,43 @@ class ChessApp:
         threading.Thread(target=self._run_analysis_thread, daemon=True).start()
         self.master.after(100, self._process_review_queue, review_window, progress_bar, status_label)
 
-    def _convert_eval_to_cp(self, evaluation):
-        """
-        Converte una valutazione in centipawns.
-        Wrapper per la funzione centralizzata in stockfish_manager.
-        
-        Args:
-            evaluation: Dizionario con 'type' e 'value'
-            
-        Returns:
-            Valore in centipawns (int)
-        """
-        return eval_to_centipawns(evaluation)
-
-
-
     def _run_analysis_thread(self):
+        moves = list(self.logic.board.move_stack)
+        report_progress = lambda done, total: self.review_queue.put(('progress', done, total))
         try:
-            analyzer = StockfishManager.get_instance(key="review_analyzer")
-            analyzer.set_depth(14)
-            # Crea un'istanza del nuovo classificatore avanzato
-            classifier = AdvancedMoveClassifier(analyzer)
-        except Exception as e:
+            # Le posizioni vengono distribuite su STOCKFISH_REVIEW_WORKERS motori in parallelo
+            results, white_final_accuracy, black_final_accuracy = review_game(
+                moves, depth=REVIEW_ANALYSIS_DEPTH, progress_callback=report_progress
+            )
+        except EngineUnavailableError as e:
             self.review_queue.put(('error', f"Impossibile avviare il motore di analisi: {e}"))
             return
-            
-        board = chess.Board()
-        moves = list(self.logic.board.move_stack)
-        results = []
-        white_accuracies, black_accuracies = [], []
-        win_chances = []  # Per il calcolo dell'accuratezza pesata per volatilità
-        prev_eval_cp = 20
-
-        # Aggiungi la probabilità di vittoria iniziale
-        from src.analysis.accuracy_calculator import winning_chances_percent
-        win_chances.append(winning_chances_percent(prev_eval_cp))
-
-        for i, move in enumerate(moves):
-            self.review_queue.put(('progress', i + 1, len(moves)))
-            turn = board.turn
-            
-            # --- LOGICA DI ANALISI MIGLIORATA ---
-            
-            # 1. Ottieni le migliori mosse PRIMA di muovere
-            analyzer.set_fen_position(board.fen())
-            top_moves = analyzer.get_top_moves(3)  # Prendiamo 3 mosse per analisi più approfondita
-            if not top_moves:
-                board.push(move)
-                continue
-
-            # 2. Classifica la mossa usando il sistema avanzato
-            classification_raw = classifier.classify_move(board, move, top_moves)
-            # Converte la chiave dalla mappatura del classificatore
-            classification_key = classifier.classification_map.get(classification_raw, classification_raw.lower())
-            
-            # 3. Calcola l'accuratezza usando le nuove funzioni
-            win_chance_before_white = winning_chances_percent(prev_eval_cp)
-            
-            san_move = board.san(move)
-            board.push(move)
-            
-            current_eval_info = {}
-            current_eval_cp = 0
-            if board.is_checkmate():
-                current_eval_cp = WINNING_CHANCES_MATE_THRESHOLD if turn == chess.WHITE else -WINNING_CHANCES_MATE_THRESHOLD
-                current_eval_info = {'type': 'mate', 'value': 1 if turn == chess.WHITE else -1}
-            else:
-                analyzer.set_fen_position(board.fen())
-                current_eval_info = analyzer.get_evaluation()
-                current_eval_cp = self._convert_eval_to_cp(current_eval_info)
-
-            win_chance_after_white = winning_chances_percent(current_eval_cp)
-            win_chances.append(win_chance_after_white)
-            
-            win_chance_before_player = win_chance_before_white if turn == chess.WHITE else 100 - win_chance_before_white
-            win_chance_after_player = win_chance_after_white if turn == chess.WHITE else 100 - win_chance_after_white
-
-            accuracy = move_accuracy_percent(win_chance_before_player, win_chance_after_player)
-            (white_accuracies if turn == chess.WHITE else black_accuracies).append(accuracy)
+        self.review_queue.put(('done', results, white_final_accuracy, black_final_accuracy))
 
-            results.append({
-                'move': move, 'san': san_move, 
-                'classification': EVAL_CLASSIFICATIONS[classification_key],
-                'classification_key': classification_key,  # Aggiungiamo la chiave per le immagini
-                'color': EVAL_COLORS[classification_key],
-                'evaluation': current_eval_info
-            })
-            prev_eval_cp = current_eval_cp
-        
-        # Calcola l'accuratezza finale usando il nuovo sistema avanzato
-        white_final_accuracy = calculate_player_accuracy(white_accuracies, win_chances, True)
-        black_final_accuracy = calculate_player_accuracy(black_accuracies, win_chances, False)
+    def _drain_review_queue(self):
+        """
+        Svuota la coda della game review: dei messaggi di avanzamento conta solo l'ultimo,
+        un 'done' o un 'error' viene restituito appena arriva.
         
-        self.review_queue.put(('done', results, white_final_accuracy, black_final_accuracy))
+        Returns:
+            L'ultimo messaggio utile della coda
+            
+        Raises:
+            queue.Empty: se la coda è vuota
+        """
+        message = self.review_queue.get_nowait()
+        while message[0] == 'progress':
+            try:
+                message = self.review_queue.get_nowait()
+            except queue.Empty:
+                break
+        return message
 
     def _process_review_queue(self, review_window, progress_bar, status_label):
         """
         Processa la coda dei risultati dell'analisi di game review.
+        Ogni tick consuma tutti i messaggi in attesa, così il risultato finale non
+        resta in coda dietro ai messaggi di avanzamento.
         
         Args:
             review_window: Finestra del game review
@@ -1020,7 +1140,7 @@ class ChessApp:
             status_label: Etichetta di stato
         """
         try:
-            message = self.review_queue.get_nowait()
+            message = self._drain_review_queue()
             msg_type, *data = message
 
             if msg_type == 'progress':
@@ -1041,7 +1161,7 @@ class ChessApp:
                 left_panel.pack(side=LEFT, fill=Y, padx=(0, 10), pady=10)
                 
                 board_frame = ttk.Frame(left_panel)
-                board_frame.pack(side=TOP)
+                board_frame.pack(side=TOP, fill=Y, expand=True)
                 
                 self.review_board_widget = ChessBoard(board_frame, self)
                 self.review_eval_bar = EvalBar(board_frame)
@@ -1112,10 +1232,11 @@ class ChessApp:
             return
         move_index = int(float(value))
         
-        # Ricostruisci la scacchiera fino alla posizione attuale
-        moves = [data['move'] for data in self.review_data]
-        board_after_move = build_board_from_moves(moves, move_index)
         current_move_data = self.review_data[move_index]
+
+        # Ricostruisci la posizione dall'istantanea salvata dalla review, senza rigiocare
+        # la partita: la mossa viene rigiocata solo per evidenziarla come ultima mossa
+        board_after_move = review_board_at(current_move_data)
         
         # Disegna la scacchiera nello stato attuale
         self.review_board_widget.draw(board_after_move)
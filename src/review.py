@@ -0,0 +1,286 @@
+# review.py
+"""
+Game Review da riga di comando, senza interfaccia grafica.
+
+Analizza tutte le partite di un file PGN con la stessa pipeline della finestra
+"Game Review" (una ricerca MultiPV per posizione, classificazione con
+AdvancedMoveClassifier, accuratezza con calculate_player_accuracy) e scrive
+classificazioni, valutazioni e accuratezze in formato JSONL o CSV.
+Più partite vengono analizzate contemporaneamente, una per motore del pool.
+
+Uso:
+    python -m src.review partite.pgn -o risultati.jsonl
+    python -m src.review partite.pgn -o risultati.csv --depth 12 --jobs 4
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+import threading
+import chess
+import chess.pgn
+from typing import Any, Dict, Iterator, Optional, Tuple
+from src.analysis.game_review import build_positions, search_positions_async, classify_game, run_workers
+from src.core.stockfish_manager import StockfishManager, EngineUnavailableError
+from src.core.eval_cache import get_evaluation_cache
+from src.analysis.safety_memo import safety_memo_totals
+from src.config import REVIEW_ANALYSIS_DEPTH
+
+CSV_FIELDS = [
+    'game', 'white', 'black', 'result', 'ply', 'color', 'san', 'uci',
+    'classification_key', 'classification', 'eval_type', 'eval_value',
+    'white_accuracy', 'black_accuracy',
+]
+PROGRESS_INTERVAL = 1.0  # Secondi minimi tra due aggiornamenti della riga di avanzamento
+CANCEL_TIMEOUT = 5.0  # Secondi massimi di attesa dell'arresto dei worker dopo un'interruzione
+
+
+def count_games(path: str) -> int:
+    """
+    Conta le partite di un file PGN senza interpretarle (righe "[Event ").
+
+    Args:
+        path: Percorso del file PGN
+
+    Returns:
+        Numero di partite stimato
+    """
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        return sum(1 for line in f if line.startswith("[Event "))
+
+
+def iter_games(pgn_file) -> Iterator[Tuple[int, chess.pgn.Game]]:
+    """
+    Legge le partite una alla volta, senza caricare l'intero file in memoria.
+
+    Yields:
+        Tuple (indice della partita a partire da 1, partita)
+    """
+    index = 0
+    while True:
+        game = chess.pgn.read_game(pgn_file)
+        if game is None:
+            return
+        index += 1
+        yield index, game
+
+
+def game_to_record(index: int, game: chess.pgn.Game, results, white_accuracy: float,
+                   black_accuracy: float) -> Dict[str, Any]:
+    """
+    Converte il risultato della Game Review di una partita in un dizionario serializzabile.
+
+    Returns:
+        Dizionario con intestazioni, accuratezze e l'elenco delle mosse classificate
+    """
+    first_to_move = game.board().turn
+    return {
+        'game': index,
+        'event': game.headers.get("Event", "?"),
+        'white': game.headers.get("White", "?"),
+        'black': game.headers.get("Black", "?"),
+        'result': game.headers.get("Result", "*"),
+        'white_accuracy': white_accuracy,
+        'black_accuracy': black_accuracy,
+        'moves': [{
+            'ply': result['ply'],
+            'color': 'white' if (first_to_move == chess.WHITE) == (result['ply'] % 2 == 1) else 'black',
+            'san': result['san'],
+            'uci': result['move'].uci(),
+            'classification_key': result['classification_key'],
+            'classification': result['classification'],
+            'evaluation': result['evaluation'],
+        } for result in results],
+    }
+
+
+class ResultWriter:
+    """Scrive i risultati in JSONL (una partita per riga) o CSV (una mossa per riga)."""
+
+    def __init__(self, path: str, output_format: str):
+        self.format = output_format
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._csv = None
+        if output_format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, record: Dict[str, Any]):
+        if self._csv is None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            return
+        for move in record['moves']:
+            evaluation = move['evaluation'] or {}
+            self._csv.writerow({
+                'game': record['game'], 'white': record['white'], 'black': record['black'],
+                'result': record['result'], 'ply': move['ply'], 'color': move['color'],
+                'san': move['san'], 'uci': move['uci'],
+                'classification_key': move['classification_key'],
+                'classification': move['classification'],
+                'eval_type': evaluation.get('type'), 'eval_value': evaluation.get('value'),
+                'white_accuracy': record['white_accuracy'], 'black_accuracy': record['black_accuracy'],
+            })
+
+    def close(self):
+        self._file.close()
+
+
+class ReviewStats:
+    """Contatori di avanzamento e throughput dell'analisi batch."""
+
+    def __init__(self, total_games: Optional[int] = None):
+        self.total_games = total_games
+        self.games = 0
+        self.positions = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self._last_report = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def games_per_minute(self) -> float:
+        return self.games * 60 / self.elapsed if self.elapsed > 0 else 0.0
+
+    def positions_per_second(self) -> float:
+        return self.positions / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self, force: bool = False):
+        """Aggiorna la riga di avanzamento su stderr (al massimo una volta ogni PROGRESS_INTERVAL)."""
+        now = time.monotonic()
+        if not force and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        total = f"/{self.total_games}" if self.total_games else ""
+        sys.stderr.write(
+            f"\rPartite {self.games}{total} | {self.games_per_minute():.1f} partite/min | "
+            f"{self.positions_per_second():.1f} posizioni/s | saltate {self.skipped} | errori {self.failed}"
+        )
+        sys.stderr.flush()
+
+
+async def review_pgn(pgn_path: str, writer: ResultWriter, stats: ReviewStats,
+                     jobs: int, depth: int = REVIEW_ANALYSIS_DEPTH):
+    """
+    Analizza tutte le partite di un file PGN, jobs partite alla volta.
+    Va eseguita sul loop dei motori.
+
+    Args:
+        pgn_path: Percorso del file PGN
+        writer: Destinazione dei risultati
+        stats: Contatori da aggiornare
+        jobs: Partite analizzate contemporaneamente (un motore ciascuna)
+        depth: Profondità di analisi
+
+    Raises:
+        EngineUnavailableError: Se non è stato possibile ottenere nessun motore
+    """
+    loop = asyncio.get_running_loop()
+
+    with open(pgn_path, encoding="utf-8-sig", errors="replace") as pgn_file:
+        games = iter_games(pgn_file)
+
+        async def worker():
+            # Tutti i worker girano sullo stesso loop: la lettura del PGN non richiede lock
+            for index, game in games:
+                moves = list(game.mainline_moves())
+                if game.errors or not moves:
+                    stats.skipped += 1
+                    continue
+                try:
+                    positions = build_positions(moves, game.board())
+                    searches = await search_positions_async(positions, workers=1, depth=depth)
+                    # La classificazione è solo calcolo: la si sposta fuori dal loop per non
+                    # rallentare la comunicazione con gli altri motori
+                    results, white_accuracy, black_accuracy = await loop.run_in_executor(
+                        None, classify_game, moves, positions, searches
+                    )
+                except EngineUnavailableError:
+                    raise
+                except Exception as e:
+                    stats.failed += 1
+                    print(f"\nErrore nell'analisi della partita {index}: {e}", file=sys.stderr)
+                    continue
+                writer.write(game_to_record(index, game, results, white_accuracy, black_accuracy))
+                stats.games += 1
+                stats.positions += len(positions)
+                stats.report()
+
+        # Se un worker fallisce (motore non disponibile) gli altri vengono fermati
+        await run_workers([worker() for _ in range(jobs)])
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.review",
+        description="Game Review senza interfaccia grafica per tutte le partite di un file PGN."
+    )
+    parser.add_argument("pgn", help="File PGN da analizzare")
+    parser.add_argument("-o", "--output", required=True, help="File di destinazione (.jsonl o .csv)")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="Formato di uscita (default: dedotto dall'estensione, altrimenti jsonl)")
+    parser.add_argument("--depth", type=int, default=REVIEW_ANALYSIS_DEPTH,
+                        help=f"Profondità di analisi (default: {REVIEW_ANALYSIS_DEPTH})")
+    parser.add_argument("--jobs", type=int, default=0,
+                        help="Partite analizzate in parallelo (default: un motore per core)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    output_format = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    jobs = args.jobs or StockfishManager.get_pool(threads=1).max_size
+
+    if not os.path.isfile(args.pgn):
+        print(f"File non trovato: {args.pgn}", file=sys.stderr)
+        return 1
+
+    stats = ReviewStats(count_games(args.pgn))
+    writer = ResultWriter(args.output, output_format)
+    stopped = threading.Event()
+
+    async def review():
+        try:
+            await review_pgn(args.pgn, writer, stats, jobs, args.depth)
+        finally:
+            stopped.set()
+
+    future = StockfishManager.submit(review())
+    try:
+        future.result()
+    except EngineUnavailableError as e:
+        print(f"\nImpossibile avviare il motore di analisi: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        # I worker girano sul loop dei motori: vanno fermati prima di chiudere il file
+        # e i pool, altrimenti scriverebbero su un file chiuso avviando nuovi motori
+        future.cancel()
+        stopped.wait(CANCEL_TIMEOUT)
+        print("\nAnalisi interrotta.", file=sys.stderr)
+    finally:
+        writer.close()
+        stats.report(force=True)
+        StockfishManager.clear_cache()
+
+    print(file=sys.stderr)
+    print(f"Partite analizzate: {stats.games} (saltate {stats.skipped}, errori {stats.failed})", file=sys.stderr)
+    print(f"Posizioni: {stats.positions} in {stats.elapsed:.1f} s", file=sys.stderr)
+    print(f"Throughput: {stats.games_per_minute():.1f} partite/min, "
+          f"{stats.positions_per_second():.1f} posizioni/s con {jobs} motori", file=sys.stderr)
+    cache = get_evaluation_cache()
+    if cache is not None:
+        print(f"Cache valutazioni: {cache.stats()['hit_rate']:.0%} di hit", file=sys.stderr)
+    memo = safety_memo_totals()
+    if memo['hits'] + memo['misses']:
+        print(f"Controlli tattici memorizzati: {memo['hit_rate']:.0%} di hit", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# sprite_cache.py
+"""
+Cache condivisa delle immagini (pezzi e icone di classificazione) già ridimensionate.
+
+Ogni immagine viene decodificata e ridimensionata una sola volta per processo e
+per dimensione: tutte le scacchiere (quella principale e quelle delle finestre di
+Game Review) condividono gli stessi PhotoImage. I risultati vengono inoltre salvati
+su disco come un unico atlante PNG per gruppo di immagini e dimensione, che agli
+avvii successivi viene letto in una volta sola da Tk, senza passare da PIL.
+Gli atlanti vengono scritti su un thread in background e su disco restano solo
+quelli delle dimensioni ancora in memoria.
+"""
+
+import os
+import glob
+import hashlib
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from PIL import Image, ImageTk
+from src.config import SPRITE_ATLAS_ENABLED, SPRITE_ATLAS_DIR, SPRITE_CACHE_MAX_SIZES
+
+
+class SpriteCache:
+    """
+    Immagini Tk indicizzate per (gruppo, dimensione, file), valide per tutto il processo.
+
+    Per ogni gruppo si tengono in memoria al massimo max_sizes dimensioni diverse: quando
+    una scacchiera viene ridimensionata, le immagini della dimensione usata meno di recente
+    vengono dimenticate (restano vive finché qualche scacchiera le mostra ancora) e il
+    relativo atlante viene eliminato dal disco.
+    """
+
+    def __init__(self, atlas_dir: Optional[str] = SPRITE_ATLAS_DIR, max_sizes: int = SPRITE_CACHE_MAX_SIZES):
+        """
+        Inizializza la cache vuota.
+
+        Args:
+            atlas_dir: Cartella degli atlanti su disco (None per non usarli)
+            max_sizes: Numero massimo di dimensioni tenute in memoria per ogni gruppo
+        """
+        self.atlas_dir = atlas_dir
+        self.max_sizes = max_sizes
+        self._sprites = {}
+        self._sizes = {}  # Gruppo -> dimensioni in ordine di ultimo utilizzo
+        self._atlases = {}  # (gruppo, dimensione) -> percorso dell'atlante corrente
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()  # Serializza scritture ed eliminazioni degli atlanti
+
+    def load(self, group: str, paths: Iterable[str], size: int,
+             master=None) -> Tuple[Dict[str, tk.PhotoImage], List[str]]:
+        """
+        Restituisce le immagini richieste alla dimensione indicata, caricandole solo se necessario.
+
+        Args:
+            group: Nome del gruppo di immagini (dà il nome all'atlante, es. "pieces")
+            paths: Percorsi dei file PNG
+            size: Lato in pixel delle immagini quadrate
+            master: Widget Tk a cui associare le immagini create
+
+        Returns:
+            Tupla (immagini indicizzate per percorso, nomi dei file mancanti)
+        """
+        paths = list(dict.fromkeys(paths))
+        with self._lock:
+            to_load = [p for p in paths if (group, size, p) not in self._sprites]
+            missing = [os.path.basename(p) for p in to_load if not os.path.isfile(p)]
+            to_load = [p for p in to_load if os.path.isfile(p)]
+            if to_load:
+                loaded = self._load_atlas(group, to_load, size, master)
+                if loaded is None:
+                    loaded = self._load_files(group, to_load, size, master)
+                for path, sprite in loaded.items():
+                    self._sprites[(group, size, path)] = sprite
+            sprites = {p: self._sprites[(group, size, p)] for p in paths if (group, size, p) in self._sprites}
+            sizes = self._sizes.setdefault(group, OrderedDict())
+            sizes[size] = True
+            sizes.move_to_end(size)
+            evicted_any = False
+            while len(sizes) > self.max_sizes:
+                evicted, _ = sizes.popitem(last=False)
+                self._atlases.pop((group, evicted), None)
+                for key in [k for k in self._sprites if k[0] == group and k[1] == evicted]:
+                    del self._sprites[key]
+                evicted_any = True
+        if evicted_any:
+            self._in_background(self._prune_atlases, group)
+        return sprites, missing
+
+    def clear(self):
+        """Dimentica le immagini in memoria (gli atlanti su disco restano validi)."""
+        with self._lock:
+            self._sprites.clear()
+            self._sizes.clear()
+            self._atlases.clear()
+
+    def _atlas_path(self, group: str, paths: List[str], size: int) -> Optional[str]:
+        """
+        Percorso dell'atlante per un insieme di file: il nome contiene un'impronta di
+        percorsi, date di modifica e dimensioni dei file, così un'immagine cambiata
+        invalida l'atlante senza doverlo aprire.
+        """
+        if not SPRITE_ATLAS_ENABLED or not self.atlas_dir:
+            return None
+        digest = hashlib.sha1()
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{path}|{stat.st_mtime_ns}|{stat.st_size}\n".encode("utf-8"))
+        return os.path.join(self.atlas_dir, f"{group}-{size}-{digest.hexdigest()[:16]}.png")
+
+    def _load_atlas(self, group: str, paths: List[str], size: int,
+                    master) -> Optional[Dict[str, tk.PhotoImage]]:
+        """Ritaglia le immagini da un atlante già presente, o restituisce None."""
+        atlas_path = self._atlas_path(group, paths, size)
+        if atlas_path is None or not os.path.isfile(atlas_path):
+            return None
+        self._atlases[(group, size)] = atlas_path
+        try:
+            atlas = tk.PhotoImage(master=master, file=atlas_path)
+            if atlas.width() != size * len(paths) or atlas.height() != size:
+                return None
+            sprites = {}
+            for i, path in enumerate(paths):
+                sprite = tk.PhotoImage(master=master, width=size, height=size)
+                sprite.tk.call(sprite, "copy", atlas, "-from", i * size, 0, (i + 1) * size, size)
+                sprites[path] = sprite
+            return sprites
+        except tk.TclError:
+            return None
+
+    def _load_files(self, group: str, paths: List[str], size: int,
+                    master) -> Dict[str, tk.PhotoImage]:
+        """
+        Decodifica e ridimensiona le immagini con PIL; l'atlante per gli avvii successivi
+        viene salvato in background, senza bloccare il thread dell'interfaccia.
+        """
+        images = []
+        for path in paths:
+            with Image.open(path) as img:
+                images.append(img.convert("RGBA").resize((size, size), Image.LANCZOS))
+
+        atlas_path = self._atlas_path(group, paths, size)
+        if atlas_path is not None:
+            self._atlases[(group, size)] = atlas_path
+            self._in_background(self._save_atlas, group, atlas_path, size, images)
+        return {path: ImageTk.PhotoImage(img, master=master) for path, img in zip(paths, images)}
+
+    @staticmethod
+    def _in_background(target, *args):
+        """Esegue un'operazione sugli atlanti su un thread separato."""
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+    def _save_atlas(self, group: str, atlas_path: str, size: int, images: List[Image.Image]):
+        """Scrive l'atlante (una riga di celle size x size), poi elimina quelli non più in uso del gruppo."""
+        with self._disk_lock:
+            try:
+                os.makedirs(self.atlas_dir, exist_ok=True)
+                atlas = Image.new("RGBA", (size * len(images), size), (0, 0, 0, 0))
+                for i, img in enumerate(images):
+                    atlas.paste(img, (i * size, 0))
+                tmp_path = f"{atlas_path}.tmp"
+                atlas.save(tmp_path, "PNG")
+                os.replace(tmp_path, atlas_path)
+            except OSError as e:
+                print(f"Avviso: impossibile salvare l'atlante delle immagini: {e}")
+        self._prune_atlases(group)
+
+    def _prune_atlases(self, group: str):
+        """
+        Elimina gli atlanti del gruppo che non corrispondono a una dimensione in memoria
+        (dimensioni uscite dalla LRU, immagini modificate, avvii precedenti).
+        """
+        if not SPRITE_ATLAS_ENABLED or not self.atlas_dir:
+            return
+        with self._lock:
+            keep = {path for (atlas_group, _), path in self._atlases.items() if atlas_group == group}
+        with self._disk_lock:
+            try:
+                for atlas in glob.glob(os.path.join(self.atlas_dir, f"{group}-*.png")):
+                    if atlas not in keep:
+                        os.remove(atlas)
+            except OSError as e:
+                print(f"Avviso: impossibile eliminare gli atlanti obsoleti: {e}")
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_sprite_cache() -> SpriteCache:
+    """
+    Restituisce la cache delle immagini condivisa dall'applicazione.
+
+    Returns:
+        L'istanza condivisa
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SpriteCache()
+        return _shared_cache
@@ -13,10 +13,11 @@ import time
 import chess
 import os
 import math
-from PIL import Image, ImageTk
+from src.ui.sprite_cache import get_sprite_cache
 
 from src.config import (
-    BOARD_SIZE, SQUARE_SIZE, PIECES_PATH, BOARD_COLORS, 
+    BOARD_SIZE, SQUARE_SIZE, BOARD_MIN_SIZE, BOARD_SIZE_STEP, BOARD_RESIZE_DEBOUNCE_MS,
+    PIECES_PATH, BOARD_COLORS, 
     CLASSIFICATIONS_PATH, CLASSIFICATION_IMAGES,
     EVAL_BAR_WIDTH, EVAL_BAR_ANIMATION_SPEED, EVAL_BAR_ANIMATION_FPS,
     EVAL_BAR_ANIMATION_DELAY, EVAL_BAR_CAP_VALUE, EVAL_BAR_THRESHOLD,
@@ -25,7 +26,7 @@ from src.config import (
     COLOR_LEGAL_MOVE, COLOR_LAST_MOVE, COLOR_CHECK, COLOR_ARROW_DEFAULT,
     COLOR_HIGHLIGHT_DEFAULT, LEGAL_MOVE_RADIUS_EMPTY, LEGAL_MOVE_RADIUS_CAPTURE,
     LEGAL_MOVE_RING_WIDTH, ARROW_WIDTH_RATIO, ANIMATION_DURATION_MS,
-    ANIMATION_DELAY_MS, TIME_TO_MILLISECONDS, CLASSIFICATION_ICON_SIZE_RATIO,
+    ANIMATION_DELAY_MS, ANIMATION_FRAME_MS, TIME_TO_MILLISECONDS, CLASSIFICATION_ICON_SIZE_RATIO,
     PROMOTION_OVERLAY_COLOR, PROMOTION_OVERLAY_STIPPLE, COORDINATE_FONT_SIZE_DIVISOR,
     COORDINATE_PADDING, BOARD_RANKS, BOARD_FILES,
     COLOR_BG_PRIMARY, COLOR_ACCENT_PRIMARY, COLOR_TEXT_PRIMARY, COLOR_HOVER
@@ -258,8 +259,24 @@ class ChessBoard(tk.Canvas):
     
     Gestisce il rendering dei pezzi, le evidenziazioni, le frecce, le animazioni,
     e tutti gli eventi di input dell'utente (click, drag, promozione).
+    
+    Il disegno è "retained": caselle e coordinate vengono create una sola volta,
+    i pezzi sono item persistenti spostati o aggiornati confrontando la posizione
+    precedente con quella nuova, ed evidenziazioni e frecce vivono su livelli con
+    un proprio tag, ricreati solo quando il loro contenuto cambia.
+    Frecce ed evidenziazioni dell'utente e i fantasmi del trascinamento formano un
+    overlay aggiornabile da solo (vedi update_overlay), senza toccare i pezzi.
+    
+    La scacchiera segue l'altezza disponibile: i ridimensionamenti vengono raggruppati,
+    la dimensione delle caselle si muove a passi di BOARD_SIZE_STEP a partire da
+    SQUARE_SIZE (così le immagini si ridimensionano solo per poche dimensioni, poi
+    restano in cache) e gli item esistenti vengono aggiornati sul posto.
     """
     
+    # Livelli del canvas, dal basso verso l'alto (ogni livello è un tag)
+    LAYERS = ("square", "custom_highlight", "highlight", "legal", "custom_arrow", "arrow", "piece",
+              "coord", "annotation", "promotion", "animation", "drag")
+    
     def __init__(self, parent, controller):
         """
         Inizializza la scacchiera.
@@ -270,13 +287,15 @@ class ChessBoard(tk.Canvas):
         """
         super().__init__(parent, width=BOARD_SIZE, height=BOARD_SIZE)
         self.controller = controller
-        self.pack(side=tk.LEFT)
+        self.square_size = SQUARE_SIZE
+        self.pack(side=tk.LEFT, fill=tk.Y)
         self.bind("<ButtonPress-1>", self.on_left_press)
         self.bind("<B1-Motion>", self.on_drag_motion)
         self.bind("<ButtonRelease-1>", self.on_release)
         self.bind("<ButtonPress-3>", self.on_right_press)
         self.bind("<B3-Motion>", self.on_right_drag)
         self.bind("<ButtonRelease-3>", self.on_right_release)
+        self.bind("<Configure>", self.on_configure)
         
         self.colors = BOARD_COLORS
         self.highlight_colors = {
@@ -286,7 +305,7 @@ class ChessBoard(tk.Canvas):
         }
         self.piece_images = {}
         self.classification_images = {}
-        self.drag_data = {"start_square": None, "item_id": None, "is_dragging": False}
+        self.drag_data = {"start_square": None, "item_id": None, "is_dragging": False, "hidden_item": None}
         self.is_enabled = True
         self.promotion_data = {"active": False, "move": None, "choices_bounds": {}}
         self.best_move_arrow = None
@@ -302,25 +321,269 @@ class ChessBoard(tk.Canvas):
             "duration": ANIMATION_DURATION_MS, 
             "item_id": None, 
             "callback": None, 
-            "was_enabled": True
+            "was_enabled": True,
+            "path": None,
+            "job_id": None
         }
         self._load_piece_images()
         self._load_classification_images()
+        
+        # Stato del disegno retained
+        self.piece_items = {}  # casella -> (id dell'item, pezzo)
+        self.pieces_flipped = False
+        self.coord_items = []  # (id dell'item, indice, è una traversa)
+        self.coords_flipped = None
+        self.layer_signatures = {}
+        self.overlay_items = {"custom_highlight": {}, "custom_arrow": {}}  # annotazione -> id dell'item
+        self.overlay_flipped = False
+        self.square_items = []
+        self.last_drawn = None  # (scacchiera, casella nascosta) dell'ultimo draw
+        self.annotation_calls = []  # Annotazioni esterne da ridisegnare dopo un ridimensionamento
+        self.resize_job = None
+        self.pending_height = None
+        self._create_static_items()
+
+    def _create_static_items(self):
+        """Crea caselle e coordinate: non vengono mai ridisegnate, al più spostate o cambiate di testo."""
+        for i in range(64):
+            r, c = divmod(i, 8)
+            color = self.colors[(r + c) % 2]
+            self.square_items.append(self.create_rectangle(0, 0, 0, 0, fill=color, outline="", tags="square"))
+
+        # Numeri (ranks) sulla colonna di sinistra
+        for r in range(8):
+            square_color_index = r % 2
+            text_color = self.colors[1 - square_color_index]
+            item = self.create_text(0, 0, text=BOARD_RANKS[r], anchor="nw", fill=text_color, tags="coord")
+            self.coord_items.append((item, r, True))
+
+        # Lettere (files) sulla riga in basso
+        for c in range(8):
+            square_color_index = (7 + c) % 2
+            text_color = self.colors[1 - square_color_index]
+            item = self.create_text(0, 0, text=BOARD_FILES[c], anchor="se", fill=text_color, tags="coord")
+            self.coord_items.append((item, c, False))
+        self.coords_flipped = False
+        self._layout_static_items()
+
+    def _layout_static_items(self):
+        """Posiziona caselle e coordinate in base alla dimensione corrente delle caselle."""
+        size = self.square_size
+        for i, item in enumerate(self.square_items):
+            r, c = divmod(i, 8)
+            self.coords(item, c * size, r * size, (c + 1) * size, (r + 1) * size)
+        
+        font_style = ("Helvetica", int(size / COORDINATE_FONT_SIZE_DIVISOR))
+        for item, index, is_rank in self.coord_items:
+            if is_rank:
+                x, y = COORDINATE_PADDING, index * size + COORDINATE_PADDING
+            else:
+                x, y = (index + 1) * size - COORDINATE_PADDING, 8 * size - COORDINATE_PADDING
+            self.coords(item, x, y)
+            self.itemconfigure(item, font=font_style)
 
-    def draw_custom_highlight(self, square, color):
+    def on_configure(self, event):
+        """Raggruppa gli eventi di ridimensionamento: la scacchiera si aggiorna solo quando si fermano."""
+        self.pending_height = event.height
+        if self.resize_job:
+            self.after_cancel(self.resize_job)
+        self.resize_job = self.after(BOARD_RESIZE_DEBOUNCE_MS, self._apply_resize)
+
+    def _apply_resize(self):
+        self.resize_job = None
+        if self.animation_data["active"] or self.drag_data["is_dragging"]:
+            # Non si ridimensiona a metà di un'animazione o di un trascinamento
+            self.resize_job = self.after(BOARD_RESIZE_DEBOUNCE_MS, self._apply_resize)
+            return
+        # Dimensioni a passi di BOARD_SIZE_STEP a partire da SQUARE_SIZE, mai oltre lo spazio
+        # disponibile né sotto BOARD_MIN_SIZE: trascinando la finestra si incontrano poche
+        # dimensioni, ognuna ridimensionata una volta sola e poi presa dalla cache
+        steps = (self.pending_height // 8 - SQUARE_SIZE) // BOARD_SIZE_STEP
+        min_steps = -((SQUARE_SIZE - BOARD_MIN_SIZE // 8) // BOARD_SIZE_STEP)
+        size = SQUARE_SIZE + max(steps, min_steps) * BOARD_SIZE_STEP
+        if size != self.square_size:
+            self.set_square_size(size)
+
+    def set_square_size(self, size):
+        """
+        Cambia la dimensione delle caselle aggiornando sul posto gli item esistenti.
+        
+        Args:
+            size: Nuovo lato delle caselle in pixel
+        """
+        self.square_size = size
+        self._load_piece_images()
+        self._load_classification_images()
+        self._layout_static_items()
+        for square, (item, piece) in self.piece_items.items():
+            self.coords(item, *self._square_origin(square, self.pieces_flipped))
+            self.itemconfigure(item, image=self.piece_images[piece])
+        
+        # Evidenziazioni, frecce e annotazioni dipendono dalla dimensione: vanno ricreate
+        self.layer_signatures.clear()
+        for layer, items in self.overlay_items.items():
+            self.delete(layer)
+            items.clear()
+        self.configure(width=8 * size)
+        if self.last_drawn:
+            annotation_calls = list(self.annotation_calls)
+            self.draw(*self.last_drawn)
+            for method, args in annotation_calls:
+                getattr(self, method)(*args)
+
+    def _update_coordinates(self, is_flipped):
+        """Aggiorna il testo delle coordinate quando cambia l'orientamento."""
+        if self.coords_flipped == is_flipped:
+            return
+        ranks = BOARD_RANKS[::-1] if is_flipped else BOARD_RANKS
+        files = BOARD_FILES[::-1] if is_flipped else BOARD_FILES
+        for item, index, is_rank in self.coord_items:
+            self.itemconfigure(item, text=ranks[index] if is_rank else files[index])
+        self.coords_flipped = is_flipped
+
+    def _square_origin(self, square, is_flipped):
+        r, c = self._get_coords(square, is_flipped)
+        return c * self.square_size, r * self.square_size
+
+    def _update_pieces(self, board_to_draw, is_flipped, square_to_hide=None):
+        """
+        Allinea gli item dei pezzi alla posizione da mostrare, toccando solo le caselle cambiate.
+        
+        Gli item delle caselle svuotate vengono riutilizzati (spostati, e se serve cambiati
+        d'immagine) per le caselle occupate: una mossa normale sposta un solo item.
+        
+        Returns:
+            True se sono stati creati nuovi item (vanno riordinati i livelli)
+        """
+        target = board_to_draw.piece_map()
+        if square_to_hide is not None:
+            target.pop(square_to_hide, None)
+        
+        if self.pieces_flipped != is_flipped:
+            for square, (item, _) in self.piece_items.items():
+                self.coords(item, *self._square_origin(square, is_flipped))
+            self.pieces_flipped = is_flipped
+        
+        # Item non più validi, raggruppati per pezzo per poterli riutilizzare
+        stale = {}
+        for square, (item, piece) in list(self.piece_items.items()):
+            if target.get(square) != piece:
+                stale.setdefault(piece, []).append(item)
+                del self.piece_items[square]
+        
+        created = False
+        added = [(square, piece) for square, piece in target.items() if square not in self.piece_items]
+        pending = []
+        for square, piece in added:
+            items = stale.get(piece)
+            if items:
+                # Stesso pezzo: basta spostarlo
+                item = items.pop()
+                self.coords(item, *self._square_origin(square, is_flipped))
+                self.piece_items[square] = (item, piece)
+            else:
+                pending.append((square, piece))
+        leftovers = [item for items in stale.values() for item in items]
+        for square, piece in pending:
+            x, y = self._square_origin(square, is_flipped)
+            if leftovers:
+                # Pezzo diverso (promozione, cattura): si riusa un item cambiandone l'immagine
+                item = leftovers.pop()
+                self.coords(item, x, y)
+                self.itemconfigure(item, image=self.piece_images[piece])
+            else:
+                item = self.create_image(x, y, image=self.piece_images[piece], anchor="nw", tags="piece")
+                created = True
+            self.piece_items[square] = (item, piece)
+        for item in leftovers:
+            self.delete(item)
+        return created
+
+    def _update_layer(self, layer, signature, draw_func):
+        """
+        Ricrea un livello solo se il suo contenuto è cambiato rispetto all'ultimo disegno.
+        
+        Args:
+            layer: Tag del livello
+            signature: Valore confrontabile che descrive il contenuto del livello
+            draw_func: Funzione che crea gli item del livello
+        
+        Returns:
+            True se il livello è stato ricreato
+        """
+        if self.layer_signatures.get(layer) == signature:
+            return False
+        self.delete(layer)
+        draw_func()
+        self.layer_signatures[layer] = signature
+        return True
+
+    def _sync_overlay_layer(self, layer, annotations, draw_func):
+        """
+        Allinea un livello dell'overlay alle annotazioni richieste, una per item.
+        
+        Args:
+            layer: Tag del livello
+            annotations: Annotazioni da mostrare (tuple confrontabili)
+            draw_func: Funzione che disegna un'annotazione e restituisce l'id dell'item
+        
+        Returns:
+            True se sono stati creati nuovi item
+        """
+        items = self.overlay_items[layer]
+        wanted = dict.fromkeys(annotations)
+        for annotation in [a for a in items if a not in wanted]:
+            self.delete(items.pop(annotation))
+        created = False
+        for annotation in wanted:
+            if annotation not in items:
+                items[annotation] = draw_func(*annotation)
+                created = True
+        return created
+
+    def _sync_overlay(self, is_flipped):
+        """
+        Aggiorna frecce ed evidenziazioni dell'utente: si creano o eliminano solo quelle cambiate.
+        
+        Returns:
+            True se sono stati creati nuovi item
+        """
+        if self.overlay_flipped != is_flipped:
+            for layer, items in self.overlay_items.items():
+                self.delete(layer)
+                items.clear()
+            self.overlay_flipped = is_flipped
+        created = self._sync_overlay_layer("custom_highlight", self.custom_highlights, self.draw_custom_highlight)
+        created |= self._sync_overlay_layer("custom_arrow", self.custom_arrows, self.draw_custom_arrow)
+        return created
+
+    def update_overlay(self):
+        """Ridisegna solo l'overlay delle annotazioni dell'utente, senza aggiornare la scacchiera."""
+        if self._sync_overlay(self.controller.is_board_flipped):
+            self._restack_layers()
+
+    def _restack_layers(self):
+        """Riporta i livelli nell'ordine di LAYERS dopo la creazione di nuovi item."""
+        for layer in self.LAYERS[1:]:
+            self.tag_raise(layer)
+
+    def draw_custom_highlight(self, square, color, tags="custom_highlight"):
         """
         Disegna un'evidenziazione personalizzata su una casella.
         
         Args:
             square: Indice della casella (0-63)
             color: Colore dell'evidenziazione (formato hex)
+        
+        Returns:
+            Id dell'item creato
         """
         is_flipped = self.controller.is_board_flipped
         r, c = self._get_coords(square, is_flipped)
-        y1, x1 = r * SQUARE_SIZE, c * SQUARE_SIZE
-        self.create_rectangle(x1, y1, x1 + SQUARE_SIZE, y1 + SQUARE_SIZE, fill=color, outline="", stipple='gray25')
+        y1, x1 = r * self.square_size, c * self.square_size
+        return self.create_rectangle(x1, y1, x1 + self.square_size, y1 + self.square_size, fill=color, outline="", stipple='gray25', tags=tags)
     
-    def draw_legal_move_indicator(self, square, has_piece=False):
+    def draw_legal_move_indicator(self, square, has_piece=False, tags="legal"):
         """
         Disegna un indicatore per una mossa legale.
         
@@ -333,104 +596,91 @@ class ChessBoard(tk.Canvas):
         """
         is_flipped = self.controller.is_board_flipped
         r, c = self._get_coords(square, is_flipped)
-        center_x = c * SQUARE_SIZE + SQUARE_SIZE // 2
-        center_y = r * SQUARE_SIZE + SQUARE_SIZE // 2
+        center_x = c * self.square_size + self.square_size // 2
+        center_y = r * self.square_size + self.square_size // 2
         
         if has_piece:
             # Cattura: disegna un anello verde
-            radius = SQUARE_SIZE // LEGAL_MOVE_RADIUS_CAPTURE - LEGAL_MOVE_RADIUS_CAPTURE
+            radius = self.square_size // LEGAL_MOVE_RADIUS_CAPTURE - LEGAL_MOVE_RADIUS_CAPTURE
             self.create_oval(center_x - radius, center_y - radius, 
                            center_x + radius, center_y + radius, 
-                           outline=COLOR_LEGAL_MOVE, width=LEGAL_MOVE_RING_WIDTH, fill="")
+                           outline=COLOR_LEGAL_MOVE, width=LEGAL_MOVE_RING_WIDTH, fill="", tags=tags)
         else:
             # Casella vuota: disegna un pallino verde
-            radius = SQUARE_SIZE // LEGAL_MOVE_RADIUS_EMPTY
+            radius = self.square_size // LEGAL_MOVE_RADIUS_EMPTY
             self.create_oval(center_x - radius, center_y - radius, 
                            center_x + radius, center_y + radius, 
-                           fill=COLOR_LEGAL_MOVE, outline="")
+                           fill=COLOR_LEGAL_MOVE, outline="", tags=tags)
 
     def draw(self, board_to_draw, square_to_hide=None):
         """
-        Disegna l'intera scacchiera con pezzi, evidenziazioni e frecce.
+        Aggiorna la scacchiera con pezzi, evidenziazioni e frecce.
+        
+        Vengono modificati solo gli item cambiati rispetto al disegno precedente;
+        le annotazioni disegnate dall'esterno (frecce e icone della Game Review) vengono rimosse.
         
         Args:
             board_to_draw: Istanza di chess.Board da visualizzare
             square_to_hide: Casella da nascondere (usato durante le animazioni)
         """
-        self.delete("all")
         is_flipped = self.controller.is_board_flipped
-        
-        # Disegna le caselle della scacchiera
-        for i in range(64):
-            r, c = divmod(i, 8)
-            color = self.colors[(r + c) % 2]
-            y1, x1 = r * SQUARE_SIZE, c * SQUARE_SIZE
-            self.create_rectangle(x1, y1, x1 + SQUARE_SIZE, y1 + SQUARE_SIZE, fill=color, outline="")
-
-        # Evidenziazioni personalizzate (create con click destro)
-        for h_square, h_color in self.custom_highlights:
-            self.draw_custom_highlight(h_square, h_color)
-        
-        # Evidenzia l'ultima mossa giocata
-        if board_to_draw.move_stack:
-            last_move_on_display = board_to_draw.peek()
-            r_from, c_from = self._get_coords(last_move_on_display.from_square, is_flipped)
-            r_to, c_to = self._get_coords(last_move_on_display.to_square, is_flipped)
-            self._highlight_square(r_from, c_from, self.highlight_colors["last_move"])
-            self._highlight_square(r_to, c_to, self.highlight_colors["last_move"])
-        
-        # Evidenzia il re sotto scacco
-        if board_to_draw.is_check():
-            r_king, c_king = self._get_coords(board_to_draw.king(board_to_draw.turn), is_flipped)
-            self._highlight_square(r_king, c_king, self.highlight_colors["check"])
-        
-        # Mostra le mosse legali per il pezzo selezionato
+        self.last_drawn = (board_to_draw, square_to_hide)
+        if square_to_hide is None and self.animation_data["active"]:
+            # Un aggiornamento durante l'animazione non deve far ricomparire il pezzo in movimento
+            square_to_hide = self.animation_data["from_square"]
+        self.delete("annotation")
+        self.annotation_calls = []
+        self._update_coordinates(is_flipped)
+        
+        # Frecce ed evidenziazioni personalizzate (create con click destro)
+        restack = self._sync_overlay(is_flipped)
+        
+        # Ultima mossa giocata e re sotto scacco
+        last_move = board_to_draw.peek() if board_to_draw.move_stack else None
+        checked_king = board_to_draw.king(board_to_draw.turn) if board_to_draw.is_check() else None
+        
+        def draw_highlights():
+            if last_move:
+                r_from, c_from = self._get_coords(last_move.from_square, is_flipped)
+                r_to, c_to = self._get_coords(last_move.to_square, is_flipped)
+                self._highlight_square(r_from, c_from, self.highlight_colors["last_move"])
+                self._highlight_square(r_to, c_to, self.highlight_colors["last_move"])
+            if checked_king is not None:
+                r_king, c_king = self._get_coords(checked_king, is_flipped)
+                self._highlight_square(r_king, c_king, self.highlight_colors["check"])
+        
+        restack |= self._update_layer("highlight", (is_flipped, last_move, checked_king), draw_highlights)
+        
+        # Mosse legali per il pezzo selezionato
+        legal_targets = ()
         if self.controller.selected_square is not None and not self.controller.viewing_history:
-            legal_moves = [m for m in self.controller.logic.board.legal_moves 
-                          if m.from_square == self.controller.selected_square]
-            for move in legal_moves:
-                has_piece = board_to_draw.piece_at(move.to_square) is not None
-                self.draw_legal_move_indicator(move.to_square, has_piece)
-
-        # Disegna frecce personalizzate e freccia della mossa migliore
-        for from_sq, to_sq, color in self.custom_arrows:
-            self.draw_custom_arrow(from_sq, to_sq, color)
+            # Le promozioni hanno più mosse verso la stessa casella: un solo indicatore
+            legal_targets = tuple(dict.fromkeys(
+                (m.to_square, board_to_draw.piece_at(m.to_square) is not None)
+                for m in self.controller.logic.get_legal_moves(self.controller.selected_square)
+            ))
+        restack |= self._update_layer(
+            "legal", (is_flipped, legal_targets),
+            lambda: [self.draw_legal_move_indicator(to_square, has_piece) for to_square, has_piece in legal_targets]
+        )
 
-        if self.best_move_arrow:
-            self.draw_best_move_arrow(self.best_move_arrow)
+        # Freccia della mossa migliore
+        best_move_arrow = self.best_move_arrow
         
-        # --- DISEGNO DEI PEZZI ---
-        for i in range(64):
-            if i == square_to_hide: continue
-            piece = board_to_draw.piece_at(i)
-            if piece:
-                r, c = self._get_coords(i, is_flipped)
-                self.create_image(c * SQUARE_SIZE, r * SQUARE_SIZE, image=self.piece_images[piece], anchor="nw")
-        
-        # Disegna le coordinate della scacchiera
-        font_size = int(SQUARE_SIZE / COORDINATE_FONT_SIZE_DIVISOR)
-        font_style = ("Helvetica", font_size)
-
-        # Disegna i numeri (ranks) sulla colonna di sinistra
-        for r in range(8):
-            square_color_index = r % 2
-            text_color = self.colors[1 - square_color_index]
-            number = BOARD_RANKS[r] if not is_flipped else BOARD_RANKS[::-1][r]
-            x = COORDINATE_PADDING
-            y = r * SQUARE_SIZE + COORDINATE_PADDING
-            self.create_text(x, y, text=number, anchor="nw", font=font_style, fill=text_color)
-
-        # Disegna le lettere (files) sulla riga in basso
-        for c in range(8):
-            square_color_index = (7 + c) % 2
-            text_color = self.colors[1 - square_color_index]
-            letter = BOARD_FILES[c] if not is_flipped else BOARD_FILES[::-1][c]
-            x = c * SQUARE_SIZE + SQUARE_SIZE - COORDINATE_PADDING
-            y = 7 * SQUARE_SIZE + SQUARE_SIZE - COORDINATE_PADDING
-            self.create_text(x, y, text=letter, anchor="se", font=font_style, fill=text_color)
+        def draw_arrow():
+            if best_move_arrow:
+                self.draw_best_move_arrow(best_move_arrow, tags="arrow")
+        
+        restack |= self._update_layer("arrow", (is_flipped, best_move_arrow), draw_arrow)
         
+        restack |= self._update_pieces(board_to_draw, is_flipped, square_to_hide)
+        
+        self.delete("promotion")
         if self.promotion_data["active"]:
             self._draw_promotion_overlay()
+        
+        if restack:
+            self._restack_layers()
 
     def _load_piece_images(self):
         piece_chars = {
@@ -438,34 +688,31 @@ class ChessBoard(tk.Canvas):
             chess.KNIGHT: 'N', chess.ROOK: 'R', chess.PAWN: 'P'
         }
         color_chars = { chess.WHITE: 'w', chess.BLACK: 'b' }
-        missing_files = []
+        filepaths = {}
         for color in [chess.WHITE, chess.BLACK]:
             for piece_type in [chess.KING, chess.QUEEN, chess.BISHOP, chess.KNIGHT, chess.ROOK, chess.PAWN]:
                 filename = f"{color_chars[color]}{piece_chars[piece_type]}.png"
-                filepath = os.path.join(PIECES_PATH, filename)
-                try:
-                    img = Image.open(filepath).convert("RGBA")
-                    img = img.resize((SQUARE_SIZE, SQUARE_SIZE), Image.LANCZOS)
-                    self.piece_images[chess.Piece(piece_type, color)] = ImageTk.PhotoImage(img)
-                except FileNotFoundError:
-                    missing_files.append(filename)
+                filepaths[chess.Piece(piece_type, color)] = os.path.join(PIECES_PATH, filename)
+        # Le immagini sono condivise tra tutte le scacchiere: solo la prima le carica
+        sprites, missing_files = get_sprite_cache().load("pieces", filepaths.values(), self.square_size, master=self)
+        for piece, filepath in filepaths.items():
+            if filepath in sprites:
+                self.piece_images[piece] = sprites[filepath]
         if missing_files:
             messagebox.showerror("Errore", f"File dei pezzi mancanti:\n{', '.join(missing_files)}")
             self.controller.master.destroy()
 
     def _load_classification_images(self):
         """Carica le immagini delle classificazioni delle mosse."""
-        missing_files = []
-        icon_size = int(SQUARE_SIZE * CLASSIFICATION_ICON_SIZE_RATIO)
-        
-        for classification_key, image_filename in CLASSIFICATION_IMAGES.items():
-            filepath = os.path.join(CLASSIFICATIONS_PATH, image_filename)
-            try:
-                img = Image.open(filepath).convert("RGBA")
-                img = img.resize((icon_size, icon_size), Image.LANCZOS)
-                self.classification_images[classification_key] = ImageTk.PhotoImage(img)
-            except FileNotFoundError:
-                missing_files.append(image_filename)
+        icon_size = int(self.square_size * CLASSIFICATION_ICON_SIZE_RATIO)
+        filepaths = {
+            classification_key: os.path.join(CLASSIFICATIONS_PATH, image_filename)
+            for classification_key, image_filename in CLASSIFICATION_IMAGES.items()
+        }
+        sprites, missing_files = get_sprite_cache().load("classifications", filepaths.values(), icon_size, master=self)
+        for classification_key, filepath in filepaths.items():
+            if filepath in sprites:
+                self.classification_images[classification_key] = sprites[filepath]
         
         if missing_files:
             messagebox.showwarning("Avviso", f"File di classificazione mancanti:\n{', '.join(missing_files)}\nVerranno usati cerchi colorati come fallback.")
@@ -476,23 +723,23 @@ class ChessBoard(tk.Canvas):
         r, c = self._get_coords(to_square, is_flipped)
         color = self.controller.logic.board.piece_at(move.from_square).color
         pieces_to_show = [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]
-        overlay_height = SQUARE_SIZE * len(pieces_to_show)
-        x_start = c * SQUARE_SIZE
-        if (color == chess.WHITE and not is_flipped) or (color == chess.BLACK and is_flipped): y_start = r * SQUARE_SIZE
-        else: y_start = (r + 1) * SQUARE_SIZE - overlay_height; pieces_to_show.reverse()
-        self.create_rectangle(x_start, y_start, x_start + SQUARE_SIZE, y_start + overlay_height, fill=PROMOTION_OVERLAY_COLOR, stipple=PROMOTION_OVERLAY_STIPPLE, outline="")
+        overlay_height = self.square_size * len(pieces_to_show)
+        x_start = c * self.square_size
+        if (color == chess.WHITE and not is_flipped) or (color == chess.BLACK and is_flipped): y_start = r * self.square_size
+        else: y_start = (r + 1) * self.square_size - overlay_height; pieces_to_show.reverse()
+        self.create_rectangle(x_start, y_start, x_start + self.square_size, y_start + overlay_height, fill=PROMOTION_OVERLAY_COLOR, stipple=PROMOTION_OVERLAY_STIPPLE, outline="", tags="promotion")
         self.promotion_data["choices_bounds"].clear()
         for i, piece_type in enumerate(pieces_to_show):
-            y = y_start + (i * SQUARE_SIZE); piece = chess.Piece(piece_type, color)
-            self.create_image(x_start, y, image=self.piece_images[piece], anchor="nw")
-            self.promotion_data["choices_bounds"][piece_type] = (x_start, y, x_start + SQUARE_SIZE, y + SQUARE_SIZE)
+            y = y_start + (i * self.square_size); piece = chess.Piece(piece_type, color)
+            self.create_image(x_start, y, image=self.piece_images[piece], anchor="nw", tags="promotion")
+            self.promotion_data["choices_bounds"][piece_type] = (x_start, y, x_start + self.square_size, y + self.square_size)
             
     def _get_coords(self, square, is_flipped):
         row, col = divmod(square, 8); return (row, 7 - col) if is_flipped else (7 - row, col)
         
-    def _highlight_square(self, row, col, color, stipple="gray50"):
-        y1, x1 = row * SQUARE_SIZE, col * SQUARE_SIZE
-        self.create_rectangle(x1, y1, x1 + SQUARE_SIZE, y1 + SQUARE_SIZE, fill=color, outline="", stipple=stipple)
+    def _highlight_square(self, row, col, color, stipple="gray50", tags="highlight"):
+        y1, x1 = row * self.square_size, col * self.square_size
+        self.create_rectangle(x1, y1, x1 + self.square_size, y1 + self.square_size, fill=color, outline="", stipple=stipple, tags=tags)
     
     def cancel_animation(self):
         """
@@ -503,11 +750,23 @@ class ChessBoard(tk.Canvas):
             self.animation_data["active"] = False
             self.is_enabled = self.animation_data.get("was_enabled", True)
             self.animation_data["callback"] = None
+            self._clear_animation()
+    
+    def _clear_animation(self):
+        """Annulla il prossimo frame e rimuove lo sprite animato."""
+        if self.animation_data["job_id"]:
+            self.after_cancel(self.animation_data["job_id"])
+            self.animation_data["job_id"] = None
+        self.delete("animation")
+        self.animation_data["item_id"] = None
     
     def animate_move(self, move, callback=None):
         """
         Anima una mossa dalla casella di partenza a quella di arrivo.
         
+        La scacchiera viene aggiornata una sola volta, con il pezzo di partenza nascosto;
+        a ogni frame si spostano soltanto le coordinate dello sprite animato.
+        
         Args:
             move: Istanza di chess.Move da animare
             callback: Funzione da chiamare al termine dell'animazione
@@ -523,62 +782,59 @@ class ChessBoard(tk.Canvas):
                 callback()
             return
         
+        self._clear_animation()
+        is_flipped = self.controller.is_board_flipped
+        r_from, c_from = self._get_coords(move.from_square, is_flipped)
+        r_to, c_to = self._get_coords(move.to_square, is_flipped)
+        x_from = c_from * self.square_size + self.square_size // 2
+        y_from = r_from * self.square_size + self.square_size // 2
+        x_to = c_to * self.square_size + self.square_size // 2
+        y_to = r_to * self.square_size + self.square_size // 2
+        
         self.animation_data["active"] = True
         self.animation_data["piece"] = piece
         self.animation_data["from_square"] = move.from_square
         self.animation_data["to_square"] = move.to_square
-        self.animation_data["start_time"] = time.time() * TIME_TO_MILLISECONDS
+        self.animation_data["path"] = (x_from, y_from, x_to - x_from, y_to - y_from)
+        self.animation_data["start_time"] = time.perf_counter() * TIME_TO_MILLISECONDS
         self.animation_data["callback"] = callback
         self.animation_data["was_enabled"] = self.is_enabled
         
         # Disabilita l'input durante l'animazione
         self.is_enabled = False
         
+        # Scacchiera senza il pezzo animato, disegnata una volta sola, e sprite sopra di essa
+        self.draw(board_to_use, square_to_hide=move.from_square)
+        self.animation_data["item_id"] = self.create_image(
+            x_from, y_from, image=self.piece_images[piece], anchor="center", tags="animation"
+        )
+        
         # Avvia l'animazione
         self._animate_step()
     
     def _animate_step(self):
-        """Esegue un passo dell'animazione"""
+        """Esegue un passo dell'animazione, spostando solo lo sprite"""
+        self.animation_data["job_id"] = None
         if not self.animation_data["active"]:
             return
         
-        current_time = time.time() * 1000
+        current_time = time.perf_counter() * TIME_TO_MILLISECONDS
         elapsed = current_time - self.animation_data["start_time"]
         progress = min(elapsed / self.animation_data["duration"], 1.0)
         
         # Easing function (ease-out cubic per un movimento più naturale)
         eased_progress = 1 - pow(1 - progress, 3)
         
-        # Calcola la posizione corrente
-        from_square = self.animation_data["from_square"]
-        to_square = self.animation_data["to_square"]
-        is_flipped = self.controller.is_board_flipped
-        
-        r_from, c_from = self._get_coords(from_square, is_flipped)
-        r_to, c_to = self._get_coords(to_square, is_flipped)
-        
-        x_from = c_from * SQUARE_SIZE + SQUARE_SIZE // 2
-        y_from = r_from * SQUARE_SIZE + SQUARE_SIZE // 2
-        x_to = c_to * SQUARE_SIZE + SQUARE_SIZE // 2
-        y_to = r_to * SQUARE_SIZE + SQUARE_SIZE // 2
-        
-        current_x = x_from + (x_to - x_from) * eased_progress
-        current_y = y_from + (y_to - y_from) * eased_progress
-        
-        # Ridisegna la scacchiera corretta senza il pezzo animato
-        board_to_draw = self.controller.display_board.copy() if self.controller.viewing_history else self.controller.logic.board.copy()
-        self.draw(board_to_draw, square_to_hide=from_square)
-        
-        # Disegna il pezzo nella posizione animata
-        piece = self.animation_data["piece"]
-        self.create_image(current_x, current_y, image=self.piece_images[piece], anchor="center")
+        x_from, y_from, dx, dy = self.animation_data["path"]
+        self.coords(self.animation_data["item_id"], x_from + dx * eased_progress, y_from + dy * eased_progress)
         
         if progress < 1.0:
             # Continua l'animazione
-            self.after(16, self._animate_step)  # ~60 FPS
+            self.animation_data["job_id"] = self.after(ANIMATION_FRAME_MS, self._animate_step)
         else:
-            # Animazione completata
+            # Animazione completata: il callback ridisegna il pezzo sulla casella di arrivo
             self.animation_data["active"] = False
+            self._clear_animation()
             # Ripristina lo stato precedente di is_enabled
             self.is_enabled = self.animation_data.get("was_enabled", True)
             
@@ -606,21 +862,25 @@ class ChessBoard(tk.Canvas):
             self.drag_data["is_dragging"] = True; from_sq = self.drag_data["start_square"]
             piece = self.controller.logic.get_piece_at(from_sq)
             if piece and self.controller.selected_square is not None:
-                board_to_draw = self.controller.display_board if self.controller.viewing_history else self.controller.logic.board
-                self.draw(board_to_draw, square_to_hide=from_sq)
-                self.drag_data["item_id"] = self.create_image(event.x, event.y, image=self.piece_images[piece], anchor="center")
+                # Nessun ridisegno: si nasconde l'item del pezzo e lo si sostituisce con un fantasma
+                entry = self.piece_items.get(from_sq)
+                if entry:
+                    self.itemconfigure(entry[0], state="hidden")
+                    self.drag_data["hidden_item"] = entry[0]
+                self.drag_data["item_id"] = self.create_image(event.x, event.y, image=self.piece_images[piece], anchor="center", tags="drag")
         if self.drag_data["item_id"]: self.coords(self.drag_data["item_id"], event.x, event.y)
             
     def on_release(self, event):
         if self.promotion_data["active"]: return
         if not self.is_enabled: return
         if self.drag_data["item_id"]: self.delete(self.drag_data["item_id"])
+        if self.drag_data["hidden_item"]: self.itemconfigure(self.drag_data["hidden_item"], state="normal")
         if self.drag_data["is_dragging"]:
             to_sq = self.get_square_from_event(event); from_sq = self.drag_data["start_square"]
             if from_sq is not None and to_sq is not None and from_sq != to_sq: 
                 self.controller.attempt_move(from_sq, to_sq, skip_animation=True)
             else: self.controller.deselect_and_update()
-        self.drag_data = {"start_square": None, "item_id": None, "is_dragging": False}
+        self.drag_data = {"start_square": None, "item_id": None, "is_dragging": False, "hidden_item": None}
         
     def on_right_press(self, event):
         """
@@ -643,19 +903,19 @@ class ChessBoard(tk.Canvas):
         if start_sq is None:
             return
         
-        # Rimuovi la freccia temporanea precedente
-        if self.right_drag_data['temp_arrow_id']:
-            self.delete(self.right_drag_data['temp_arrow_id'])
-        
-        # Disegna una nuova freccia temporanea
         is_flipped = self.controller.is_board_flipped
         from_r, from_c = self._get_coords(start_sq, is_flipped)
-        x1 = from_c * SQUARE_SIZE + SQUARE_SIZE // 2
-        y1 = from_r * SQUARE_SIZE + SQUARE_SIZE // 2
+        x1 = from_c * self.square_size + self.square_size // 2
+        y1 = from_r * self.square_size + self.square_size // 2
         x2, y2 = event.x, event.y
-        arrow_width = int(SQUARE_SIZE * ARROW_WIDTH_RATIO)
+        
+        # La freccia temporanea viene creata una volta e poi solo spostata
+        if self.right_drag_data['temp_arrow_id']:
+            self.coords(self.right_drag_data['temp_arrow_id'], x1, y1, x2, y2)
+            return
+        arrow_width = int(self.square_size * ARROW_WIDTH_RATIO)
         self.right_drag_data['temp_arrow_id'] = self.create_line(
-            x1, y1, x2, y2, arrow=tk.LAST, fill=COLOR_ARROW_DEFAULT, width=arrow_width
+            x1, y1, x2, y2, arrow=tk.LAST, fill=COLOR_ARROW_DEFAULT, width=arrow_width, tags="drag"
         )
 
     def on_right_release(self, event):
@@ -681,7 +941,7 @@ class ChessBoard(tk.Canvas):
                 self.custom_arrows.append((start_sq, end_sq, COLOR_ARROW_DEFAULT))
         
         self.right_drag_data = {'start_square': None, 'temp_arrow_id': None}
-        self.controller.update_display()
+        self.update_overlay()
         
     def get_square_from_event(self, event):
         """
@@ -694,7 +954,7 @@ class ChessBoard(tk.Canvas):
             Indice della casella (0-63) o None se fuori dalla scacchiera
         """
         is_flipped = self.controller.is_board_flipped
-        col, row = event.x // SQUARE_SIZE, 7 - (event.y // SQUARE_SIZE)
+        col, row = event.x // self.square_size, 7 - (event.y // self.square_size)
         if is_flipped:
             col, row = 7 - col, 7 - row
         return chess.square(col, row) if 0 <= col <= 7 and 0 <= row <= 7 else None
@@ -706,6 +966,7 @@ class ChessBoard(tk.Canvas):
         
     def hide_promotion_choices(self):
         self.promotion_data["active"] = False; self.promotion_data["move"] = None; self.promotion_data["choices_bounds"].clear()
+        self.delete("promotion")
     
     def draw_evaluation_dot(self, square, classification_key):
         """
@@ -715,38 +976,41 @@ class ChessBoard(tk.Canvas):
             square: La casella su cui disegnare l'icona
             classification_key: La chiave della classificazione (es. 'brilliant', 'best', 'blunder', etc.)
         """
+        self.annotation_calls.append(("draw_evaluation_dot", (square, classification_key)))
         is_flipped = self.controller.is_board_flipped
         r, c = self._get_coords(square, is_flipped)
         
         # Posizione nell'angolo in alto a destra della casella
-        x_center = (c + 1) * SQUARE_SIZE - (SQUARE_SIZE * 0.15)
-        y_center = r * SQUARE_SIZE + (SQUARE_SIZE * 0.15)
+        x_center = (c + 1) * self.square_size - (self.square_size * 0.15)
+        y_center = r * self.square_size + (self.square_size * 0.15)
         
         # Prova a usare l'immagine se disponibile
         if classification_key in self.classification_images:
-            self.create_image(x_center, y_center, image=self.classification_images[classification_key], anchor="center")
+            self.create_image(x_center, y_center, image=self.classification_images[classification_key], anchor="center", tags="annotation")
         else:
             # Fallback: usa un cerchio colorato se l'immagine non è disponibile
             from config import EVAL_COLORS
             color = EVAL_COLORS.get(classification_key, "#808080")  # Grigio come default
-            radius = SQUARE_SIZE * 0.1
+            radius = self.square_size * 0.1
             self.create_oval(x_center - radius, y_center - radius, x_center + radius, y_center + radius, 
-                           fill=color, outline="black", width=1.5)
+                           fill=color, outline="black", width=1.5, tags="annotation")
 
-    def draw_custom_arrow(self, from_sq, to_sq, color):
+    def draw_custom_arrow(self, from_sq, to_sq, color, tags="custom_arrow"):
         is_flipped = self.controller.is_board_flipped
         from_r, from_c = self._get_coords(from_sq, is_flipped); to_r, to_c = self._get_coords(to_sq, is_flipped)
-        x1 = from_c * SQUARE_SIZE + SQUARE_SIZE / 2; y1 = from_r * SQUARE_SIZE + SQUARE_SIZE / 2
-        x2 = to_c * SQUARE_SIZE + SQUARE_SIZE / 2; y2 = to_r * SQUARE_SIZE + SQUARE_SIZE / 2
-        arrow_width = int(SQUARE_SIZE * 0.15); arrow_shape = (int(SQUARE_SIZE * 0.3), int(SQUARE_SIZE * 0.4), int(SQUARE_SIZE * 0.2))
-        return self.create_line(x1, y1, x2, y2, arrow=tk.LAST, fill=color, width=arrow_width, arrowshape=arrow_shape, stipple='gray50')
+        x1 = from_c * self.square_size + self.square_size / 2; y1 = from_r * self.square_size + self.square_size / 2
+        x2 = to_c * self.square_size + self.square_size / 2; y2 = to_r * self.square_size + self.square_size / 2
+        arrow_width = int(self.square_size * 0.15); arrow_shape = (int(self.square_size * 0.3), int(self.square_size * 0.4), int(self.square_size * 0.2))
+        return self.create_line(x1, y1, x2, y2, arrow=tk.LAST, fill=color, width=arrow_width, arrowshape=arrow_shape, stipple='gray50', tags=tags)
 
-    def draw_best_move_arrow(self, move):
+    def draw_best_move_arrow(self, move, tags="annotation"):
+        if tags == "annotation":
+            self.annotation_calls.append(("draw_best_move_arrow", (move,)))
         is_flipped = self.controller.is_board_flipped
         from_r, from_c = self._get_coords(move.from_square, is_flipped)
         to_r, to_c = self._get_coords(move.to_square, is_flipped)
-        x1 = from_c * SQUARE_SIZE + SQUARE_SIZE // 2; y1 = from_r * SQUARE_SIZE + SQUARE_SIZE // 2
-        x2 = to_c * SQUARE_SIZE + SQUARE_SIZE // 2; y2 = to_r * SQUARE_SIZE + SQUARE_SIZE // 2
-        arrow_color = "#3498db"; arrow_width = int(SQUARE_SIZE * 0.2)
-        arrow_shape_config = (int(SQUARE_SIZE * 0.4), int(SQUARE_SIZE * 0.5), int(SQUARE_SIZE * 0.25))
-        self.create_line(x1, y1, x2, y2, arrow=tk.LAST, fill=arrow_color, width=arrow_width, arrowshape=arrow_shape_config, stipple='gray50')
\ No newline at end of file
+        x1 = from_c * self.square_size + self.square_size // 2; y1 = from_r * self.square_size + self.square_size // 2
+        x2 = to_c * self.square_size + self.square_size // 2; y2 = to_r * self.square_size + self.square_size // 2
+        arrow_color = "#3498db"; arrow_width = int(self.square_size * 0.2)
+        arrow_shape_config = (int(self.square_size * 0.4), int(self.square_size * 0.5), int(self.square_size * 0.25))
+        self.create_line(x1, y1, x2, y2, arrow=tk.LAST, fill=arrow_color, width=arrow_width, arrowshape=arrow_shape_config, stipple='gray50', tags=tags)
\ No newline at end of file
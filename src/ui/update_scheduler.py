@@ -0,0 +1,88 @@
+# update_scheduler.py
+"""
+Scheduler degli aggiornamenti dell'interfaccia.
+
+I componenti non si ridisegnano direttamente: segnano come "sporche" le regioni
+interessate (scacchiera, cronologia, stato, pulsanti, barra di valutazione) e un
+unico flush pianificato con after_idle ridisegna ogni regione sporca al massimo una
+volta, anche se nel frattempo è stata invalidata più volte.
+"""
+
+from typing import Callable, Dict
+
+
+class UpdateScheduler:
+    """
+    Raccoglie le invalidazioni delle regioni della UI e le esegue in un solo flush.
+    """
+
+    # Ordine di disegno: la barra di valutazione imposta la freccia usata dalla scacchiera
+    REGIONS = ("eval_bar", "board", "status", "buttons", "history")
+
+    def __init__(self, master):
+        """
+        Args:
+            master: Widget Tk usato per pianificare il flush
+        """
+        self.master = master
+        self._renderers: Dict[str, Callable[[], None]] = {}
+        self._dirty = set()
+        self._flush_job = None
+        self._stats = {region: {'requested': 0, 'rendered': 0} for region in self.REGIONS}
+
+    def register(self, region: str, renderer: Callable[[], None]):
+        """
+        Associa a una regione la funzione che la ridisegna.
+
+        Args:
+            region: Una delle REGIONS
+            renderer: Funzione senza argomenti
+        """
+        if region not in self.REGIONS:
+            raise ValueError(f"Regione sconosciuta: {region}")
+        self._renderers[region] = renderer
+
+    def invalidate(self, *regions: str):
+        """
+        Segna le regioni come da ridisegnare e pianifica il flush se non lo è già.
+
+        Args:
+            regions: Regioni da aggiornare (tutte se omesse)
+        """
+        for region in regions or self.REGIONS:
+            self._stats[region]['requested'] += 1
+            self._dirty.add(region)
+        if self._flush_job is None:
+            self._flush_job = self.master.after_idle(self.flush)
+
+    def flush(self):
+        """Ridisegna subito le regioni sporche, una volta ciascuna."""
+        if self._flush_job is not None:
+            self.master.after_cancel(self._flush_job)
+            self._flush_job = None
+        dirty, self._dirty = self._dirty, set()
+        for region in self.REGIONS:
+            renderer = self._renderers.get(region)
+            if region in dirty and renderer:
+                self._stats[region]['rendered'] += 1
+                renderer()
+
+    def cancel(self):
+        """Scarta gli aggiornamenti in attesa (ad esempio quando la UI viene distrutta)."""
+        if self._flush_job is not None:
+            self.master.after_cancel(self._flush_job)
+            self._flush_job = None
+        self._dirty.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Restituisce i contatori per regione.
+
+        Returns:
+            Dizionario regione -> {'requested', 'rendered', 'collapsed'}, dove collapsed
+            è il numero di aggiornamenti ridondanti assorbiti da un flush
+        """
+        return {
+            region: dict(counts, collapsed=counts['requested'] - counts['rendered'])
+            for region, counts in self._stats.items()
+        }
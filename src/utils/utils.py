@@ -21,6 +21,23 @@ def get_turn_color_name(turn: chess.Color) -> str:
     return "Bianco" if turn == chess.WHITE else "Nero"
 
 
+def board_position_key(board: chess.Board) -> tuple:
+    """
+    Restituisce una chiave hashable della posizione, uguale per due posizioni identiche
+    ai fini della ripetizione: pezzi, turno, diritti di arrocco ed en passant (solo se
+    davvero giocabile). Usa solo l'API pubblica di python-chess.
+    
+    Args:
+        board: Scacchiera corrente
+        
+    Returns:
+        Tupla di bitboard e stato della posizione
+    """
+    return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+            board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK], board.turn,
+            board.clean_castling_rights(), board.ep_square if board.has_legal_en_passant() else None)
+
+
 def format_eval_display(eval_dict: Optional[Dict[str, Any]]) -> str:
     """
     Formatta una valutazione per la visualizzazione.